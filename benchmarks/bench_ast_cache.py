@@ -0,0 +1,66 @@
+# benchmarks/bench_ast_cache.py
+
+#
+# What the AST cache saves: parsing a generated program against loading its serialized
+# AST (opalg.compiler.serializer), plus the encoded size.
+#
+# Usage:
+#   python benchmarks/bench_ast_cache.py [--statements N] [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.compiler.serializer import dumps, loads
+from opalg.parser.parser import parser
+
+
+def generate_source(statements):
+    lines = ['define v0: int = 0\\\\']
+    for k in range(1, statements):
+        if k % 10 == 0:
+            lines.append(f'if (v{k - 1} > 10) \\\\ show "big"\\\\ \\\\')
+        else:
+            lines.append(f'define v{k} = (v{k - 1} + {k}) * 2\\\\')
+    return '\n'.join(lines)
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def parse(source):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare parsing with loading a cached AST.')
+    arg_parser.add_argument('--statements', type=int, default=5000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    source = generate_source(args.statements)
+    program = parse(source)
+    data = dumps(program)
+    parse_time = best_time(lambda: parse(source), args.repeat)
+    dump_time = best_time(lambda: dumps(program), args.repeat)
+    load_time = best_time(lambda: loads(data), args.repeat)
+    print(f'source: {len(source.encode("utf-8")) / 1024:.1f} KiB, encoded AST: {len(data) / 1024:.1f} KiB')
+    print(f'parse: {parse_time * 1000:8.1f} ms')
+    print(f'dump:  {dump_time * 1000:8.1f} ms')
+    print(f'load:  {load_time * 1000:8.1f} ms   ({parse_time / load_time:.1f}x faster than parsing)')
+
+
+if __name__ == '__main__':
+    main()
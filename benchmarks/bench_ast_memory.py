@@ -0,0 +1,111 @@
+# benchmarks/bench_ast_memory.py
+
+#
+# Memory footprint of the AST: bytes per node for a synthetic program, with the slotted
+# node classes against the same classes carrying a per-instance __dict__, and against the
+# flat arena representation (opalg.compiler.arena).
+#
+# Usage:
+#   python benchmarks/bench_ast_memory.py [--statements N]
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.compiler import ast_nodes
+from opalg.compiler.arena import ArenaBuilder
+
+
+def unslotted(cls):
+    """A plain-class twin of a node class: same fields, but stored in a per-instance __dict__."""
+    def __init__(self, *args, **kwargs):
+        cls.__init__(self, *args, **kwargs)
+        self.lineno = None
+        self.lexpos = None
+    return type(cls.__name__, (), {'__init__': __init__, 'to_dict': cls.to_dict})
+
+
+def build_program(nodes, statements):
+    """
+    define vK = (vJ + K) * 2\\            (J = K - 1)
+    if (vK > 10) \\ show vK\\ \\           every 10th statement
+    """
+    body = [nodes.VariableDeclarationNode('v0', None, nodes.NumberLiteralNode(0))]
+    for k in range(1, statements):
+        if k % 10 == 0:
+            body.append(nodes.IfStatementNode(
+                nodes.BinaryOperationNode(nodes.IdentifierNode(f'v{k - 1}'), '>', nodes.NumberLiteralNode(10)),
+                nodes.BlockNode([nodes.ShowStatementNode(nodes.IdentifierNode(f'v{k - 1}'))]),
+            ))
+            continue
+        value = nodes.BinaryOperationNode(
+            nodes.BinaryOperationNode(nodes.IdentifierNode(f'v{k - 1}'), '+', nodes.NumberLiteralNode(k)),
+            '*',
+            nodes.NumberLiteralNode(2),
+        )
+        body.append(nodes.VariableDeclarationNode(f'v{k}', None, value))
+    return nodes.ProgramNode(body)
+
+
+def walk(node):
+    yield node
+    for name in ('statements', 'value', 'left', 'right', 'condition', 'then_block'):
+        child = getattr(node, name, None)
+        if isinstance(child, list):
+            for item in child:
+                yield from walk(item)
+        elif child is not None and hasattr(child, 'to_dict'):
+            yield from walk(child)
+
+
+def object_size(node):
+    """The node object itself, plus its __dict__ if it has one (payload excluded)."""
+    size = sys.getsizeof(node)
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def measure(nodes, statements):
+    """(node count, bytes allocated while building the program, bytes of node objects)"""
+    gc.collect()
+    tracemalloc.start()
+    program = build_program(nodes, statements)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(nodes, ArenaBuilder):
+        return len(nodes.arena), allocated, nodes.arena.nbytes
+    all_nodes = list(walk(program))
+    return len(all_nodes), allocated, sum(object_size(node) for node in all_nodes)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Report AST bytes per node.')
+    arg_parser.add_argument('--statements', type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    classes = ('ProgramNode', 'BlockNode', 'VariableDeclarationNode', 'IfStatementNode', 'ShowStatementNode',
+               'BinaryOperationNode', 'IdentifierNode', 'NumberLiteralNode')
+    legacy = type(sys)('legacy_nodes')
+    for name in classes:
+        setattr(legacy, name, unslotted(getattr(ast_nodes, name)))
+
+    # bytes/node counts everything allocated for the tree (names, numbers and lists
+    # included); object/node counts only the node objects and their __dict__s, or for
+    # the arena, its columns.
+    print(f"{'classes':<10}{'nodes':>10}{'total':>12}{'bytes/node':>12}{'object/node':>13}")
+    results = {}
+    for label, nodes in (('__dict__', legacy), ('slots', ast_nodes), ('arena', ArenaBuilder())):
+        count, allocated, objects = measure(nodes, args.statements)
+        results[label] = allocated / count
+        print(f'{label:<10}{count:>10}{allocated / 2**20:10.1f}MB{allocated / count:12.1f}{objects / count:13.1f}')
+    print(f"reduction: slots {results['__dict__'] / results['slots']:.2f}x, "
+          f"arena {results['__dict__'] / results['arena']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/bench_calls.py
+
+#
+# Measure function calls in the tree-walker: call-site targets, prebuilt frames and tail
+# calls run in the caller's frame (Interpreter) against looking every callee up by name,
+# binding its parameters one by one and nesting every call (LookupInterpreter, the previous
+# scheme), and report how deep each one can recurse.
+#
+# Usage:
+#   python benchmarks/bench_calls.py [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.interpreter.interpreter import Interpreter, Environment, IdentifierNode, Completion, RETURN
+
+PROGRAMS = {
+    'fib': r'''
+function fib(n: int): int \\
+  if (n < 2) \\
+    return n\\
+  \\
+  return fib(n - 1) + fib(n - 2)\\
+\\
+show fib(20)\\
+''',
+    'calls_in_loop': r'''
+function add(a: int, b: int): int \\
+  define c = a + b\\
+  return c\\
+\\
+define i = 0\\
+define total = 0\\
+while (i < 20000) \\
+  total = add(total, i)\\
+  i += 1\\
+\\
+show total\\
+''',
+    'tail_calls': r'''
+function count(n: int, total: int): int \\
+  if (n == 0) \\
+    return total\\
+  \\
+  return count(n - 1, total + n)\\
+\\
+define i = 0\\
+define total = 0\\
+while (i < 300) \\
+  total += count(60, 0)\\
+  i += 1\\
+\\
+show total\\
+''',
+}
+
+DEEP = r'''
+function down(n: int): int \\
+  if (n == 0) \\
+    return 0\\
+  \\
+  return 1 + down(n - 1)\\
+\\
+show down(%d)\\
+'''
+
+
+class LookupInterpreter(Interpreter):
+    """The tree-walker with a name lookup, an arity check and a slot-by-slot bind per call."""
+    def evaluate_FunctionCallNode(self, expr, env):
+        name = expr.function.name if isinstance(expr.function, IdentifierNode) else None
+        if name not in self.functions:
+            raise Exception(f"Function '{name}' not defined")
+        args = [self.evaluate(arg, env) for arg in expr.arguments]
+        func = self.functions[name]
+        if len(args) != len(func.parameters):
+            raise Exception(f"Function '{func.name}' expects {len(func.parameters)} arguments, got {len(args)}")
+        call_env = Environment(self.global_env, func.scope)
+        for index, value in zip(func.param_slots, args):
+            call_env.slots[index] = value
+        completion = self.execute_block(func.body.statements, call_env)
+        return completion.value if completion is not None else None
+
+    def execute_ReturnStatementNode(self, node, env):
+        return Completion(RETURN, self.evaluate(node.expression, env) if node.expression else None)
+
+
+def parse(source):
+    from opalg.parser.parser import parser
+    # The grammar actions print debugging output; keep it out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+def run(interpreter_class, ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        interpreter_class().interpret(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def max_depth(interpreter_class):
+    """The deepest recursion (up to 5000) the interpreter gets through."""
+    reached = 0
+    for depth in (10, 100, 1000, 5000):
+        try:
+            run(interpreter_class, parse(DEEP % depth))
+        except RecursionError:
+            break
+        reached = depth
+    return reached
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare the ways the tree-walker calls functions.')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'program':<15}{'lookup':>12}{'call site':>12}{'speedup':>10}")
+    for name, source in PROGRAMS.items():
+        timings = []
+        outputs = set()
+        for interpreter_class in (LookupInterpreter, Interpreter):
+            best = float('inf')
+            for _ in range(args.repeat):
+                elapsed, output = run(interpreter_class, parse(source))
+                best = min(best, elapsed)
+                outputs.add(output)
+            timings.append(best)
+        if len(outputs) != 1:
+            raise SystemExit(f"{name}: the interpreters disagree on the program output")
+        print(f'{name:<15}' + ''.join(f'{t * 1000:10.1f}ms' for t in timings) + f'{timings[0] / timings[1]:9.2f}x')
+    print(f"{'max depth':<15}{max_depth(LookupInterpreter):>12}{max_depth(Interpreter):>12}")
+
+
+if __name__ == '__main__':
+    main()
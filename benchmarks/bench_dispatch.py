@@ -0,0 +1,129 @@
+# benchmarks/bench_dispatch.py
+
+#
+# Per-node visitor dispatch overhead: the shared class-level dispatch tables
+# (opalg.compiler.visitor) against the getattr/f-string lookup every pass used before.
+#
+# Usage:
+#   python benchmarks/bench_dispatch.py [--statements N] [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.compiler.ast_nodes import (
+    ProgramNode, VariableDeclarationNode, BinaryOperationNode, UnaryOperationNode,
+    NumberLiteralNode, IdentifierNode, IntType
+)
+from opalg.compiler.intermediate_representation import IntermediateRepresentation
+from opalg.compiler.semantic_analyzer import SemanticAnalyzer
+from opalg.interpreter.code_generator import CodeGenerator
+from opalg.interpreter.interpreter import Interpreter
+from opalg.interpreter.optimizer import Optimizer
+
+
+def build_program(statements):
+    """define x: int = 3\\ define y: int = 4\\ then `define vK: int = (x + K) * -(K - y)\\` N times."""
+    body = [
+        VariableDeclarationNode('x', IntType(), NumberLiteralNode(3)),
+        VariableDeclarationNode('y', IntType(), NumberLiteralNode(4)),
+    ]
+    for k in range(statements):
+        value = BinaryOperationNode(
+            BinaryOperationNode(IdentifierNode('x'), '+', NumberLiteralNode(k)),
+            '*',
+            UnaryOperationNode('-', BinaryOperationNode(NumberLiteralNode(k), '-', IdentifierNode('y'))),
+        )
+        body.append(VariableDeclarationNode(f'v{k}', IntType(), value))
+    return ProgramNode(body)
+
+
+def count_nodes(program):
+    def count(expr):
+        if isinstance(expr, BinaryOperationNode):
+            return 1 + count(expr.left) + count(expr.right)
+        if isinstance(expr, UnaryOperationNode):
+            return 1 + count(expr.operand)
+        return 1
+    return 1 + sum(1 + count(stmt.value) for stmt in program.statements)
+
+
+# The dispatch every pass used before: build the handler name and getattr it per visit.
+
+class GetattrOptimizer(Optimizer):
+    def optimize(self, node):
+        return getattr(self, f'optimize_{type(node).__name__}', self.generic_optimize)(node)
+
+
+class GetattrCodeGenerator(CodeGenerator):
+    def generate(self, node):
+        getattr(self, f'generate_{type(node).__name__}', self.generic_generate)(node)
+
+    def generate_expression(self, expr):
+        return getattr(self, f'generate_expr_{type(expr).__name__}', self.generic_generate_expression)(expr)
+
+
+class GetattrSemanticAnalyzer(SemanticAnalyzer):
+    def analyze(self, node):
+        getattr(self, f'analyze_{type(node).__name__}', self.generic_analyze)(node)
+
+    def analyze_expression(self, expr):
+        return getattr(self, f'analyze_expr_{type(expr).__name__}', self.generic_analyze_expression)(expr)
+
+
+class GetattrIntermediateRepresentation(IntermediateRepresentation):
+    def generate(self, node):
+        getattr(self, f'ir_{type(node).__name__}', self.generic_ir)(node)
+
+
+class GetattrInterpreter(Interpreter):
+    def execute(self, node, env):
+        return getattr(self, f'execute_{type(node).__name__}', self.generic_execute)(node, env)
+
+    def evaluate(self, expr, env):
+        return getattr(self, f'evaluate_{type(expr).__name__}', self.generic_evaluate)(expr, env)
+
+
+PASSES = [
+    ('optimizer', GetattrOptimizer, Optimizer, lambda p, ast: p.optimize(ast)),
+    ('code_generator', GetattrCodeGenerator, CodeGenerator, lambda p, ast: p.generate(ast)),
+    ('semantic_analyzer', GetattrSemanticAnalyzer, SemanticAnalyzer, lambda p, ast: p.analyze(ast)),
+    ('ir', GetattrIntermediateRepresentation, IntermediateRepresentation, lambda p, ast: p.generate(ast)),
+    ('interpreter', GetattrInterpreter, Interpreter, lambda p, ast: p.interpret(ast)),
+]
+
+
+def best_time(pass_class, run, statements, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        ast = build_program(statements)  # the optimizer rewrites the tree in place
+        instance = pass_class()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(instance, ast)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Measure per-node visitor dispatch overhead.')
+    arg_parser.add_argument('--statements', type=int, default=50000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    nodes = count_nodes(build_program(args.statements))
+    print(f'{nodes} nodes per program')
+    print(f"{'pass':<18}{'getattr':>14}{'table':>14}{'speedup':>10}")
+    for name, old_class, new_class, run in PASSES:
+        old = best_time(old_class, run, args.statements, args.repeat)
+        new = best_time(new_class, run, args.statements, args.repeat)
+        print(f'{name:<18}{old * 1e9 / nodes:10.1f}ns/n{new * 1e9 / nodes:10.1f}ns/n{old / new:9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
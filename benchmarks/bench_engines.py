@@ -0,0 +1,97 @@
+# benchmarks/bench_engines.py
+
+#
+# Compare the execution engines on loop- and call-heavy programs.
+#
+# Usage:
+#   python benchmarks/bench_engines.py [--repeat N] [--engines tree,closure]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.interpreter.engines import ENGINES, get_engine
+
+PROGRAMS = {
+    'while_loop': r'''
+define i = 0\\
+define total = 0\\
+while (i < 200000) \\
+  total = total + i * 2 - 1\\
+  i = i + 1\\
+\\
+show total\\
+''',
+    'nested_if': r'''
+define i = 0\\
+define low = 0\\
+define high = 0\\
+while (i < 100000) \\
+  if (i < 50000 && i != 7) \\
+    low += 1\\
+  else \\
+    high += 1\\
+  \\
+  i += 1\\
+\\
+show low\\
+show high\\
+''',
+    'fib': r'''
+function fib(n: int): int \\
+  if (n < 2) \\
+    return n\\
+  \\
+  return fib(n - 1) + fib(n - 2)\\
+\\
+show fib(20)\\
+''',
+}
+
+
+def parse(source):
+    from opalg.parser.parser import parser
+    # The grammar actions print debugging output; keep it out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+def run(engine, ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        get_engine(engine)().interpret(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare the opalg execution engines.')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--engines', default=','.join(ENGINES))
+    args = arg_parser.parse_args()
+    engines = args.engines.split(',')
+
+    print(f"{'program':<12}" + ''.join(f'{engine:>12}' for engine in engines) + f"{'speedup':>10}")
+    for name, source in PROGRAMS.items():
+        timings = []
+        outputs = set()
+        for engine in engines:
+            best = float('inf')
+            for _ in range(args.repeat):
+                elapsed, output = run(engine, parse(source))
+                best = min(best, elapsed)
+                outputs.add(output)
+            timings.append(best)
+        if len(outputs) != 1:
+            raise SystemExit(f"{name}: engines disagree on the program output")
+        speedup = timings[0] / min(timings[1:]) if len(timings) > 1 else 1.0
+        print(f'{name:<12}' + ''.join(f'{t * 1000:10.1f}ms' for t in timings) + f'{speedup:9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_parse_scaling.py
+
+#
+# Parse time against sequence length, for the sequence shapes of the grammar: top-level
+# statements, statements in one block, and call arguments. Linear list building shows as
+# a flat time per item; a copy per reduction shows as time per item growing with n.
+#
+# Usage:
+#   python benchmarks/bench_parse_scaling.py [--sizes 1000 10000 100000]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.parser.parser import parser
+
+
+def top_level(n):
+    return ''.join(f'define v{k} = v{k - 1} + {k}\\\\ ' for k in range(n))
+
+
+def one_block(n):
+    return 'while (true) \\\\ ' + top_level(n) + '\\\\ '
+
+
+def call_arguments(n):
+    return 'show f(' + ', '.join(str(k) for k in range(n)) + ')\\\\'
+
+
+SHAPES = [('statements', top_level), ('block', one_block), ('arguments', call_arguments)]
+
+
+def parse_time(source):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.parse(source)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Measure how parse time scales with sequence length.')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = arg_parser.parse_args()
+
+    print(f"{'shape':<12}{'items':>9}{'total':>11}{'per item':>12}{'vs smallest':>13}")
+    for name, generate in SHAPES:
+        smallest = None
+        for n in args.sizes:
+            seconds = parse_time(generate(n))
+            per_item = seconds / n
+            smallest = smallest or per_item
+            print(f'{name:<12}{n:>9}{seconds:10.2f}s{per_item * 1e6:10.1f}us{per_item / smallest:12.2f}x')
+
+
+if __name__ == '__main__':
+    main()
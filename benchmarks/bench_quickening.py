@@ -0,0 +1,107 @@
+# benchmarks/bench_quickening.py
+
+#
+# Measure binary operations in the tree-walker: nodes quickened into type-specialized ones
+# (Interpreter) against every evaluation going through the operator chain of the generic
+# handler (GenericInterpreter), and print the specialization counters of one more, counted
+# run of every program.
+#
+# Usage:
+#   python benchmarks/bench_quickening.py [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.interpreter.interpreter import Interpreter, binary_operation
+from opalg.interpreter.quickening import QuickeningStats
+
+PROGRAMS = {
+    'int_loop': r'''
+define i = 0\\
+define total = 0\\
+while (i < 20000) \\
+  if (i >= 10 && i != 15) \\
+    total = total + i * 2 - 1\\
+  \\
+  i = i + 1\\
+\\
+show total\\
+''',
+    'float_math': r'''
+define i = 0\\
+define x = 0.5\\
+while (i < 10000) \\
+  x = x * 1.0001 + 0.25 / 2.5 - 0.1\\
+  i = i + 1\\
+\\
+show x\\
+''',
+    'strings': r'''
+define i = 0\\
+define s = ""\\
+while (i < 10000) \\
+  s = "<" + "b" + ">"\\
+  i = i + 1\\
+\\
+show s\\
+''',
+}
+
+
+class GenericInterpreter(Interpreter):
+    """The tree-walker with quickening turned off."""
+    def evaluate_BinaryOperationNode(self, expr, env):
+        if expr.op in ('=', '+='):
+            return super().evaluate_BinaryOperationNode(expr, env)
+        return binary_operation(expr.op, self.evaluate(expr.left, env), self.evaluate(expr.right, env))
+
+
+def parse(source):
+    from opalg.parser.parser import parser
+    # The grammar actions print debugging output; keep it out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+def run(interpreter_class, ast, stats=None):
+    interpreter = interpreter_class()
+    interpreter.quickening_stats = stats
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        interpreter.interpret(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare quickened and generic binary operations.')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'program':<15}{'generic':>12}{'quickened':>12}{'speedup':>10}")
+    stats = QuickeningStats()
+    for name, source in PROGRAMS.items():
+        timings = []
+        outputs = set()
+        for interpreter_class in (GenericInterpreter, Interpreter):
+            best = float('inf')
+            for _ in range(args.repeat):
+                elapsed, output = run(interpreter_class, parse(source))
+                best = min(best, elapsed)
+                outputs.add(output)
+            timings.append(best)
+        if len(outputs) != 1:
+            raise SystemExit(f"{name}: the interpreters disagree on the program output")
+        print(f'{name:<15}' + ''.join(f'{t * 1000:10.1f}ms' for t in timings) + f'{timings[0] / timings[1]:9.2f}x')
+        run(Interpreter, parse(source), stats)
+    stats.report(sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
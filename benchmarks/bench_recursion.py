@@ -0,0 +1,129 @@
+# benchmarks/bench_recursion.py
+
+#
+# Measure function returns in the tree-walker: completion records (Interpreter) against
+# unwinding every `return` with a Python exception (RaisingInterpreter, the previous scheme).
+#
+# Usage:
+#   python benchmarks/bench_recursion.py [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.interpreter.interpreter import Interpreter, ReturnException
+
+PROGRAMS = {
+    'fib': r'''
+function fib(n: int): int \\
+  if (n < 2) \\
+    return n\\
+  \\
+  return fib(n - 1) + fib(n - 2)\\
+\\
+show fib(20)\\
+''',
+    'mutual': r'''
+function even(n: int): bool \\
+  if (n == 0) \\
+    return true\\
+  \\
+  return odd(n - 1)\\
+\\
+function odd(n: int): bool \\
+  if (n == 0) \\
+    return false\\
+  \\
+  return even(n - 1)\\
+\\
+define i = 0\\
+define hits = 0\\
+while (i < 300) \\
+  if (even(31)) \\
+    hits += 1\\
+  \\
+  i += 1\\
+\\
+show hits\\
+''',
+    'nested_return': r'''
+function find(limit: int): int \\
+  define i = 0\\
+  while (i < limit) \\
+    for (c in "abcdef") \\
+      if (c == "f") \\
+        if (i == limit - 1) \\
+          return i\\
+        \\
+      \\
+    \\
+    i += 1\\
+  \\
+  return -1\\
+\\
+define total = 0\\
+define n = 0\\
+while (n < 3000) \\
+  total += find(3)\\
+  n += 1\\
+\\
+show total\\
+''',
+}
+
+
+class RaisingInterpreter(Interpreter):
+    """The tree-walker with `return` unwound by raising ReturnException up to the call."""
+    def execute_ReturnStatementNode(self, node, env):
+        raise ReturnException(self.evaluate(node.expression, env) if node.expression else None)
+
+    def evaluate_FunctionCallNode(self, expr, env):
+        try:
+            return super().evaluate_FunctionCallNode(expr, env)
+        except ReturnException as ret:
+            return ret.value
+
+
+def parse(source):
+    from opalg.parser.parser import parser
+    # The grammar actions print debugging output; keep it out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(source)
+
+
+def run(interpreter_class, ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        interpreter_class().interpret(ast)
+    return time.perf_counter() - start, out.getvalue()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare the ways the tree-walker unwinds returns.')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    print(f"{'program':<15}{'raise':>12}{'completion':>12}{'speedup':>10}")
+    for name, source in PROGRAMS.items():
+        timings = []
+        outputs = set()
+        for interpreter_class in (RaisingInterpreter, Interpreter):
+            best = float('inf')
+            for _ in range(args.repeat):
+                elapsed, output = run(interpreter_class, parse(source))
+                best = min(best, elapsed)
+                outputs.add(output)
+            timings.append(best)
+        if len(outputs) != 1:
+            raise SystemExit(f"{name}: the interpreters disagree on the program output")
+        print(f'{name:<15}' + ''.join(f'{t * 1000:10.1f}ms' for t in timings) + f'{timings[0] / timings[1]:9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
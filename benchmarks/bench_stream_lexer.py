@@ -0,0 +1,67 @@
+# benchmarks/bench_stream_lexer.py
+
+#
+# Peak memory and time for tokenizing a generated source file: read whole into the PLY
+# lexer, against opalg.lexer.stream.StreamLexer reading it in chunks.
+#
+# Usage:
+#   python benchmarks/bench_stream_lexer.py [--statements N] [--chunk-size N]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opalg.lexer.lexer import lexer
+from opalg.lexer.stream import CHUNK_SIZE, StreamLexer
+
+
+def write_source(path, statements):
+    with open(path, 'w', encoding='utf-8') as f:
+        for k in range(statements):
+            f.write(f'define v{k} = (v{k - 1} + {k}.5) * 2\\\\ // step {k}\n')
+
+
+def lex_whole(path, _chunk_size):
+    with open(path, 'r', encoding='utf-8') as f:
+        whole_lexer = lexer.clone()
+        whole_lexer.input(f.read())
+    return sum(1 for _ in iter(whole_lexer.token, None))
+
+
+def lex_stream(path, chunk_size):
+    with StreamLexer(path, chunk_size) as stream:
+        return sum(1 for _ in stream)
+
+
+def measure(function, path, chunk_size):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = function(path, chunk_size)
+    seconds = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare whole-file and streaming tokenization.')
+    arg_parser.add_argument('--statements', type=int, default=200000)
+    arg_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'generated.op')
+        write_source(path, args.statements)
+        print(f'source: {os.path.getsize(path) / 2**20:.1f} MiB')
+        for name, function in (('whole', lex_whole), ('stream', lex_stream)):
+            count, seconds, peak = measure(function, path, args.chunk_size)
+            print(f'{name:<8}{count:>10} tokens{seconds:8.2f}s   peak {peak / 2**20:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+# build.py
+
+#
+# `opalg build <dir>...`: parse and compile every source file of a project.
+#
+# fenote: Files are discovered under the given directories (or given directly); together
+#         with the modules they import they are planned by a ModuleGraph
+#         (compiler/modules.py), which reuses the last build of every module whose source,
+#         imports and compiler are unchanged. The other modules are handed to a process pool
+#         of --jobs workers as soon as the modules they import are compiled. Each worker
+#         loads the parser tables once, in its initializer, and then parses (through the AST
+#         cache, like `opalg file.op`) and runs Compiler.compile on one module per task.
+#         Results come back in completion order and are printed as they arrive, with the
+#         module's parse and compile time, or its error; a summary with the aggregate timings
+#         ends the run. --jobs 1 builds in the current process. --explain adds why each
+#         module was compiled again; --no-cache compiles everything and keeps no graph.
+#
+# fenote: Grammar actions and passes print debugging output; workers discard it so the
+#         report stays readable. The exit status is 1 when any module failed.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from opalg.compiler.modules import ModuleGraph, display
+from opalg.lexer.backends import DEFAULT_LEXER, LEXERS
+
+SOURCE_SUFFIXES = ('.op',)
+
+_settings = {'use_cache': True, 'lexer': DEFAULT_LEXER}
+
+
+class BuildResult:
+    def __init__(self, path, error=None, parse_time=0.0, compile_time=0.0, output_lines=0, reason=None):
+        self.path = path
+        self.error = error
+        self.parse_time = parse_time
+        self.compile_time = compile_time
+        self.output_lines = output_lines
+        self.reason = reason      # why the module was compiled; None when it was up to date
+        self.exports = None       # its symbols, for the modules that import it
+        self.output = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def discover(paths, suffixes=SOURCE_SUFFIXES):
+    """Source files under `paths` (directories are searched recursively), sorted."""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories[:] = [name for name in subdirectories
+                                 if not name.startswith('.') and name != '__pycache__']
+            found.extend(os.path.join(directory, name) for name in files if name.endswith(suffixes))
+    return sorted(found)
+
+
+def init_worker(use_cache=True, lexer=DEFAULT_LEXER):
+    """Load the parser tables and the compiler once per worker process."""
+    import opalg.compiler.compiler
+    from opalg.parser.instances import local_parser
+
+    _settings['use_cache'] = use_cache
+    _settings['lexer'] = lexer
+    local_parser(lexer)
+
+
+def build_file(path, modules=None):
+    """
+    Parse and compile one file, given the exports of the modules it imports; errors are
+    returned in the result, never raised.
+    """
+    from opalg.parser.ast_cache import parse_source
+    from opalg.compiler.compiler import Compiler
+
+    result = BuildResult(path)
+    ast = None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            ast = parse_source(path, source, _settings['use_cache'], _settings['lexer'])
+            result.parse_time = time.perf_counter() - start
+            start = time.perf_counter()
+            compiler = Compiler(modules)
+            output = compiler.compile(ast)
+            result.compile_time = time.perf_counter() - start
+        result.output_lines = output.count('\n') + 1 if output else 0
+        result.exports = dict(compiler.semantic_analyzer.symbol_table)
+        result.output = output
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+        if ast is None:
+            result.parse_time = time.perf_counter() - start
+        else:
+            result.compile_time = time.perf_counter() - start
+    return result
+
+
+def build(paths, jobs=None, use_cache=True, lexer=DEFAULT_LEXER):
+    """Generate a BuildResult for every module of the sources under `paths`, as each one finishes."""
+    graph = ModuleGraph(paths, persistent=use_cache)
+    stale = []
+    for module in graph.plan(discover(paths)):
+        if module.reason is None:
+            yield BuildResult(module.path, output_lines=module.output.count('\n') + 1 if module.output else 0)
+        else:
+            stale.append(module)
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        if jobs == 1 or len(stale) <= 1:
+            init_worker(use_cache, lexer)
+            for module in stale:   # planned imports first
+                yield finish(module, start(graph, module, call))
+            return
+        # Build (or load) the tables here first, so workers never race to write the table cache.
+        import opalg.parser.parser
+        with ProcessPoolExecutor(max_workers=min(jobs, len(stale)), initializer=init_worker,
+                                 initargs=(use_cache, lexer)) as executor:
+            waiting = {module.path: module for module in stale}
+            running = {}
+            while waiting or running:
+                for module in list(waiting.values()):
+                    # A module with an error (say, an import cycle) fails without waiting.
+                    if module.error is None and any(path in waiting or path in running.values()
+                                                    for path in module.imports.values()):
+                        continue
+                    del waiting[module.path]
+                    task = start(graph, module, executor.submit)
+                    if isinstance(task, BuildResult):
+                        yield finish(module, task)
+                    else:
+                        running[task] = module.path
+                done, _ = wait(running, return_when=FIRST_COMPLETED) if running else ((), ())
+                for future in done:
+                    yield finish(graph.modules[running.pop(future)], future.result())
+    finally:
+        graph.save()
+
+
+def call(function, *args):
+    return function(*args)
+
+
+def start(graph, module, run):
+    """
+    run(build_file, path, modules) for `module` (run is `call` or an executor's submit), or
+    its failed BuildResult when one of its imports is missing or failed.
+    """
+    try:
+        modules = graph.imported(module)
+    except Exception as e:
+        return BuildResult(module.path, error=f'{type(e).__name__}: {e}')
+    return run(build_file, module.path, modules)
+
+
+def finish(module, result):
+    """Record the result of compiling `module` in its graph."""
+    module.exports = result.exports
+    module.output = result.output
+    result.reason = module.reason
+    return result
+
+
+def report(results, out=None, verbose=True, explain=False):
+    """
+    Print each result as it arrives, then the totals; returns the number of failures. With
+    `explain`, every module's line says why it was compiled or that it was up to date.
+    """
+    out = out or sys.stdout
+    start = time.perf_counter()
+    count = failures = current = 0
+    parse_total = compile_total = 0.0
+    if verbose:
+        out.write(f"{'parse [ms]':>10} {'compile [ms]':>13}  file\n")
+    for result in results:
+        count += 1
+        parse_total += result.parse_time
+        compile_total += result.compile_time
+        if result.reason is None:
+            current += 1
+        note = ''
+        if explain:
+            note = f"  ({result.reason or 'up to date'})"
+        if not result.ok:
+            failures += 1
+            out.write(f"{result.parse_time * 1000:10.2f} {result.compile_time * 1000:13.2f}  "
+                      f"{display(result.path)}: FAILED {result.error}{note}\n")
+        elif verbose or explain:
+            out.write(f"{result.parse_time * 1000:10.2f} {result.compile_time * 1000:13.2f}  {display(result.path)}{note}\n")
+    wall = time.perf_counter() - start
+    out.write(f"{parse_total * 1000:10.2f} {compile_total * 1000:13.2f}  total: {count} files, "
+              f"{failures} failed, {current} up to date, {wall:.2f}s wall")
+    if wall > 0:
+        out.write(f", {count / wall:.1f} files/s")
+    out.write("\n")
+    return failures
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='opalg build', description='Parse and compile OPALG sources.')
+    arg_parser.add_argument('paths', nargs='+', help='source files or directories to search for .op files')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=None,
+                            help='worker processes (default: one per CPU; 1 builds in this process)')
+    arg_parser.add_argument('--lexer', choices=sorted(LEXERS), default=DEFAULT_LEXER,
+                            help=f'lexer backend (default: {DEFAULT_LEXER})')
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help='parse and compile everything, without the AST cache or the module graph')
+    arg_parser.add_argument('--explain', action='store_true',
+                            help='say why each module was compiled again, or that it was up to date')
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='only report failures and the totals')
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: --jobs must be at least 1.")
+        sys.exit(1)
+    failures = report(build(args.paths, args.jobs, not args.no_cache, args.lexer),
+                      verbose=not args.quiet, explain=args.explain)
+    if failures:
+        sys.exit(1)
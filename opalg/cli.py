@@ -1,41 +1,146 @@
 # cli.py
+import os
 import sys
-from opalg.parser.parser import parser
-from opalg.interpreter.interpreter import Interpreter
 
-def main():
-    """
-    CLI entry point for opalg. Usage:
-      poetry run opalg path/to/file.op
-    or
-      python cli.py path/to/file.op
-    """
-    if len(sys.argv) < 2:
-        print("Usage: opalg <file.op>")
-        sys.exit(1)
+from opalg.startup import ImportProfiler
+from opalg.interpreter.engines import ENGINES, DEFAULT_ENGINE, get_engine
+from opalg.lexer.backends import LEXERS, DEFAULT_LEXER
+
+# Sources larger than this are tokenized as a stream instead of being read into memory whole.
+STREAM_THRESHOLD = 32 * 2**20
 
-    filename = sys.argv[1]
+
+def build_arg_parser():
+    import argparse   # not needed when the command is forwarded to the daemon
+
+    arg_parser = argparse.ArgumentParser(prog='opalg', description='Run an OPALG program.')
+    arg_parser.add_argument('file', help='path to the .op file to run')
+    arg_parser.add_argument(
+        '--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+        help=f'execution engine (default: {DEFAULT_ENGINE})'
+    )
+    arg_parser.add_argument(
+        '--lexer', choices=sorted(LEXERS), default=DEFAULT_LEXER,
+        help=f'lexer backend (default: {DEFAULT_LEXER})'
+    )
+    arg_parser.add_argument(
+        '--no-cache', action='store_true',
+        help='always parse the source, without reading or writing the AST cache'
+    )
+    arg_parser.add_argument(
+        '--startup-profile', action='store_true',
+        help='print the import cost of every module loaded during the run (to stderr)'
+    )
+    arg_parser.add_argument(
+        '--quickening-stats', action='store_true',
+        help='print how often each type-specialized operation held and failed (to stderr)'
+    )
+    return arg_parser
+
+
+def run_file(filename, engine=DEFAULT_ENGINE, use_cache=True, lexer=DEFAULT_LEXER, quickening_stats=False):
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            source = f.read()
+        if os.path.getsize(filename) > STREAM_THRESHOLD:
+            source = None
+        else:
+            with open(filename, 'r', encoding='utf-8') as f:
+                source = f.read()
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
         sys.exit(1)
 
-    # 1) Parse the OPALG source into an AST
+    # 1) Parse the OPALG source into an AST, or load the AST cached by an earlier run
+    #    (the lexer and parser tables are only loaded once there is something to parse)
     try:
-        ast = parser.parse(source)
+        from opalg.parser.ast_cache import parse_source
+        ast = parse_source(filename, source, use_cache, lexer)
     except Exception as e:
         print(f"Parse error: {e}")
         sys.exit(1)
 
-    # 2) Interpret the AST
-    interpreter = Interpreter()
+    # 2) Interpret the AST, after the modules it imports
+    from opalg.compiler.ast_nodes import ImportStatementNode
+    interpreter = get_engine(engine)()
+    if quickening_stats:
+        from opalg.interpreter.quickening import QuickeningStats
+        interpreter.quickening_stats = QuickeningStats()
     try:
+        if any(isinstance(stmt, ImportStatementNode) for stmt in ast.statements):
+            load_imports(interpreter, filename, use_cache, lexer)
         interpreter.interpret(ast)
     except Exception as e:
         print(f"Runtime error: {e}")
         sys.exit(1)
+    finally:
+        if quickening_stats:
+            interpreter.quickening_stats.report(sys.stderr)
+
+
+def load_imports(interpreter, filename, use_cache=True, lexer=DEFAULT_LEXER):
+    """
+    Run the modules the program in `filename` imports on `interpreter`, imports first, and
+    mark them loaded for its import statements (as `opalg watch --run` does).
+    """
+    import contextlib
+    import io
+    from opalg.compiler.modules import ModuleGraph
+    from opalg.parser.ast_cache import parse_source
+
+    graph = ModuleGraph([filename], persistent=False)
+    *imported, main = graph.plan([filename])
+    for module in imported + [main]:
+        if module.error is not None:
+            raise Exception(module.error)
+        interpreter.modules.update(module.imports)
+        if module is main:
+            break
+        with open(module.path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        # The grammar actions print debugging output.
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = parse_source(module.path, source, use_cache, lexer)
+        interpreter.interpret(program)
+
+
+def main(argv=None):
+    """
+    CLI entry point for opalg. Usage:
+      poetry run opalg path/to/file.op
+    or
+      python cli.py path/to/file.op [--engine closure] [--startup-profile]
+    and, to parse and compile a whole project, once or on every change:
+      opalg build path/to/dir [--jobs N]
+      opalg watch path/to/dir [--run]
+    With OPALG_DAEMON=1, commands run in the background daemon (`opalg daemon start`) when
+    one is listening.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['daemon']:
+        from opalg import daemon
+        return daemon.main(argv[1:])
+    if os.environ.get('OPALG_DAEMON', '') not in ('', '0'):
+        from opalg import daemon
+        status = daemon.forward(argv) if daemon.client_enabled() else None
+        if status is not None:
+            sys.exit(status)
+    if argv[:1] == ['build']:
+        from opalg import build
+        return build.main(argv[1:])
+    if argv[:1] == ['watch']:
+        from opalg import watch
+        return watch.main(argv[1:])
+    args = build_arg_parser().parse_args(argv)
+
+    profiler = None
+    if args.startup_profile:
+        profiler = ImportProfiler()
+        profiler.install()
+    try:
+        run_file(args.file, args.engine, not args.no_cache, args.lexer, args.quickening_stats)
+    finally:
+        if profiler:
+            profiler.uninstall()
+            profiler.report(sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,495 @@
+# compiler/arena.py
+
+#
+# Flat (struct-of-arrays) representation of the AST.
+#
+# fenote: An Arena stores a whole program in a handful of parallel `array` columns instead
+#         of one Python object per node. A node is an integer id; for every id the arena
+#         keeps its kind (an index into LAYOUT), the offset of its operand record, and its
+#         source position (lineno, lexpos; -1 when unknown). The operand record holds one
+#         int per field of the node class, in LAYOUT order:
+#           NODE  - the id of the child node, or -1 for None
+#           LIST  - the offset of a [count, id, id, ...] block in the same operand column
+#           VALUE - an index into the literal pool (names, operators, literals, types, ...)
+#         Hashable pool values are interned, so a name used a thousand times is stored once.
+#
+# fenote: ArenaBuilder exposes one constructor per node class, under the class name and
+#         with the signature of its __init__, so code written against ast_nodes can build
+#         into an arena instead. ArenaParser runs the PLY grammar with the node class names
+#         in the grammar actions rebound to such a builder: the actions themselves are not
+#         changed and no node objects are created.
+#
+# fenote: Arena.view(id) returns a view: a small object whose class subclasses the real
+#         node class and reads (and writes) its fields from the arena columns. isinstance
+#         checks and the class-level dispatch of the Visitor passes see the node class, so
+#         Optimizer, SemanticAnalyzer, Resolver and Interpreter run on `arena.program`
+#         unchanged. Views are created on access and dropped by the caller; two views of
+#         the same node compare equal. Fields the resolver attaches to nodes are kept in
+#         `arena.notes`, keyed by field name and node id.
+#
+# fenote: Arenas only grow. Rewriting a field (as the Optimizer does) appends the new child
+#         or list and repoints the field; the old operands stay behind as garbage until the
+#         arena is dropped. Use Arena.tree() to turn (part of) an arena back into node objects.
+
+from array import array
+
+from opalg.compiler.ast_nodes import *
+
+NODE, LIST, VALUE = 'node', 'list', 'value'
+
+NONE = -1  # NODE operand and position column value for "no node" / "unknown"
+
+# node class -> its fields, in operand record order. A class's index is its kind.
+LAYOUT = (
+    (EmptyStatementNode, ()),
+    (ProgramNode, (('statements', LIST),)),
+    (BlockNode, (('statements', LIST),)),
+    (VariableDeclarationNode, (('name', VALUE), ('var_type', VALUE), ('value', NODE), ('const', VALUE))),
+    (ShowStatementNode, (('value', NODE),)),
+    (SaveStatementNode, (('identifier', VALUE), ('value', NODE))),
+    (DeleteStatementNode, (('identifier', VALUE),)),
+    (ReturnStatementNode, (('expression', NODE),)),
+    (ThrowStatementNode, (('expression', NODE),)),
+    (ExpressionStatementNode, (('expression', NODE),)),
+    (IfStatementNode, (('condition', NODE), ('then_block', NODE), ('else_block', NODE))),
+    (WhileStatementNode, (('condition', NODE), ('body', NODE))),
+    (ForStatementNode, (('iterator', NODE), ('iterable', NODE), ('body', NODE))),
+    (TryCatchFinallyNode, (('try_block', NODE), ('exception_var', NODE), ('catch_block', NODE),
+                           ('finally_block', NODE))),
+    (FunctionDeclarationNode, (('name', VALUE), ('parameters', LIST), ('return_type', VALUE), ('body', NODE),
+                               ('async_function', VALUE))),
+    (ParameterNode, (('name', VALUE), ('param_type', VALUE))),
+    (ClassDeclarationNode, (('name', VALUE), ('members', LIST))),
+    (ConnectStatementNode, (('db_url', VALUE), ('db_var', VALUE))),
+    (QueryStatementNode, (('db_var', VALUE), ('query_str', VALUE))),
+    (TransactionNode, (('db_var', VALUE), ('block', NODE), ('mode', VALUE))),
+    (QuantumDefineQubitNode, (('qubit_name', VALUE),)),
+    (QuantumApplyNode, (('gate', VALUE), ('qubits', LIST))),
+    (QuantumMeasureNode, (('var_name', VALUE), ('qubit_name', VALUE))),
+    (CryptoGenerateKeyNode, (('var_name', VALUE), ('key_type', VALUE), ('algorithm', VALUE), ('size', VALUE),
+                             ('db', VALUE))),
+    (CryptoDerivePublicKeyNode, (('var_name', VALUE), ('private_key_name', VALUE), ('operation', VALUE),
+                                 ('identifier', NODE))),
+    (CryptoEncryptNode, (('var_name', VALUE), ('data_expr', NODE), ('key_expr', NODE), ('algorithm', VALUE))),
+    (CryptoDecryptNode, (('var_name', VALUE), ('data_expr', NODE), ('key_expr', NODE), ('algorithm', VALUE))),
+    (CryptoHashNode, (('var_name', VALUE), ('data_expr', NODE), ('algorithm', VALUE))),
+    (CryptoSignNode, (('var_name', VALUE), ('data_expr', NODE), ('key_expr', NODE), ('algorithm', VALUE))),
+    (CryptoVerifyNode, (('var_name', VALUE), ('signature_expr', NODE), ('data_expr', NODE), ('key_expr', NODE),
+                        ('algorithm', VALUE))),
+    (JTMLElementNode, (('tag_name', VALUE), ('attributes', VALUE), ('content', LIST), ('jtml_cpp_ast', VALUE))),
+    (TextNode, (('value', VALUE),)),
+    (DynamicExpressionNode, (('expression', NODE),)),
+    (AwaitExpressionNode, (('expression', NODE),)),
+    (BinaryOperationNode, (('left', NODE), ('op', VALUE), ('right', NODE))),
+    (UnaryOperationNode, (('op', VALUE), ('operand', NODE))),
+    (NumberLiteralNode, (('value', VALUE),)),
+    (StringLiteralNode, (('value', VALUE),)),
+    (BoolLiteralNode, (('value', VALUE),)),
+    (IdentifierNode, (('name', VALUE),)),
+    (FunctionCallNode, (('function', NODE), ('arguments', LIST))),
+    (MemberAccessNode, (('obj', NODE), ('member', VALUE))),
+    (ImportStatementNode, (('path', VALUE),)),
+)
+
+KIND = {node_class: kind for kind, (node_class, _fields) in enumerate(LAYOUT)}
+
+
+class Arena:
+    """A program stored as parallel columns; nodes are integer ids."""
+
+    def __init__(self):
+        self.kind = array('B')       # node id -> index into LAYOUT
+        self.first = array('i')      # node id -> offset of its operand record
+        self.lineno = array('i')     # node id -> source line, or -1
+        self.lexpos = array('i')     # node id -> source offset, or -1
+        self.operands = array('i')   # operand records and list blocks
+        self.pool = []               # literal pool
+        self.interned = {}           # value type -> {value: pool index}
+        self.notes = {}              # resolver field name -> {node id: value}
+        self.root = NONE
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the columns (the literal pool is not included)."""
+        columns = (self.kind, self.first, self.lineno, self.lexpos, self.operands)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    @property
+    def program(self):
+        """A view of the root node."""
+        return self.view(self.root)
+
+    # ---------------------
+    # Building
+    # ---------------------
+
+    def add(self, node_class, values, lineno=None, lexpos=None):
+        """Append a node of `node_class` with field `values` (in LAYOUT order); return its id."""
+        kind = KIND[node_class]
+        record = []
+        for (_name, field), value in zip(LAYOUT[kind][1], values):
+            if field is NODE:
+                record.append(self.node_ref(value))
+            elif field is LIST:
+                record.append(self.add_list(value))
+            else:
+                record.append(self.intern(value))
+        node_id = len(self.kind)
+        self.kind.append(kind)
+        self.first.append(len(self.operands))
+        self.lineno.append(NONE if lineno is None else lineno)
+        self.lexpos.append(NONE if lexpos is None else lexpos)
+        self.operands.extend(record)
+        return node_id
+
+    def add_list(self, items):
+        ids = [self.node_ref(item) for item in items or ()]
+        offset = len(self.operands)
+        self.operands.append(len(ids))
+        self.operands.extend(ids)
+        return offset
+
+    def node_ref(self, value):
+        """The id for a NODE operand: a view of this arena, a node object (copied in), or None."""
+        if value is None:
+            return NONE
+        if isinstance(value, NodeView) and value.arena is self:
+            return value.node_id
+        return self.adopt(value)
+
+    def intern(self, value):
+        # One table per value type, so that 1, 1.0 and True get separate entries.
+        table = self.interned.get(type(value))
+        if table is None:
+            table = self.interned[type(value)] = {}
+        try:
+            index = table.get(value)
+        except TypeError:  # unhashable (e.g. a JTML attribute dict): never shared
+            self.pool.append(value)
+            return len(self.pool) - 1
+        if index is None:
+            index = table[value] = len(self.pool)
+            self.pool.append(value)
+        return index
+
+    def adopt(self, node):
+        """Copy a node object (or a view of another arena), and everything below it, in."""
+        node_class = getattr(node, 'node_class', type(node))  # views and quickened nodes
+        if node_class not in KIND:
+            raise Exception(f"{node_class.__name__} cannot be stored in an arena")
+        values = [getattr(node, name) for name, _field in LAYOUT[KIND[node_class]][1]]
+        node_id = self.add(node_class, values, node.lineno, node.lexpos)
+        for name in ANNOTATIONS[KIND[node_class]]:
+            value = getattr(node, name, None)
+            if value is not None:
+                self.notes.setdefault(name, {})[node_id] = value
+        return node_id
+
+    # ---------------------
+    # Reading
+    # ---------------------
+
+    def node_class(self, node_id):
+        return LAYOUT[self.kind[node_id]][0]
+
+    def field(self, node_id, name):
+        """The raw operand of field `name`: a node id, a list offset or a pool index."""
+        fields = LAYOUT[self.kind[node_id]][1]
+        for position, (field_name, _field) in enumerate(fields):
+            if field_name == name:
+                return self.operands[self.first[node_id] + position]
+        raise AttributeError(name)
+
+    def list_ids(self, offset):
+        count = self.operands[offset]
+        return self.operands[offset + 1:offset + 1 + count]
+
+    def children(self, node_id):
+        """Ids of the direct children of a node, in field order."""
+        kind = self.kind[node_id]
+        first = self.first[node_id]
+        for position, (_name, field) in enumerate(LAYOUT[kind][1]):
+            operand = self.operands[first + position]
+            if field is NODE:
+                if operand != NONE:
+                    yield operand
+            elif field is LIST:
+                yield from self.list_ids(operand)
+
+    def walk(self, node_id=None):
+        """Ids of a subtree in pre-order, without recursion."""
+        stack = [self.root if node_id is None else node_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(list(self.children(current))))
+
+    def view(self, node_id):
+        if node_id == NONE:
+            return None
+        view = object.__new__(VIEWS[self.kind[node_id]])
+        view.arena = self
+        view.node_id = node_id
+        return view
+
+    def tree(self, node_id=None):
+        """Materialize the subtree at `node_id` (default: the root) as node objects."""
+        node_id = self.root if node_id is None else node_id
+        if node_id == NONE:
+            return None
+        node_class, fields = LAYOUT[self.kind[node_id]]
+        node = node_class.__new__(node_class)
+        first = self.first[node_id]
+        for position, (name, field) in enumerate(fields):
+            operand = self.operands[first + position]
+            if field is NODE:
+                value = self.tree(operand)
+            elif field is LIST:
+                value = [self.tree(child) for child in self.list_ids(operand)]
+            else:
+                value = self.pool[operand]
+            setattr(node, name, value)
+        node.lineno = position_or_none(self.lineno[node_id])
+        node.lexpos = position_or_none(self.lexpos[node_id])
+        for name in ANNOTATIONS[KIND[node_class]]:
+            notes = self.notes.get(name)
+            if notes is not None and node_id in notes:
+                setattr(node, name, notes[node_id])
+        return node
+
+
+def position_or_none(value):
+    return None if value == NONE else value
+
+
+# ---------------------
+# Views
+# ---------------------
+
+class NodeView:
+    """
+    Mixin of the view classes: one per node class, built below. A view is (arena, node id)
+    and reads its fields from the arena on every access.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and other.arena is self.arena and other.node_id == self.node_id
+
+    def __hash__(self):
+        return hash((id(self.arena), self.node_id))
+
+
+class NodeListView:
+    """The children in a LIST field, as a read-only sequence of views."""
+    __slots__ = ('arena', 'offset')
+
+    def __init__(self, arena, offset):
+        self.arena = arena
+        self.offset = offset
+
+    def __len__(self):
+        return self.arena.operands[self.offset]
+
+    def __getitem__(self, index):
+        ids = self.arena.list_ids(self.offset)
+        if isinstance(index, slice):
+            return [self.arena.view(node_id) for node_id in ids[index]]
+        return self.arena.view(ids[index])
+
+    def __iter__(self):
+        view = self.arena.view
+        for node_id in self.arena.list_ids(self.offset):
+            yield view(node_id)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def field_property(position, field):
+    def get_node(self):
+        arena = self.arena
+        return arena.view(arena.operands[arena.first[self.node_id] + position])
+
+    def get_list(self):
+        arena = self.arena
+        return NodeListView(arena, arena.operands[arena.first[self.node_id] + position])
+
+    def get_value(self):
+        arena = self.arena
+        return arena.pool[arena.operands[arena.first[self.node_id] + position]]
+
+    def set_field(self, value):
+        arena = self.arena
+        if field is NODE:
+            operand = arena.node_ref(value)
+        elif field is LIST:
+            operand = arena.add_list(value)
+        else:
+            operand = arena.intern(value)
+        arena.operands[arena.first[self.node_id] + position] = operand
+
+    getter = {NODE: get_node, LIST: get_list, VALUE: get_value}[field]
+    return property(getter, set_field)
+
+
+def position_property(column):
+    def get_position(self):
+        return position_or_none(getattr(self.arena, column)[self.node_id])
+
+    def set_position(self, value):
+        getattr(self.arena, column)[self.node_id] = NONE if value is None else value
+
+    return property(get_position, set_position)
+
+
+def annotation_property(name):
+    def get_annotation(self):
+        try:
+            return self.arena.notes[name][self.node_id]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def set_annotation(self, value):
+        self.arena.notes.setdefault(name, {})[self.node_id] = value
+
+    return property(get_annotation, set_annotation)
+
+
+def slots_of(node_class):
+    return [name for klass in node_class.__mro__ for name in getattr(klass, '__slots__', ())]
+
+
+def make_view_class(node_class, fields, annotations):
+    namespace = {
+        '__slots__': ('arena', 'node_id'),
+        '__module__': __name__,
+        'node_class': node_class,
+        'lineno': position_property('lineno'),
+        'lexpos': position_property('lexpos'),
+    }
+    for position, (name, field) in enumerate(fields):
+        namespace[name] = field_property(position, field)
+    for name in annotations:
+        namespace[name] = annotation_property(name)
+    # Same name as the node class, so error messages read the same for both representations.
+    return type(node_class.__name__, (NodeView, node_class), namespace)
+
+
+def annotations_of(node_class, fields):
+    """Slots of a node class that are not LAYOUT fields: the ones passes attach (slot, scope, ...)."""
+    names = {name for name, _field in fields} | {'lineno', 'lexpos'}
+    return tuple(name for name in slots_of(node_class) if name not in names)
+
+
+# kind -> annotation slot names, kind -> view class
+ANNOTATIONS = tuple(annotations_of(node_class, fields) for node_class, fields in LAYOUT)
+VIEWS = tuple(
+    make_view_class(node_class, fields, ANNOTATIONS[kind])
+    for kind, (node_class, fields) in enumerate(LAYOUT)
+)
+
+
+# ---------------------
+# Building from the grammar
+# ---------------------
+
+class _Fields:
+    """Receives the attributes a node class's __init__ sets, in place of a node."""
+
+
+class NodeConstructor:
+    """Stands in for a node class: calling it builds the node into the builder's arena."""
+    __slots__ = ('builder', 'node_class', 'fields')
+
+    def __init__(self, builder, node_class):
+        self.builder = builder
+        self.node_class = node_class
+        self.fields = tuple(name for name, _field in LAYOUT[KIND[node_class]][1])
+
+    def __call__(self, *args, **kwargs):
+        # Run the class's own __init__ so defaults and derived fields (ForStatementNode's
+        # iterator, CryptoDerivePublicKeyNode's identifier) come out exactly as for objects.
+        record = _Fields()
+        self.node_class.__init__(record, *args, **kwargs)
+        values = [getattr(record, name) for name in self.fields]
+        arena = self.builder.arena
+        return arena.view(arena.add(self.node_class, values))
+
+    def __instancecheck__(self, instance):
+        return isinstance(instance, self.node_class)
+
+
+class ArenaBuilder:
+    """
+    One constructor per node class, named after the class:
+        builder.BinaryOperationNode(builder.IdentifierNode('x'), '+', builder.NumberLiteralNode(1))
+    Constructors return views; the nodes live in `builder.arena`.
+    """
+
+    def __init__(self, arena=None):
+        self.arena = arena if arena is not None else Arena()
+        for node_class, _fields in LAYOUT:
+            setattr(self, node_class.__name__, NodeConstructor(self, node_class))
+
+    def reset(self):
+        """Start a new arena (the previous one is left to its holders)."""
+        self.arena = Arena()
+        return self.arena
+
+    def finish(self, root):
+        self.arena.root = self.arena.node_ref(root)
+        return self.arena
+
+    def constructors(self):
+        return {node_class: getattr(self, node_class.__name__) for node_class, _fields in LAYOUT}
+
+
+class ArenaParser:
+    """
+    The opalg parser, building into an Arena. Shares the LALR tables of `lr_parser`
+    (default: opalg.parser.parser.parser); only the grammar actions are rebound.
+    """
+
+    def __init__(self, lr_parser=None):
+        import copy
+        import types
+        from opalg.parser import parser as parser_module
+
+        lr_parser = lr_parser if lr_parser is not None else parser_module.parser
+        self.builder = ArenaBuilder()
+        constructors = self.builder.constructors()
+        rebound_globals = {}
+
+        def rebind(action):
+            scope = action.__globals__
+            if id(scope) not in rebound_globals:
+                rebound_globals[id(scope)] = {
+                    name: constructors.get(value, value) if isinstance(value, type) else value
+                    for name, value in scope.items()
+                }
+            rebound = types.FunctionType(action.__code__, rebound_globals[id(scope)], action.__name__,
+                                         action.__defaults__, action.__closure__)
+            rebound.__doc__ = action.__doc__
+            return rebound
+
+        self.lr_parser = copy.copy(lr_parser)
+        self.lr_parser.productions = []
+        for production in lr_parser.productions:
+            production = copy.copy(production)
+            action = production.callable
+            if action is not None:
+                inner = getattr(action, '__wrapped__', action)
+                production.callable = rebind(inner)
+                if inner is not action:
+                    production.callable = parser_module.with_position(production.callable)
+            self.lr_parser.productions.append(production)
+
+    def parse(self, source, lexer=None):
+        """Parse `source` into a new Arena, rooted at its ProgramNode."""
+        self.builder.reset()
+        program = self.lr_parser.parse(source, lexer=lexer)
+        return self.builder.finish(program)
@@ -26,13 +26,23 @@
 
 from opalg.opalg_types.node_types import *
 
-class Node:
-    """Base class for all AST nodes."""
+class Node(Positioned):
+    """
+    Base class for all AST nodes.
+
+    fenote: Nodes are slotted: every subclass lists its fields in __slots__ (plus the
+            lineno/lexpos source position inherited from Positioned), so an AST carries
+            no per-node __dict__. Attributes outside __slots__ cannot be added.
+    """
+    __slots__ = ()
+
     def to_dict(self):
         raise NotImplementedError("to_dict method not implemented for base ASTNode.")
 
 class EmptyStatementNode(Node):
     """Represents an empty statement (a standalone backslash)."""
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -43,6 +53,9 @@ class ProgramNode(Node):
     
     fenote: The root of the AST. Contains a list of statements at the top-level scope.
     """
+    __slots__ = ('statements',)
+    __slots__ += ('scope',)  # set by the resolver
+
     def __init__(self, statements):
         self.statements = statements  # list of Node
 
@@ -58,6 +71,8 @@ class BlockNode(Node):
     
     fenote: Represents a grouped sequence of statements, such as those inside a function, if-then block, etc.
     """
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements  # list of Node
 
@@ -76,6 +91,9 @@ class VariableDeclarationNode(Node):
     
     fenote: Declares a named variable with an optional type and initial value.
     """
+    __slots__ = ('name', 'var_type', 'value', 'const')
+    __slots__ += ('slot',)  # set by the resolver
+
     def __init__(self, name, var_type, value, const=False):
         self.name = name            # str
         self.var_type = var_type    # TypeNode or None
@@ -96,6 +114,8 @@ class ShowStatementNode(Node):
     
     fenote: Outputs the value of an expression to the console or another medium.
     """
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value  # ExpressionNode
         
@@ -113,6 +133,8 @@ class SaveStatementNode(Node):
     
     fenote: Saves the value of an expression into a persistent store, keyed by the identifier.
     """
+    __slots__ = ('identifier', 'value')
+
     def __init__(self, identifier, value):
         self.identifier = identifier  # str
         self.value = value            # ExpressionNode
@@ -129,6 +151,8 @@ class DeleteStatementNode(Node):
     
     fenote: Removes a previously saved variable or resource identified by the given identifier.
     """
+    __slots__ = ('identifier',)
+
     def __init__(self, identifier):
         self.identifier = identifier  # str
 
@@ -138,11 +162,31 @@ class DeleteStatementNode(Node):
             "identifier": self.identifier
         }
 
+class ImportStatementNode(Node):
+    """import "<path>"\\
+    
+    fenote: Makes the top-level names of another module visible. The path is relative to the
+            importing file; see compiler/modules.py.
+    """
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path  # str
+
+    def to_dict(self):
+        return {
+            "type": "ImportStatement",
+            "path": self.path
+        }
+
 class ReturnStatementNode(Node):
     """return [expression]\\
     
     fenote: Returns from the current function call, optionally with a result value.
     """
+    __slots__ = ('expression',)
+    __slots__ += ('tail',)  # set by the resolver
+
     def __init__(self, expression):
         self.expression = expression  # ExpressionNode or None
     
@@ -160,6 +204,8 @@ class ThrowStatementNode(Node):
     
     fenote: Throws an exception or error represented by the given expression.
     """
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression  # ExpressionNode
 
@@ -176,6 +222,8 @@ class ExpressionStatementNode(Node):
     
     fenote: Allows a standalone expression (like x = y+2) to form a statement.
     """
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression  # ExpressionNode
 
@@ -197,6 +245,9 @@ class IfStatementNode(Node):
     fenote: A conditional branching node. Executes then_block if condition is true,
             else executes else_block if present.
     """
+    __slots__ = ('condition', 'then_block', 'else_block')
+    __slots__ += ('then_scope', 'else_scope')  # set by the resolver
+
     def __init__(self, condition, then_block, else_block=None):
         self.condition = condition    # ExpressionNode
         self.then_block = then_block  # BlockNode
@@ -216,6 +267,9 @@ class WhileStatementNode(Node):
     
     fenote: A loop node that repeats body while condition is true.
     """
+    __slots__ = ('condition', 'body')
+    __slots__ += ('body_scope',)  # set by the resolver
+
     def __init__(self, condition, body):
         self.condition = condition  # ExpressionNode
         self.body = body            # BlockNode
@@ -235,6 +289,9 @@ class ForStatementNode(Node):
     
     fenote: A loop node that iterates over an iterable expression, binding each element to the iterator variable.
     """
+    __slots__ = ('iterator', 'iterable', 'body')
+    __slots__ += ('slot', 'body_scope')  # set by the resolver
+
     def __init__(self, iterator_name, iterable_expr, body):
         self.iterator = IdentifierNode(iterator_name) # tests expect an IdentifierNode
         self.iterable = iterable_expr                 # ExpressionNode
@@ -261,6 +318,9 @@ class TryCatchFinallyNode(Node):
     
     fenote: Error handling construct with optional catch and finally blocks.
     """
+    __slots__ = ('try_block', 'exception_var', 'catch_block', 'finally_block')
+    __slots__ += ('try_scope', 'catch_scope', 'finally_scope', 'exception_slot')  # set by the resolver
+
     def __init__(self, try_block, exception_var, catch_block, finally_block):
         self.try_block = try_block          # BlockNode
         self.exception_var = exception_var  # IdentifierNode or None
@@ -285,6 +345,9 @@ class FunctionDeclarationNode(Node):
     
     fenote: Defines a named function or an async function with parameters, return type, and a body.
     """
+    __slots__ = ('name', 'parameters', 'return_type', 'body', 'async_function')
+    __slots__ += ('scope', 'param_slots')  # set by the resolver
+
     def __init__(self, name, parameters, return_type, body, async_function=False):
         self.name = name                # str
         self.parameters = parameters    # list of ParameterNode
@@ -307,6 +370,8 @@ class ParameterNode(Node):
     
     fenote: Declares one parameter of a function.
     """
+    __slots__ = ('name', 'param_type')
+
     def __init__(self, name, param_type):
         self.name = name        # str
         self.param_type = param_type # TypeNode or primitive
@@ -324,6 +389,8 @@ class ClassDeclarationNode(Node):
     
     fenote: Declares a class with members (fields, methods).
     """
+    __slots__ = ('name', 'members')
+
     def __init__(self, name, members):
         self.name = name       # str
         self.members = members # list of Node
@@ -340,6 +407,8 @@ class ConnectStatementNode(Node):
     
     fenote: Establishes a connection to a database and assigns it to a variable.
     """
+    __slots__ = ('db_url', 'db_var')
+
     def __init__(self, db_url, db_var):
         self.db_url = db_url  # str
         self.db_var = db_var  # str
@@ -356,6 +425,8 @@ class QueryStatementNode(Node):
     
     fenote: Executes a database query on a previously connected database.
     """
+    __slots__ = ('db_var', 'query_str')
+
     def __init__(self, db_var, query_str):
         self.db_var = db_var
         self.query_str = query_str
@@ -374,6 +445,8 @@ class TransactionNode(Node):
     
     fenote: A transactional block of statements executed on a database connection, ending with commit or rollback.
     """
+    __slots__ = ('db_var', 'block', 'mode')
+
     def __init__(self, db_var, block, mode):
         self.db_var = db_var   # str
         self.block = block     # BlockNode
@@ -392,6 +465,8 @@ class QuantumDefineQubitNode(Node):
     
     fenote: Declares a quantum qubit variable.
     """
+    __slots__ = ('qubit_name',)
+
     def __init__(self, qubit_name):
         self.qubit_name = qubit_name
 
@@ -406,6 +481,8 @@ class QuantumApplyNode(Node):
     
     fenote: Applies a quantum gate to one or more qubits.
     """
+    __slots__ = ('gate', 'qubits')
+
     def __init__(self, gate, qubits):
         self.gate = gate       # str
         self.qubits = qubits   # list of IdentifierNode
@@ -422,6 +499,8 @@ class QuantumMeasureNode(Node):
     
     fenote: Measures a qubit and assigns its classical result to a variable.
     """
+    __slots__ = ('var_name', 'qubit_name')
+
     def __init__(self, var_name, qubit_name):
         self.var_name = var_name
         self.qubit_name = qubit_name
@@ -439,6 +518,8 @@ class CryptoGenerateKeyNode(Node):
     
     fenote: Generates a cryptographic key with given parameters.
     """
+    __slots__ = ('var_name', 'key_type', 'algorithm', 'size', 'db')
+
     def __init__(self, var_name, key_type, algorithm=None, size=None, db=None):
         self.var_name = var_name
         self.key_type = key_type
@@ -462,6 +543,8 @@ class CryptoDerivePublicKeyNode(Node):
     
     fenote: Derives a public key from a private key.
     """
+    __slots__ = ('var_name', 'private_key_name', 'operation', 'identifier')
+
     def __init__(self, var_name, private_key_name):
         self.var_name = var_name
         self.private_key_name = private_key_name
@@ -483,6 +566,8 @@ class CryptoEncryptNode(Node):
     
     fenote: Encrypts data using a given key and algorithm.
     """
+    __slots__ = ('var_name', 'data_expr', 'key_expr', 'algorithm')
+
     def __init__(self, var_name, data_expr, key_expr, algorithm):
         self.var_name = var_name
         self.data_expr = data_expr
@@ -504,6 +589,8 @@ class CryptoDecryptNode(Node):
     
     fenote: Decrypts data using a given key and algorithm.
     """
+    __slots__ = ('var_name', 'data_expr', 'key_expr', 'algorithm')
+
     def __init__(self, var_name, data_expr, key_expr, algorithm):
         self.var_name = var_name
         self.data_expr = data_expr
@@ -525,6 +612,8 @@ class CryptoHashNode(Node):
     
     fenote: Hashes data using the specified algorithm.
     """
+    __slots__ = ('var_name', 'data_expr', 'algorithm')
+
     def __init__(self, var_name, data_expr, algorithm):
         self.var_name = var_name
         self.data_expr = data_expr
@@ -544,6 +633,8 @@ class CryptoSignNode(Node):
     
     fenote: Signs data using a key and a hashing algorithm.
     """
+    __slots__ = ('var_name', 'data_expr', 'key_expr', 'algorithm')
+
     def __init__(self, var_name, data_expr, key_expr, algorithm):
         self.var_name = var_name
         self.data_expr = data_expr
@@ -565,6 +656,8 @@ class CryptoVerifyNode(Node):
     
     fenote: Verifies a signature for given data and key using a specified algorithm.
     """
+    __slots__ = ('var_name', 'signature_expr', 'data_expr', 'key_expr', 'algorithm')
+
     def __init__(self, var_name, signature_expr, data_expr, key_expr, algorithm):
         self.var_name = var_name
         self.signature_expr = signature_expr
@@ -583,6 +676,8 @@ class CryptoVerifyNode(Node):
         }
 
 class JTMLElementNode(Node):
+    __slots__ = ('tag_name', 'attributes', 'content', 'jtml_cpp_ast')
+
     def __init__(self, tag_name, attributes, content, jtml_cpp_ast=None):
         self.tag_name = tag_name
         self.attributes = attributes
@@ -601,6 +696,8 @@ class TextNode(Node):
     """
     Represents plain static text within a JTML element.
     """
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value  # str
         
@@ -616,6 +713,8 @@ class DynamicExpressionNode(Node):
     
     fenote: Replaces dynamic placeholders with evaluated values at runtime.
     """
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression  # Typically an IdentifierNode or more complex expression
     
@@ -630,6 +729,8 @@ class AwaitExpressionNode(Node):
     
     fenote: Represents an asynchronous wait on a promise or future.
     """
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -641,6 +742,8 @@ class AwaitExpressionNode(Node):
 
 class ExpressionNode(Node):
     """Base class for all expressions."""
+    __slots__ = ()
+
     def to_dict(self):
         raise NotImplementedError("to_dict method not implemented for ExpressionNode.")
 
@@ -649,6 +752,10 @@ class BinaryOperationNode(ExpressionNode):
     
     fenote: A binary operation (e.g. +, -, *, /, <, >, ==) on two operand expressions.
     """
+    __slots__ = ('left', 'op', 'right')
+    __slots__ += ('observed',)       # evaluations seen by the tree-walker: reset by the resolver
+    __slots__ += ('operand_types',)  # set by the semantic analyzer
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -667,6 +774,8 @@ class UnaryOperationNode(ExpressionNode):
     
     fenote: A unary operation (e.g. -x, !x) on a single operand.
     """
+    __slots__ = ('op', 'operand')
+
     def __init__(self, op, operand):
         self.op = op
         self.operand = operand
@@ -680,6 +789,8 @@ class UnaryOperationNode(ExpressionNode):
 
 class NumberLiteralNode(ExpressionNode):
     """A numeric literal (int or float)."""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -691,6 +802,8 @@ class NumberLiteralNode(ExpressionNode):
 
 class StringLiteralNode(ExpressionNode):
     """A string literal."""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -702,6 +815,8 @@ class StringLiteralNode(ExpressionNode):
 
 class BoolLiteralNode(ExpressionNode):
     """A boolean literal: true or false."""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -713,6 +828,9 @@ class BoolLiteralNode(ExpressionNode):
 
 class IdentifierNode(ExpressionNode):
     """An identifier referencing a variable, function, or object property."""
+    __slots__ = ('name',)
+    __slots__ += ('address',)  # set by the resolver
+
     def __init__(self, name):
         self.name = name
 
@@ -724,6 +842,9 @@ class IdentifierNode(ExpressionNode):
 
 class FunctionCallNode(ExpressionNode):
     """function(args...) or obj.method(args...)"""
+    __slots__ = ('function', 'arguments')
+    __slots__ += ('target',)  # call-site cache: reset by the resolver, filled by the interpreter
+
     def __init__(self, function, arguments):
         self.function = function
         self.arguments = arguments
@@ -740,6 +861,8 @@ class MemberAccessNode(ExpressionNode):
     
     fenote: Accesses a property or method of an object.
     """
+    __slots__ = ('obj', 'member')
+
     def __init__(self, obj, member):
         self.obj = obj
         self.member = member
@@ -0,0 +1,435 @@
+# compiler/bytecode.py
+
+#
+# Compact bytecode for opalg programs and the compiler that emits it from the AST.
+#
+# fenote: A CodeObject holds a flat array('i') of fixed-width instructions, each an
+#         (opcode, argument) pair, plus a constant pool and a name table that the
+#         arguments index into. Jump arguments are absolute offsets into the array.
+#
+# fenote: Control flow is lowered to jumps: if/while/for become conditional and
+#         unconditional jumps, try/catch/finally registers a handler offset with
+#         SETUP_TRY, and `finally` blocks are duplicated on every path that leaves the
+#         protected region (normal exit, exception, return). Block scopes are explicit
+#         ENTER_SCOPE/EXIT_SCOPE instructions so the VM keeps the scoping rules of the
+#         tree-walking interpreter.
+#
+# fenote: The program must have been through the Resolver. Variables are frame slots:
+#         LOAD_LOCAL/LOAD_PARENT index the current or enclosing frame directly, and
+#         LOAD_VAR/ASSIGN_VAR carry a full resolver address for everything else. A loop
+#         allocates its body frame once (NEW_FRAME) and re-enters it on every iteration
+#         (ENTER_FRAME), which clears it if the body declares anything.
+#
+# fenote: Each FunctionDeclarationNode compiles to its own FunctionCode. Statements and
+#         expressions the compiler does not lower are stored as constants and handed to
+#         the tree-walker at run time (EXEC_NODE / EVAL_NODE). A `return f(...)` the resolver
+#         marked as a tail call ends in TAIL_CALL, which runs `f` in place of the returning
+#         function's frame instead of on top of it.
+
+from array import array
+
+from opalg.compiler.ast_nodes import *
+from opalg.compiler.visitor import Visitor
+
+# Opcodes. Every instruction is two ints wide: [opcode, argument].
+LOAD_CONST = 0       # push consts[arg]
+LOAD_VAR = 1         # push env.lookup(*consts[arg]), consts[arg] being (address, name)
+STORE_LOCAL = 2      # env.slots[arg] = pop()
+ASSIGN_VAR = 3       # env.store(*consts[arg], top) (value stays on the stack)
+BINARY_OP = 4        # right = pop(); left = pop(); push (left BINARY_OPERATORS[arg] right)
+UNARY_OP = 5         # push (UNARY_OPERATORS[arg] pop())
+POP_TOP = 6          # discard top of stack
+JUMP = 7             # pc = arg
+JUMP_IF_FALSE = 8    # if not pop(): pc = arg
+SHOW = 9             # print(pop())
+ENTER_SCOPE = 10     # env = Environment(env, consts[arg])
+EXIT_SCOPE = 11      # env = env.parent
+GET_ITER = 12        # push iter(pop())
+FOR_ITER = 13        # push next(top), or pop the iterator and jump to arg when exhausted
+LOAD_FUNCTION = 14   # push the function named names[arg]
+CALL_FUNCTION = 15   # call with arg positional arguments; the function sits below them
+RETURN_VALUE = 16    # return pop() to the caller
+MAKE_FUNCTION = 17   # register the FunctionCode in consts[arg]
+THROW = 18           # raise ThrowException(pop())
+SETUP_TRY = 19       # push an exception handler starting at arg
+POP_TRY = 20         # pop the innermost exception handler
+STORE_ERROR = 21     # bind the caught exception (top) to env.slots[arg] as seen by `catch`, keep it on the stack
+RERAISE = 22         # raise pop() again
+EXEC_NODE = 23       # tree-walker: execute(consts[arg], env)
+EVAL_NODE = 24       # tree-walker: push evaluate(consts[arg], env)
+HALT = 25            # end of program
+LOAD_LOCAL = 26      # push env.slots[arg]
+LOAD_PARENT = 27     # push env.parent.slots[arg]
+ASSIGN_LOCAL = 28    # env.slots[arg] = top (value stays on the stack)
+ASSIGN_PARENT = 29   # env.parent.slots[arg] = top (value stays on the stack)
+NEW_FRAME = 30       # push Environment(env, consts[arg]) for a loop body
+ENTER_FRAME = 31     # env = stack[-arg], cleared for the next iteration
+TAIL_CALL = 32       # like CALL_FUNCTION, but the callee replaces the current call
+
+OPCODE_NAMES = {value: name for name, value in globals().items() if name.isupper() and isinstance(value, int)}
+
+# Operator tables shared with the VM. BINARY_OP/UNARY_OP arguments index into these.
+BINARY_OPERATORS = ('+', '-', '*', '/', '&&', '||', '==', '!=', '<', '>', '<=', '>=')
+UNARY_OPERATORS = ('!', '-')
+
+JUMP_OPCODES = (JUMP, JUMP_IF_FALSE, FOR_ITER, SETUP_TRY)
+
+
+class CodeObject:
+    """A compiled instruction sequence with its constant pool and name table."""
+    def __init__(self, name, code, consts, names):
+        self.name = name
+        self.code = code      # array('i') of [opcode, argument] pairs
+        self.consts = consts  # tuple
+        self.names = names    # tuple of str
+        # List copy used by the VM's dispatch loop: indexing a list is cheaper than an array.
+        self.ops = code.tolist()
+
+    def __len__(self):
+        return len(self.code) // 2
+
+
+class FunctionCode:
+    """A compiled FunctionDeclarationNode."""
+    def __init__(self, name, param_names, code, node=None):
+        self.name = name
+        self.param_names = param_names  # tuple of str
+        self.code = code                # CodeObject
+        self.node = node
+        self.scope = node.scope if node is not None else None
+        self.param_slots = node.param_slots if node is not None else tuple(range(len(param_names)))
+
+
+class _TryContext:
+    def __init__(self, finally_block, finally_scope, depth):
+        self.finally_block = finally_block  # list of statements or None
+        self.finally_scope = finally_scope
+        self.depth = depth                  # scope depth of the try statement
+        self.handler = False                # is a SETUP_TRY handler active here?
+
+
+class BytecodeCompiler(Visitor):
+    """Lowers a ProgramNode (or a function body) into a CodeObject."""
+    dispatch = {
+        '_compile_table': ('compile_', 'generic_compile'),
+        '_compile_expr_table': ('compile_expr_', 'generic_compile_expression'),
+    }
+
+    def __init__(self, name='<program>'):
+        self.name = name
+        self.code = array('i')
+        self.consts = []
+        self.const_index = {}
+        self.names = []
+        self.name_index = {}
+        self.scope_depth = 0
+        self.try_stack = []
+
+    # ---------------------
+    # Entry points
+    # ---------------------
+
+    @classmethod
+    def compile_program(cls, node):
+        compiler = cls('<program>')
+        compiler.compile_statements(node.statements)
+        compiler.emit(HALT)
+        return compiler.finish()
+
+    @classmethod
+    def compile_function(cls, node):
+        compiler = cls(node.name)
+        compiler.compile_statements(node.body.statements)
+        compiler.emit(LOAD_CONST, compiler.add_const(None))
+        compiler.emit(RETURN_VALUE)
+        param_names = tuple(param.name for param in node.parameters)
+        return FunctionCode(node.name, param_names, compiler.finish(), node)
+
+    def finish(self):
+        return CodeObject(self.name, self.code, tuple(self.consts), tuple(self.names))
+
+    # ---------------------
+    # Emission helpers
+    # ---------------------
+
+    def emit(self, opcode, arg=0):
+        self.code.append(opcode)
+        self.code.append(arg)
+        return len(self.code) - 2
+
+    def offset(self):
+        return len(self.code)
+
+    def patch(self, position, target=None):
+        self.code[position + 1] = self.offset() if target is None else target
+
+    def add_const(self, value):
+        # Key on the type too so that 1, 1.0 and True stay distinct constants.
+        try:
+            key = (type(value), value)
+            hash(key)
+        except TypeError:
+            key = (type(value), id(value))
+        if key not in self.const_index:
+            self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self.const_index[key]
+
+    def add_name(self, name):
+        if name not in self.name_index:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return self.name_index[name]
+
+    # ---------------------
+    # Statements
+    # ---------------------
+
+    def compile_statements(self, statements):
+        for stmt in statements:
+            self.compile(stmt)
+
+    def compile_scoped_block(self, statements, scope):
+        self.emit(ENTER_SCOPE, self.add_const(scope))
+        self.scope_depth += 1
+        self.compile_statements(statements)
+        self.scope_depth -= 1
+        self.emit(EXIT_SCOPE)
+
+    def compile(self, node):
+        self._compile_table[type(node)](self, node)
+
+    def generic_compile(self, node):
+        self.emit(EXEC_NODE, self.add_const(node))
+
+    def compile_VariableDeclarationNode(self, node):
+        self.compile_expression(node.value)
+        self.emit(STORE_LOCAL, node.slot)
+
+    def compile_FunctionDeclarationNode(self, node):
+        self.emit(MAKE_FUNCTION, self.add_const(BytecodeCompiler.compile_function(node)))
+
+    def compile_ShowStatementNode(self, node):
+        self.compile_expression(node.value)
+        self.emit(SHOW)
+
+    def compile_ExpressionStatementNode(self, node):
+        self.compile_expression(node.expression)
+        self.emit(POP_TOP)
+
+    def compile_ReturnStatementNode(self, node):
+        if node.tail:
+            # Outside any try statement (see the resolver): nothing to leave first.
+            call = node.expression
+            self.emit(LOAD_FUNCTION, self.add_name(call.function.name))
+            for arg in call.arguments:
+                self.compile_expression(arg)
+            self.emit(TAIL_CALL, len(call.arguments))
+            return
+        if node.expression:
+            self.compile_expression(node.expression)
+        else:
+            self.emit(LOAD_CONST, self.add_const(None))
+        # Leave every enclosing try: drop its handler and run its finally block.
+        saved_stack, saved_depth = self.try_stack, self.scope_depth
+        depth = self.scope_depth
+        for index in range(len(saved_stack) - 1, -1, -1):
+            context = saved_stack[index]
+            if context.handler:
+                self.emit(POP_TRY)
+            if context.finally_block is not None:
+                for _ in range(depth - context.depth):
+                    self.emit(EXIT_SCOPE)
+                depth = context.depth
+                self.try_stack, self.scope_depth = saved_stack[:index], depth
+                self.compile_scoped_block(context.finally_block, context.finally_scope)
+        self.try_stack, self.scope_depth = saved_stack, saved_depth
+        self.emit(RETURN_VALUE)
+
+    def compile_ThrowStatementNode(self, node):
+        self.compile_expression(node.expression)
+        self.emit(THROW)
+
+    def compile_IfStatementNode(self, node):
+        self.compile_expression(node.condition)
+        jump_to_else = self.emit(JUMP_IF_FALSE)
+        self.compile_scoped_block(node.then_block.statements, node.then_scope)
+        if node.else_block:
+            jump_to_end = self.emit(JUMP)
+            self.patch(jump_to_else)
+            self.compile_scoped_block(node.else_block.statements, node.else_scope)
+            self.patch(jump_to_end)
+        else:
+            self.patch(jump_to_else)
+
+    def compile_loop_body(self, node, frame_distance):
+        self.emit(ENTER_FRAME, frame_distance)
+        self.scope_depth += 1
+        self.compile_statements(node.body.statements)
+        self.scope_depth -= 1
+        self.emit(EXIT_SCOPE)
+
+    def compile_WhileStatementNode(self, node):
+        self.emit(NEW_FRAME, self.add_const(node.body_scope))
+        loop_start = self.offset()
+        self.compile_expression(node.condition)
+        jump_to_end = self.emit(JUMP_IF_FALSE)
+        self.compile_loop_body(node, 1)
+        self.emit(JUMP, loop_start)
+        self.patch(jump_to_end)
+        self.emit(POP_TOP)
+
+    def compile_ForStatementNode(self, node):
+        self.emit(NEW_FRAME, self.add_const(node.body_scope))
+        self.compile_expression(node.iterable)
+        self.emit(GET_ITER)
+        loop_start = self.emit(FOR_ITER)
+        self.emit(STORE_LOCAL, node.slot)
+        self.compile_loop_body(node, 2)
+        self.emit(JUMP, loop_start)
+        self.patch(loop_start)
+        self.emit(POP_TOP)
+
+    def compile_TryCatchFinallyNode(self, node):
+        finally_statements = node.finally_block.statements if node.finally_block else None
+        if not node.catch_block and finally_statements is None:
+            # No handler: errors propagate exactly as if the try were a plain block.
+            self.compile_scoped_block(node.try_block.statements, node.try_scope)
+            return
+
+        context = _TryContext(finally_statements, node.finally_scope, self.scope_depth)
+        self.try_stack.append(context)
+
+        handler = self.emit(SETUP_TRY)
+        context.handler = True
+        self.compile_scoped_block(node.try_block.statements, node.try_scope)
+        self.emit(POP_TRY)
+        context.handler = False
+        jumps_to_finally = [self.emit(JUMP)]
+
+        if node.catch_block:
+            # Exception object on the stack; the VM already dropped the try handler.
+            self.patch(handler)
+            if finally_statements is not None:
+                handler = self.emit(SETUP_TRY)
+                context.handler = True
+            self.emit(ENTER_SCOPE, self.add_const(node.catch_scope))
+            self.scope_depth += 1
+            if node.exception_var:
+                self.emit(STORE_ERROR, node.exception_slot)
+            self.emit(POP_TOP)
+            self.compile_statements(node.catch_block.statements)
+            self.scope_depth -= 1
+            self.emit(EXIT_SCOPE)
+            if finally_statements is not None:
+                self.emit(POP_TRY)
+                context.handler = False
+            jumps_to_finally.append(self.emit(JUMP))
+
+        self.try_stack.pop()
+        if finally_statements is None:
+            for jump in jumps_to_finally:
+                self.patch(jump)
+            return
+
+        # Exceptional path: run finally, then re-raise the pending exception.
+        self.patch(handler)
+        self.compile_scoped_block(finally_statements, node.finally_scope)
+        self.emit(RERAISE)
+
+        # Normal path.
+        for jump in jumps_to_finally:
+            self.patch(jump)
+        self.compile_scoped_block(finally_statements, node.finally_scope)
+
+    # --------------------
+    # Expressions
+    # --------------------
+
+    def compile_expression(self, expr):
+        self._compile_expr_table[type(expr)](self, expr)
+
+    def generic_compile_expression(self, expr):
+        self.emit(EVAL_NODE, self.add_const(expr))
+
+    def compile_literal(self, expr):
+        self.emit(LOAD_CONST, self.add_const(expr.value))
+
+    compile_expr_NumberLiteralNode = compile_literal
+    compile_expr_StringLiteralNode = compile_literal
+    compile_expr_BoolLiteralNode = compile_literal
+
+    def compile_expr_IdentifierNode(self, expr):
+        self.compile_variable(expr, LOAD_LOCAL, LOAD_PARENT, LOAD_VAR)
+
+    def compile_variable(self, target, local_op, parent_op, general_op):
+        address = target.address
+        if len(address) == 1 and address[0][0] <= 1:
+            depth, index = address[0]
+            self.emit(parent_op if depth else local_op, index)
+        else:
+            self.emit(general_op, self.add_const((address, target.name)))
+
+    def compile_expr_BinaryOperationNode(self, expr):
+        if expr.op == '=':
+            self.compile_expression(expr.right)
+            self.compile_variable(expr.left, ASSIGN_LOCAL, ASSIGN_PARENT, ASSIGN_VAR)
+        elif expr.op == '+=':
+            self.compile_expression(expr.left)
+            self.compile_expression(expr.right)
+            self.emit(BINARY_OP, BINARY_OPERATORS.index('+'))
+            self.compile_variable(expr.left, ASSIGN_LOCAL, ASSIGN_PARENT, ASSIGN_VAR)
+        elif expr.op in BINARY_OPERATORS:
+            self.compile_expression(expr.left)
+            self.compile_expression(expr.right)
+            self.emit(BINARY_OP, BINARY_OPERATORS.index(expr.op))
+        else:
+            self.generic_compile_expression(expr)
+
+    def compile_expr_UnaryOperationNode(self, expr):
+        if expr.op not in UNARY_OPERATORS:
+            self.generic_compile_expression(expr)
+            return
+        self.compile_expression(expr.operand)
+        self.emit(UNARY_OP, UNARY_OPERATORS.index(expr.op))
+
+    def compile_expr_FunctionCallNode(self, expr):
+        name = expr.function.name if isinstance(expr.function, IdentifierNode) else None
+        self.emit(LOAD_FUNCTION, self.add_name(name))
+        for arg in expr.arguments:
+            self.compile_expression(arg)
+        self.emit(CALL_FUNCTION, len(expr.arguments))
+
+
+def disassemble(code_object):
+    """Human-readable listing of a CodeObject, one instruction per line."""
+    lines = []
+    code = code_object.code
+    for position in range(0, len(code), 2):
+        opcode, arg = code[position], code[position + 1]
+        name = OPCODE_NAMES.get(opcode, f'<{opcode}>')
+        if opcode == LOAD_FUNCTION:
+            detail = f'{arg} ({code_object.names[arg]})'
+        elif opcode in (LOAD_VAR, ASSIGN_VAR):
+            address, var_name = code_object.consts[arg]
+            detail = f'{arg} ({var_name} @ {list(address)})'
+        elif opcode in (LOAD_LOCAL, LOAD_PARENT, ASSIGN_LOCAL, ASSIGN_PARENT, STORE_LOCAL, STORE_ERROR, ENTER_FRAME):
+            detail = f'{arg}'
+        elif opcode in (ENTER_SCOPE, NEW_FRAME):
+            detail = f'{arg} ({code_object.consts[arg]!r})'
+        elif opcode == LOAD_CONST:
+            detail = f'{arg} ({code_object.consts[arg]!r})'
+        elif opcode in (MAKE_FUNCTION, EXEC_NODE, EVAL_NODE):
+            detail = f'{arg} ({type(code_object.consts[arg]).__name__})'
+        elif opcode == BINARY_OP:
+            detail = f'{arg} ({BINARY_OPERATORS[arg]})'
+        elif opcode == UNARY_OP:
+            detail = f'{arg} ({UNARY_OPERATORS[arg]})'
+        elif opcode == CALL_FUNCTION:
+            detail = f'{arg}'
+        elif opcode in JUMP_OPCODES:
+            detail = f'-> {arg}'
+        else:
+            detail = ''
+        lines.append(f'{position:6d} {name:<14} {detail}'.rstrip())
+    return '\n'.join(lines)
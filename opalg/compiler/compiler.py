@@ -6,8 +6,9 @@ from opalg.compiler.semantic_analyzer import SemanticAnalyzer
 from opalg.interpreter.code_generator import CodeGenerator
 
 class Compiler:
-    def __init__(self):
-        self.semantic_analyzer = SemanticAnalyzer()
+    def __init__(self, modules=None):
+        # modules: import path -> symbols exported by that module (see compiler/modules.py)
+        self.semantic_analyzer = SemanticAnalyzer(modules)
         self.ir = IntermediateRepresentation()
         self.code_generator = CodeGenerator()
     
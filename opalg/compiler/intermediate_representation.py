@@ -1,15 +1,16 @@
 # compiler/intermediate_representation.py
 
 from opalg.compiler.ast_nodes import *
+from opalg.compiler.visitor import Visitor
+
+class IntermediateRepresentation(Visitor):
+    dispatch = {'_ir_table': ('ir_', 'generic_ir')}
 
-class IntermediateRepresentation:
     def __init__(self):
         self.instructions = []
     
     def generate(self, node):
-        method_name = f'ir_{type(node).__name__}'
-        generator = getattr(self, method_name, self.generic_ir)
-        generator(node)
+        self._ir_table[type(node)](self, node)
     
     def generic_ir(self, node):
         raise NotImplementedError(f'No IR generator for {type(node).__name__}')
@@ -29,6 +30,9 @@ class IntermediateRepresentation:
             self.generate(stmt)
         self.instructions.append(('FUNC_END', node.name))
     
+    def ir_ImportStatementNode(self, node):
+        self.instructions.append(('IMPORT', node.path))
+    
     def ir_ReturnStatementNode(self, node):
         self.instructions.append(('RETURN', node.expression))
     
@@ -0,0 +1,233 @@
+# compiler/modules.py
+
+#
+# Modules (`import "path"`) and the build graph that decides which of them to compile.
+#
+# fenote: Every source file is a module. `import "utils/math.op"` names another module by
+#         its path relative to the importing file and makes the names that module declares
+#         (its symbol table after semantic analysis, including what it imported itself)
+#         visible to the importer. Modules are compiled one at a time, imports first:
+#         Compiler(modules) receives the exports of everything the module imports.
+#
+# fenote: The graph records per module the sha256 of its source, the modules it imports, its
+#         key, and the exports and generated code of its last successful compile. The key
+#         hashes the source digest, the compiler stamp and the keys of the imported modules,
+#         so it changes exactly when the module, anything it imports directly or indirectly,
+#         or the compiler changes. A module whose key is the one it had in the last build is
+#         not analyzed or generated again: its recorded exports are handed to its importers.
+#         plan() finds the imports of new and edited files by scanning their tokens, without
+#         parsing them.
+#
+# fenote: After a build the graph is pickled to <cache dir>/modules, one file per set of
+#         build roots. Each planned module's `reason` says why it is compiled in this build
+#         (None: it is up to date); `opalg build --explain` prints them. `opalg watch` keeps
+#         one graph in memory instead and calls advance() before each rebuild.
+
+import contextlib
+import glob
+import hashlib
+import io
+import os
+import pickle
+
+from opalg.parser.ast_cache import source_digest, toolchain_stamp
+from opalg.parser.table_cache import cache_dir
+
+GRAPH_SUBDIR = 'modules'
+GRAPH_SUFFIX = '.graph'
+GRAPH_VERSION = 1
+
+_compiler_stamp = None
+
+
+def compiler_stamp():
+    """Identifies the code that turns source into exports and output (see ast_cache.toolchain_stamp)."""
+    global _compiler_stamp
+    if _compiler_stamp is None:
+        package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        files = sorted(glob.glob(os.path.join(package, 'compiler', '*.py')))
+        files.append(os.path.join(package, 'interpreter', 'code_generator.py'))
+        digest = hashlib.sha256(f'{toolchain_stamp()}\n'.encode('utf-8'))
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f'{os.path.basename(path)} {stat.st_size} {stat.st_mtime_ns}\n'.encode('utf-8'))
+        _compiler_stamp = digest.hexdigest()
+    return _compiler_stamp
+
+
+def module_path(path):
+    return os.path.normpath(os.path.abspath(path))
+
+
+def resolve(importer, path):
+    """The module an `import "path"` in the module `importer` refers to."""
+    return module_path(os.path.join(os.path.dirname(importer), path))
+
+
+def display(path):
+    """`path` relative to the working directory, for messages."""
+    try:
+        return os.path.relpath(path)
+    except ValueError:
+        return path
+
+
+def scan_imports(source):
+    """The paths of the import statements in `source`, in order, found by the fast lexer."""
+    from opalg.lexer.fast_lexer import FastLexer, scan
+
+    lexer = FastLexer()
+    lexer.lexdata = source   # for its error messages
+    paths = []
+    previous = None
+    # Illegal characters are reported when the module is parsed, not here.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for token_type, value, _start, _end in scan(source, lexer.error):
+            if previous == 'IMPORT' and token_type == 'STRING_LITERAL':
+                paths.append(value)
+            previous = token_type
+    return paths
+
+
+def graph_path(roots, directory=None):
+    directory = directory or os.path.join(cache_dir(), GRAPH_SUBDIR)
+    key = hashlib.sha256('\0'.join(sorted(module_path(root) for root in roots)).encode('utf-8'))
+    return os.path.join(directory, key.hexdigest()[:32] + GRAPH_SUFFIX)
+
+
+class Module:
+    def __init__(self, path):
+        self.path = path          # normalized absolute path
+        self.digest = None        # sha256 of the source, hex
+        self.imports = {}         # import path as written -> module path, in source order
+        self.key = None           # see the header
+        self.exports = None       # name -> symbol, once compiled successfully
+        self.output = None        # generated code, once compiled successfully
+        self.error = None         # why the module cannot be compiled (unreadable, bad import)
+        self.reason = None        # why it is compiled in this build; None when up to date
+
+    @property
+    def ok(self):
+        return self.exports is not None
+
+
+class ModuleGraph:
+    def __init__(self, roots, directory=None, persistent=True):
+        self.path = graph_path(roots, directory) if persistent else None
+        self.previous = self.load()   # module path -> Module, as of the last build
+        self.modules = {}             # module path -> Module, for this build
+
+    def load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, 'rb') as f:
+                version, modules = pickle.load(f)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError):
+            return {}
+        return modules if version == GRAPH_VERSION else {}
+
+    def save(self):
+        if self.path is None:
+            return None
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((GRAPH_VERSION, self.modules), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except (OSError, pickle.PicklingError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        return self.path
+
+    def advance(self):
+        """Make this build the one the next plan() compares against, for long-running builders."""
+        self.previous = self.modules
+        self.modules = {}
+
+    def plan(self, paths):
+        """
+        The modules of `paths` and of everything they import, imports before importers, each
+        with its key and reason set. Up-to-date modules get their recorded exports and output.
+        """
+        stamp = compiler_stamp()
+        order = []
+        active = []   # the chain of imports being visited, to report cycles
+
+        def visit(path):
+            module = self.modules[path] = Module(path)
+            previous = self.previous.get(path)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    source = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                module.error = f'cannot read {display(path)}: {e}'
+                source = None
+            if source is not None:
+                module.digest = source_digest(source).hex()
+                if previous is not None and previous.digest == module.digest:
+                    module.imports = previous.imports
+                else:
+                    module.imports = {written: resolve(path, written) for written in scan_imports(source)}
+            active.append(path)
+            for written, dependency in module.imports.items():
+                if dependency in active:
+                    cycle = active[active.index(dependency):] + [dependency]
+                    module.error = 'import cycle: ' + ' -> '.join(display(step) for step in cycle)
+                elif not os.path.isfile(dependency):
+                    module.error = f"module '{written}' not found ({display(dependency)})"
+                elif dependency not in self.modules:
+                    visit(dependency)
+            active.pop()
+
+            digest = hashlib.sha256(f'{stamp}\n{module.digest}\n'.encode('utf-8'))
+            for dependency in module.imports.values():
+                imported = self.modules.get(dependency)
+                digest.update(f'{imported.key if imported is not None else None}\n'.encode('utf-8'))
+            module.key = digest.hexdigest()
+            module.reason = self.reason(module, previous)
+            if module.reason is None:
+                module.exports = previous.exports
+                module.output = previous.output
+            order.append(module)
+
+        for path in paths:
+            path = module_path(path)
+            if path not in self.modules:
+                visit(path)
+        return order
+
+    def reason(self, module, previous):
+        """Why `module` has to be compiled, or None when its last build is still valid."""
+        if previous is None:
+            return 'new module'
+        if previous.digest != module.digest:
+            return 'source changed'
+        if module.error is None and previous.ok and previous.key == module.key:
+            return None
+        if not previous.ok:
+            return 'failed in the last build'
+        for dependency in module.imports.values():
+            imported = self.modules.get(dependency)
+            if imported is None or imported.reason is not None:
+                return f'imports {display(dependency)}, which changed'
+        return 'compiler changed'
+
+    def imported(self, module):
+        """The exports of the modules `module` imports, by import path, for Compiler(modules)."""
+        if module.error is not None:
+            raise Exception(module.error)
+        exports = {}
+        for written, dependency in module.imports.items():
+            imported = self.modules[dependency]
+            if not imported.ok:
+                raise Exception(f"imports {display(dependency)}, which failed to compile")
+            exports[written] = imported.exports
+        return exports
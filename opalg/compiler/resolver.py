@@ -0,0 +1,237 @@
+# compiler/resolver.py
+
+#
+# Resolver pass: lexical addressing of variables.
+#
+# fenote: Every block that the interpreter executes in its own environment (program,
+#         function body, then/else branches, loop bodies, try/catch/finally blocks) gets a
+#         Scope. A Scope extends the scoped SymbolTable with a slot layout: each name
+#         declared in it is given a fixed index into the slots of the frames built from it.
+#
+# fenote: References are annotated with an `address`: a tuple of (depth, index) pairs,
+#         innermost first, where depth is the number of parent hops from the frame the
+#         reference runs in. Usually there is exactly one pair. More than one pair means
+#         a closer slot *may* be unset at run time (a for-loop variable over an empty
+#         iterable, a global read from inside a function) and the next pair is the
+#         fallback, which keeps the dynamic lookup rules of the tree-walker. An empty
+#         address means no visible declaration: reading it raises "not defined".
+#
+# fenote: Function bodies run with the global frame as parent, wherever they are declared.
+#         They are resolved after the rest of the program so that globals declared after
+#         the function (but before the call) are visible to them.
+#
+# fenote: A `return f(...)` in a function body, outside any try statement, is marked as a
+#         tail call (ReturnStatementNode.tail): nothing in the function runs after the
+#         call, so the engines may run the callee in place of the caller's frame.
+
+from opalg.compiler.ast_nodes import *
+from opalg.opalg_types.node_types import SymbolTable
+from opalg.compiler.visitor import Visitor
+
+
+class Scope(SymbolTable):
+    """A lexical scope whose variables live in consecutive frame slots."""
+    def __init__(self, parent=None, kind='block'):
+        super().__init__(parent)
+        self.kind = kind      # 'global', 'function' or 'block'
+        self.names = []       # slot index -> name
+        self.index = {}       # name -> slot index
+
+    def declare(self, name, var_type=None):
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        self.define(name, var_type)
+        return self.index[name]
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"Scope({self.kind}, {self.names})"
+
+
+class Resolver(Visitor):
+    dispatch = {
+        '_resolve_table': ('resolve_', 'generic_resolve'),
+        '_resolve_expr_table': ('resolve_expr_', 'generic_resolve_expression'),
+    }
+
+    def __init__(self):
+        self.scope = None
+        self.definite = {}        # Scope -> names certainly bound at the current point
+        self.pending_functions = []
+        self.in_function = False  # resolving a function body (where returns may be tail calls)
+        self.try_depth = 0        # try statements around the current statement
+
+    def resolve(self, program, global_scope=None):
+        """
+        Annotate `program` in place. Pass the global Scope of a previous run to keep
+        resolving into the same global frame layout.
+        """
+        global_scope = global_scope if global_scope is not None else Scope(kind='global')
+        program.scope = global_scope
+        self.scope = global_scope
+        self.definite = {global_scope: set()}
+        self.resolve_statements(program.statements)
+        while self.pending_functions:
+            self.resolve_function_body(self.pending_functions.pop(0), global_scope)
+        return global_scope
+
+    # ---------------------
+    # Scopes
+    # ---------------------
+
+    def push_scope(self, kind='block'):
+        scope = Scope(self.scope, kind)
+        self.scope = scope
+        self.definite[scope] = set()
+        return scope
+
+    def pop_scope(self):
+        self.scope = self.scope.parent
+
+    def declare(self, name, var_type=None, definite=True):
+        index = self.scope.declare(name, var_type)
+        if definite:
+            self.definite[self.scope].add(name)
+        return index
+
+    def address(self, name):
+        candidates = []
+        scope = self.scope
+        depth = 0
+        crossed_function = False
+        while scope is not None:
+            if name in scope.index:
+                candidates.append((depth, scope.index[name]))
+                if not crossed_function and name in self.definite.get(scope, ()):
+                    break
+            if scope.kind == 'function':
+                crossed_function = True
+            scope = scope.parent
+            depth += 1
+        return tuple(candidates)
+
+    def resolve_block(self, statements):
+        scope = self.push_scope()
+        self.resolve_statements(statements)
+        self.pop_scope()
+        return scope
+
+    def resolve_function_body(self, node, global_scope):
+        self.scope = global_scope
+        node.scope = self.push_scope('function')
+        node.param_slots = tuple(self.declare(param.name, param.param_type) for param in node.parameters)
+        self.in_function, self.try_depth = True, 0
+        self.resolve_statements(node.body.statements)
+        self.in_function = False
+        self.pop_scope()
+
+    # ---------------------
+    # Statements
+    # ---------------------
+
+    def resolve_statements(self, statements):
+        for stmt in statements:
+            self.resolve_statement(stmt)
+
+    def resolve_statement(self, node):
+        self._resolve_table[type(node)](self, node)
+
+    def generic_resolve(self, node):
+        pass
+
+    def resolve_VariableDeclarationNode(self, node):
+        self.resolve_expression(node.value)
+        node.slot = self.declare(node.name, node.var_type)
+
+    def resolve_FunctionDeclarationNode(self, node):
+        self.pending_functions.append(node)
+
+    def resolve_ReturnStatementNode(self, node):
+        self.resolve_expression(node.expression)
+        node.tail = (self.in_function and not self.try_depth
+                     and isinstance(node.expression, FunctionCallNode)
+                     and isinstance(node.expression.function, IdentifierNode))
+
+    def resolve_ShowStatementNode(self, node):
+        self.resolve_expression(node.value)
+
+    def resolve_ExpressionStatementNode(self, node):
+        self.resolve_expression(node.expression)
+
+    def resolve_ThrowStatementNode(self, node):
+        self.resolve_expression(node.expression)
+
+    def resolve_IfStatementNode(self, node):
+        self.resolve_expression(node.condition)
+        node.then_scope = self.resolve_block(node.then_block.statements)
+        node.else_scope = self.resolve_block(node.else_block.statements) if node.else_block else None
+
+    def resolve_WhileStatementNode(self, node):
+        self.resolve_expression(node.condition)
+        node.body_scope = self.resolve_block(node.body.statements)
+
+    def resolve_ForStatementNode(self, node):
+        self.resolve_expression(node.iterable)
+        # Only bound once the iterable yields something, so it stays a "maybe" binding.
+        already_bound = node.iterator.name in self.definite[self.scope]
+        node.slot = self.declare(node.iterator.name, definite=already_bound)
+        node.body_scope = self.resolve_block(node.body.statements)
+
+    def resolve_TryCatchFinallyNode(self, node):
+        self.try_depth += 1
+        node.try_scope = self.resolve_block(node.try_block.statements)
+        node.catch_scope = None
+        node.finally_scope = None
+        if node.catch_block:
+            node.catch_scope = self.push_scope()
+            if node.exception_var:
+                node.exception_slot = self.declare(node.exception_var.name)
+            self.resolve_statements(node.catch_block.statements)
+            self.pop_scope()
+        if node.finally_block:
+            node.finally_scope = self.resolve_block(node.finally_block.statements)
+        self.try_depth -= 1
+
+    def resolve_JTMLElementNode(self, node):
+        # Content is only evaluated (see Interpreter.serialize_jtml), never bound.
+        for item in node.content:
+            if isinstance(item, (ShowStatementNode, VariableDeclarationNode)):
+                self.resolve_expression(item.value)
+
+    # --------------------
+    # Expressions
+    # --------------------
+
+    def resolve_expression(self, expr):
+        if expr is not None:
+            self._resolve_expr_table[type(expr)](self, expr)
+
+    def generic_resolve_expression(self, expr):
+        pass
+
+    def resolve_expr_IdentifierNode(self, expr):
+        expr.address = self.address(expr.name)
+
+    def resolve_expr_BinaryOperationNode(self, expr):
+        expr.observed = 0
+        # For '=' and '+=' the left side is the IdentifierNode being rebound.
+        self.resolve_expression(expr.left)
+        self.resolve_expression(expr.right)
+
+    def resolve_expr_UnaryOperationNode(self, expr):
+        self.resolve_expression(expr.operand)
+
+    def resolve_expr_FunctionCallNode(self, expr):
+        expr.target = None
+        for arg in expr.arguments:
+            self.resolve_expression(arg)
+
+    def resolve_expr_MemberAccessNode(self, expr):
+        self.resolve_expression(expr.obj)
+
+    def resolve_expr_AwaitExpressionNode(self, expr):
+        self.resolve_expression(expr.expression)
@@ -2,15 +2,20 @@
 
 from opalg.compiler.ast_nodes import *
 from opalg.opalg_types.node_types import IntType, FloatType, StringType, BoolType, VoidType, CustomType
+from opalg.compiler.visitor import Visitor
 
-class SemanticAnalyzer:
-    def __init__(self):
+class SemanticAnalyzer(Visitor):
+    dispatch = {
+        '_analyze_table': ('analyze_', 'generic_analyze'),
+        '_analyze_expr_table': ('analyze_expr_', 'generic_analyze_expression'),
+    }
+
+    def __init__(self, modules=None):
         self.symbol_table = {}
+        self.modules = modules if modules is not None else {}  # import path -> exported symbols
     
     def analyze(self, node):
-        method_name = f'analyze_{type(node).__name__}'
-        analyzer = getattr(self, method_name, self.generic_analyze)
-        analyzer(node)
+        self._analyze_table[type(node)](self, node)
     
     def generic_analyze(self, node):
         raise NotImplementedError(f'No semantic analyzer for {type(node).__name__}')
@@ -42,6 +47,15 @@ class SemanticAnalyzer:
         for stmt in node.body.statements:
             self.analyze(stmt)
     
+    def analyze_ImportStatementNode(self, node):
+        exports = self.modules.get(node.path)
+        if exports is None:
+            raise Exception(f"Module '{node.path}' is not loaded")
+        for name, symbol in exports.items():
+            if name in self.symbol_table and self.describe(self.symbol_table[name]) != self.describe(symbol):
+                raise Exception(f"'{name}' imported from '{node.path}' is already declared")
+            self.symbol_table[name] = symbol
+    
     def analyze_ReturnStatementNode(self, node):
         if node.expression:
             return self.analyze_expression(node.expression)
@@ -74,9 +88,7 @@ class SemanticAnalyzer:
             self.analyze(stmt)
     
     def analyze_expression(self, expr):
-        method_name = f'analyze_expr_{type(expr).__name__}'
-        analyzer = getattr(self, method_name, self.generic_analyze_expression)
-        return analyzer(expr)
+        return self._analyze_expr_table[type(expr)](self, expr)
     
     def generic_analyze_expression(self, expr):
         raise NotImplementedError(f'No semantic analyzer for expression {type(expr).__name__}')
@@ -84,6 +96,7 @@ class SemanticAnalyzer:
     def analyze_expr_BinaryOperationNode(self, expr):
         left_type = self.analyze_expression(expr.left)
         right_type = self.analyze_expression(expr.right)
+        expr.operand_types = (left_type, right_type)
         if expr.op in ['+', '-', '*', '/']:
             if isinstance(left_type, (IntType, FloatType)) and isinstance(right_type, (IntType, FloatType)):
                 return FloatType() if isinstance(left_type, FloatType) or isinstance(right_type, FloatType) else IntType()
@@ -195,6 +208,13 @@ class SemanticAnalyzer:
         else:
             return None
     
+    def describe(self, symbol):
+        """A symbol table entry as plain strings, to compare entries from different modules."""
+        if isinstance(symbol, tuple):
+            kind, param_types, return_type = symbol
+            return (kind, tuple(str(param_type) for param_type in param_types), str(return_type))
+        return str(symbol)
+    
     def type_compatible(self, expected, actual):
         if isinstance(expected, type(actual)):
             return True
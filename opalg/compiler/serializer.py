@@ -0,0 +1,304 @@
+# compiler/serializer.py
+
+#
+# Compact binary encoding of AST trees.
+#
+# fenote: dumps(node) -> bytes and loads(bytes) -> node. The encoding is
+#           MAGIC, FORMAT_VERSION
+#           string table   varint count, then (varint length, utf-8 bytes) per string
+#           literal pool   varint count, then one tagged entry per literal (see POOL_*)
+#           node stream    the tree in pre-order
+#         Every integer is an unsigned LEB128 varint (signed ints are zigzag encoded first).
+#         A node is its kind + 1 (0 stands for None), its lineno and lexpos, then its fields
+#         in arena LAYOUT order: a NODE field is a nested node, a LIST field a count followed
+#         by that many nodes, a VALUE field a literal pool index. Positions are written as the
+#         (zigzag) difference to the previous node's, which keeps most of them to one byte.
+#
+# fenote: The literal pool holds every field value that is not a node: names, operators,
+#         numbers, strings, JTML attribute dicts and type objects (IntType, TypeNode, ...).
+#         Hashable literals are stored once. Entries only refer to earlier entries, so the
+#         pool decodes front to back.
+#
+# fenote: Only parser output is encoded. Fields attached by later passes (resolver slots and
+#         scopes) are not: a loaded tree looks exactly like a freshly parsed one. Bump
+#         FORMAT_VERSION whenever LAYOUT or the encoding changes.
+
+import struct
+
+from opalg.compiler.arena import LAYOUT, KIND, NODE, LIST, slots_of
+from opalg.opalg_types.node_types import (
+    PrimitiveType, IntType, FloatType, StringType, BoolType, VoidType,
+    FunctionType, CustomType, TypeNode, AnyType
+)
+
+MAGIC = b'OPAST'
+FORMAT_VERSION = 2
+
+POOL_NONE, POOL_FALSE, POOL_TRUE, POOL_INT, POOL_FLOAT, POOL_STR, POOL_DICT, POOL_LIST, POOL_TYPE = range(9)
+
+TYPE_CLASSES = (PrimitiveType, IntType, FloatType, StringType, BoolType, VoidType, FunctionType, CustomType,
+                TypeNode, AnyType)
+TYPE_KIND = {type_class: kind for kind, type_class in enumerate(TYPE_CLASSES)}
+TYPE_FIELDS = tuple(
+    tuple(name for name in slots_of(type_class) if name not in ('lineno', 'lexpos'))
+    for type_class in TYPE_CLASSES
+)
+
+DOUBLE = struct.Struct('<d')
+
+
+def dumps(node):
+    """Encode the tree rooted at `node` (usually a ProgramNode)."""
+    return Encoder().encode(node)
+
+
+def loads(data):
+    """Decode bytes produced by dumps(); raises ValueError for anything else."""
+    return Decoder(data).decode()
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class Encoder:
+    def __init__(self):
+        self.strings = []
+        self.string_index = {}
+        self.pool = bytearray()
+        self.pool_count = 0
+        self.pool_index = {}   # value type -> {value: pool index}
+        self.nodes = bytearray()
+        self.lineno = 0        # position of the last node written, as position() values
+        self.lexpos = 0
+
+    def encode(self, node):
+        self.encode_node(node)
+        out = bytearray(MAGIC)
+        out.append(FORMAT_VERSION)
+        write_varint(out, len(self.strings))
+        for string in self.strings:
+            encoded = string.encode('utf-8')
+            write_varint(out, len(encoded))
+            out += encoded
+        write_varint(out, self.pool_count)
+        out += self.pool
+        out += self.nodes
+        return bytes(out)
+
+    def encode_node(self, node):
+        out = self.nodes
+        if node is None:
+            out.append(0)
+            return
+        node_class = getattr(node, 'node_class', type(node))  # arena views encode as their node
+        kind = KIND.get(node_class)
+        if kind is None:
+            raise ValueError(f"Cannot serialize {type(node).__name__}")
+        write_varint(out, kind + 1)
+        lineno, lexpos = position(node.lineno), position(node.lexpos)
+        write_varint(out, zigzag(lineno - self.lineno))
+        write_varint(out, zigzag(lexpos - self.lexpos))
+        self.lineno, self.lexpos = lineno, lexpos
+        for name, field in LAYOUT[kind][1]:
+            value = getattr(node, name)
+            if field is NODE:
+                self.encode_node(value)
+            elif field is LIST:
+                write_varint(out, len(value))
+                for item in value:
+                    self.encode_node(item)
+            else:
+                write_varint(out, self.literal(value))
+
+    def string(self, value):
+        index = self.string_index.get(value)
+        if index is None:
+            index = self.string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def literal(self, value):
+        """The pool index of `value`, adding it (and whatever it contains) first if needed."""
+        table = self.pool_index.setdefault(type(value), {})
+        try:
+            index = table.get(value)
+        except TypeError:  # unhashable: stored every time it appears
+            table = None
+            index = None
+        if index is not None:
+            return index
+        entry = self.pool_entry(value)
+        self.pool += entry
+        index = self.pool_count
+        self.pool_count += 1
+        if table is not None:
+            table[value] = index
+        return index
+
+    def pool_entry(self, value):
+        # Nested values are added to the pool before the entry that refers to them.
+        entry = bytearray()
+        if value is None:
+            entry.append(POOL_NONE)
+        elif value is True or value is False:
+            entry.append(POOL_TRUE if value else POOL_FALSE)
+        elif type(value) is int:
+            entry.append(POOL_INT)
+            write_varint(entry, zigzag(value))
+        elif type(value) is float:
+            entry.append(POOL_FLOAT)
+            entry += DOUBLE.pack(value)
+        elif type(value) is str:
+            entry.append(POOL_STR)
+            write_varint(entry, self.string(value))
+        elif type(value) is dict:
+            items = [(self.literal(key), self.literal(item)) for key, item in value.items()]
+            entry.append(POOL_DICT)
+            write_varint(entry, len(items))
+            for key, item in items:
+                write_varint(entry, key)
+                write_varint(entry, item)
+        elif type(value) in (list, tuple):
+            items = [self.literal(item) for item in value]
+            entry.append(POOL_LIST)
+            write_varint(entry, len(items))
+            for item in items:
+                write_varint(entry, item)
+        elif type(value) in TYPE_KIND:
+            kind = TYPE_KIND[type(value)]
+            fields = [self.literal(getattr(value, name, None)) for name in TYPE_FIELDS[kind]]
+            entry.append(POOL_TYPE)
+            write_varint(entry, kind)
+            write_varint(entry, position(value.lineno))
+            write_varint(entry, position(value.lexpos))
+            for field in fields:
+                write_varint(entry, field)
+        else:
+            raise ValueError(f"Cannot serialize {type(value).__name__} value {value!r}")
+        return entry
+
+
+def position(value):
+    return 0 if value is None else value + 1
+
+
+class Decoder:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+        self.strings = []
+        self.pool = []
+        self.lineno = 0
+        self.lexpos = 0
+
+    def decode(self):
+        data = self.data
+        if data[:len(MAGIC)] != MAGIC or len(data) <= len(MAGIC):
+            raise ValueError("Not a serialized opalg AST")
+        if data[len(MAGIC)] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported AST format version {data[len(MAGIC)]}")
+        self.pos = len(MAGIC) + 1
+        try:
+            for _ in range(self.varint()):
+                length = self.varint()
+                self.strings.append(data[self.pos:self.pos + length].decode('utf-8'))
+                self.pos += length
+            for _ in range(self.varint()):
+                self.pool.append(self.pool_entry())
+            node = self.node()
+        except (IndexError, UnicodeDecodeError, struct.error) as e:
+            raise ValueError(f"Truncated or corrupt AST data: {e}") from None
+        if self.pos != len(data):
+            raise ValueError("Trailing bytes after the AST")
+        return node
+
+    def varint(self):
+        data = self.data
+        byte = data[self.pos]
+        self.pos += 1
+        if byte < 0x80:
+            return byte
+        value = byte & 0x7f
+        shift = 7
+        while True:
+            byte = data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def pool_entry(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == POOL_NONE:
+            return None
+        if tag == POOL_FALSE:
+            return False
+        if tag == POOL_TRUE:
+            return True
+        if tag == POOL_INT:
+            return unzigzag(self.varint())
+        if tag == POOL_FLOAT:
+            value, = DOUBLE.unpack_from(self.data, self.pos)
+            self.pos += DOUBLE.size
+            return value
+        if tag == POOL_STR:
+            return self.strings[self.varint()]
+        if tag == POOL_DICT:
+            pool = self.pool
+            return {pool[self.varint()]: pool[self.varint()] for _ in range(self.varint())}
+        if tag == POOL_LIST:
+            pool = self.pool
+            return [pool[self.varint()] for _ in range(self.varint())]
+        if tag == POOL_TYPE:
+            kind = self.varint()
+            value = object.__new__(TYPE_CLASSES[kind])
+            value.lineno = self.varint() - 1
+            value.lexpos = self.varint() - 1
+            unposition(value)
+            for name in TYPE_FIELDS[kind]:
+                setattr(value, name, self.pool[self.varint()])
+            return value
+        raise ValueError(f"Unknown literal tag {tag}")
+
+    def node(self):
+        kind = self.varint()
+        if not kind:
+            return None
+        node_class, fields = LAYOUT[kind - 1]
+        node = object.__new__(node_class)
+        self.lineno += unzigzag(self.varint())
+        self.lexpos += unzigzag(self.varint())
+        node.lineno = self.lineno - 1
+        node.lexpos = self.lexpos - 1
+        unposition(node)
+        for name, field in fields:
+            if field is NODE:
+                value = self.node()
+            elif field is LIST:
+                value = [self.node() for _ in range(self.varint())]
+            else:
+                value = self.pool[self.varint()]
+            setattr(node, name, value)
+        return node
+
+
+def unposition(node):
+    """Turn the -1 of a position written as 0 back into None."""
+    if node.lineno < 0:
+        node.lineno = None
+    if node.lexpos < 0:
+        node.lexpos = None
@@ -0,0 +1,56 @@
+# compiler/visitor.py
+
+#
+# Shared dispatch for passes over the AST.
+#
+# fenote: Every pass (Interpreter, Optimizer, CodeGenerator, SemanticAnalyzer,
+#         IntermediateRepresentation, ...) names its handlers `<prefix><NodeClass>`, e.g.
+#         `execute_IfStatementNode`. Looking the handler up with getattr and an f-string on
+#         every visit costs a string format, an instance attribute miss and a bound-method
+#         allocation per node.
+#
+# fenote: A Visitor subclass declares its dispatch entry points in `dispatch`, mapping a
+#         table attribute to (handler prefix, fallback method name). For each entry the
+#         class gets its own DispatchTable: node class -> handler function, filled on the
+#         first visit of each node class. A node class without a handler of its own uses the
+#         handler of its nearest base class (e.g. `evaluate_ExpressionNode`), then the
+#         fallback. Subclasses of a pass get fresh tables, so their overrides are honoured.
+#
+# fenote: Tables are filled lazily and never invalidated: handlers must be defined on the
+#         class, not attached to instances or patched in after the first visit.
+
+
+class DispatchTable(dict):
+    """node class -> handler function, for one visitor class and one handler prefix."""
+    __slots__ = ('visitor_class', 'prefix', 'fallback')
+
+    def __init__(self, visitor_class, prefix, fallback):
+        super().__init__()
+        self.visitor_class = visitor_class
+        self.prefix = prefix
+        self.fallback = fallback
+
+    def __missing__(self, node_class):
+        handler = self.lookup(node_class)
+        self[node_class] = handler
+        return handler
+
+    def lookup(self, node_class):
+        for klass in node_class.__mro__:
+            handler = getattr(self.visitor_class, f'{self.prefix}{klass.__name__}', None)
+            if handler is not None:
+                return handler
+        return getattr(self.visitor_class, self.fallback)
+
+
+class Visitor:
+    """
+    Base class for AST passes. Declare the dispatch tables in `dispatch` and visit with
+    `self._table[type(node)](self, node, ...)`.
+    """
+    dispatch = {}  # table attribute -> (handler prefix, fallback method name)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for attribute, (prefix, fallback) in cls.dispatch.items():
+            setattr(cls, attribute, DispatchTable(cls, prefix, fallback))
@@ -0,0 +1,368 @@
+# daemon.py
+
+#
+# `opalg daemon`: a local server that keeps opalg loaded, so runs skip the startup cost.
+#
+# fenote: Every `opalg` run pays for starting Python, loading the parser tables and importing
+#         the compiler, the engines and jtml_engine before it does any work. The daemon does
+#         all of that once (warm_up) and then listens on a Unix socket. For each request it
+#         forks: the child inherits the loaded modules and tables copy-on-write, runs
+#         cli.main(argv) with the client's working directory and environment, and exits.
+#         Forking also keeps runs apart: whatever a program does to the interpreter or
+#         module state dies with its child.
+#
+# fenote: The client sends its stdin, stdout and stderr along with the request (SCM_RIGHTS),
+#         and the child installs them as its own fds 0-2. Output therefore streams straight
+#         to the client's terminal, pipe or file, including output written by C code and
+#         by worker processes, and isatty() answers as it would in-process. The child
+#         replies with its pid, then, when the run is over, with the exit status. Ctrl-C
+#         in the client is forwarded to the child as SIGINT.
+#
+# fenote: With OPALG_DAEMON=1 `opalg ...` is a thin client: it forwards its arguments when a
+#         daemon answers on the socket, and runs in-process otherwise. Messages are JSON,
+#         behind a 4-byte length. The socket ($OPALG_DAEMON_SOCKET, default
+#         <cache dir>/daemon.sock) is only accessible to its owner. A daemon keeps the code
+#         it started with: restart it (`opalg daemon stop`, `opalg daemon start`) after
+#         upgrading opalg.
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+
+# Imported by the thin client before anything else: server-only modules are imported where
+# they are used.
+from opalg.parser.table_cache import cache_dir
+
+SOCKET_ENV = 'OPALG_DAEMON_SOCKET'
+CLIENT_ENV = 'OPALG_DAEMON'
+SOCKET_NAME = 'daemon.sock'
+LENGTH = struct.Struct('<I')
+START_TIMEOUT = 30.0
+
+
+def socket_path():
+    return os.environ.get(SOCKET_ENV) or os.path.join(cache_dir(), SOCKET_NAME)
+
+
+def supported():
+    return hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork') and hasattr(socket, 'send_fds')
+
+
+def client_enabled():
+    return os.environ.get(CLIENT_ENV, '') not in ('', '0') and supported()
+
+
+class Connection:
+    """JSON messages, each behind a 4-byte length, over a Unix stream socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b''
+
+    def send(self, message, fds=()):
+        data = json.dumps(message).encode('utf-8')
+        data = LENGTH.pack(len(data)) + data
+        if fds:
+            sent = socket.send_fds(self.sock, [data], list(fds))
+            data = data[sent:]
+        self.sock.sendall(data)
+
+    def receive(self, max_fds=0):
+        """The next message and the fds sent with it, or (None, []) when the peer closed the socket."""
+        fds = []
+        while len(self.buffer) < LENGTH.size or len(self.buffer) < LENGTH.size + LENGTH.unpack_from(self.buffer)[0]:
+            if max_fds and not fds:
+                data, fds, _flags, _address = socket.recv_fds(self.sock, 1 << 16, max_fds)
+            else:
+                data = self.sock.recv(1 << 16)
+            if not data:
+                for fd in fds:
+                    os.close(fd)
+                return None, []
+            self.buffer += data
+        end = LENGTH.size + LENGTH.unpack_from(self.buffer)[0]
+        message = json.loads(self.buffer[LENGTH.size:end].decode('utf-8'))
+        self.buffer = self.buffer[end:]
+        return message, fds
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def connect(path=None):
+    """A Connection to the daemon, or None when no daemon is listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return Connection(sock)
+
+
+def request(message, path=None):
+    """Send a control message (status, stop) and return the reply, or None without a daemon."""
+    connection = connect(path)
+    if connection is None:
+        return None
+    with connection:
+        connection.send(message)
+        return connection.receive()[0]
+
+
+# ---------------------
+# Client
+# ---------------------
+
+def forward(argv, path=None, fds=(0, 1, 2)):
+    """
+    Run `opalg argv` in the daemon, with `fds` (default: this process's stdin, stdout and
+    stderr) as its standard streams; returns the exit status, or None when no daemon is
+    listening.
+    """
+    connection = connect(path)
+    if connection is None:
+        return None
+    with connection:
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+        connection.send({'command': 'run', 'argv': list(argv), 'cwd': os.getcwd(),
+                         'env': dict(os.environ)}, fds=fds)
+        started, _ = connection.receive()
+        if started is None:
+            return None
+        while True:
+            try:
+                reply, _ = connection.receive()
+            except KeyboardInterrupt:
+                os.kill(started['pid'], signal.SIGINT)
+                continue
+            if reply is None:   # the run died without reporting its status
+                return 1
+            return reply['exit']
+
+
+# ---------------------
+# Server
+# ---------------------
+
+def warm_up():
+    """Load everything a run may need, once, before serving."""
+    from opalg import build, cli, watch
+    from opalg.compiler.compiler import Compiler
+    from opalg.interpreter import interpreter
+    from opalg.interpreter.engines import ENGINES, get_engine
+    from opalg.lexer.backends import LEXERS
+    from opalg.parser.instances import local_parser
+
+    for name in ENGINES:
+        get_engine(name)
+    for name in LEXERS:
+        local_parser(name)
+    try:
+        interpreter.jtml_engine.interpret_string
+    except (ImportError, AttributeError):
+        pass   # optional; runs that use it will report the error
+
+
+def run(argv):
+    """cli.main(argv) as a process would run it; returns the exit status."""
+    import traceback
+    from opalg import cli
+
+    try:
+        cli.main(argv)
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    except BaseException:
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def serve_run(connection, message, fds):
+    """In the forked child: take over the client's streams, run the command, report the status."""
+    status = 1
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            if fd != target:
+                os.dup2(fd, target)
+                os.close(fd)
+        sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+        sys.stdout = open(1, 'w', encoding='utf-8', closefd=False, buffering=1)
+        sys.stderr = open(2, 'w', encoding='utf-8', closefd=False, buffering=1)
+        os.environ.clear()
+        os.environ.update(message['env'])
+        os.environ.pop(CLIENT_ENV, None)   # run here, do not forward again
+        os.chdir(message['cwd'])
+        sys.argv = ['opalg'] + message['argv']
+        connection.send({'pid': os.getpid()})
+        status = run(message['argv'])
+        sys.stdout.flush()
+        sys.stderr.flush()
+        connection.send({'exit': status})
+    except BaseException:
+        try:
+            import traceback
+            traceback.print_exc()
+        except BaseException:
+            pass
+    finally:
+        os._exit(status)
+
+
+class Daemon:
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.started = time.time()
+        self.runs = 0
+        self.running = False
+
+    def listen(self):
+        connection = connect(self.path)
+        if connection is not None:
+            connection.close()
+            raise Exception(f"A daemon is already listening on {self.path}")
+        if os.path.exists(self.path):
+            os.remove(self.path)   # left behind by a daemon that did not stop cleanly
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_mask = os.umask(0o177)   # the socket is only for its owner
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(old_mask)
+        server.listen(64)
+        return server
+
+    def serve(self, ready=None):
+        """Accept requests until a stop request arrives; `ready` is called once listening."""
+        warm_up()
+        server = self.listen()
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)   # children are reaped automatically
+        self.running = True
+        if ready is not None:
+            ready()
+        try:
+            while self.running:
+                sock, _ = server.accept()
+                with Connection(sock) as connection:
+                    self.handle(server, connection)
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def handle(self, server, connection):
+        try:
+            message, fds = connection.receive(max_fds=3)
+        except (OSError, ValueError):
+            return
+        if message is None:
+            return
+        command = message.get('command')
+        if command == 'run' and len(fds) == 3:
+            self.runs += 1
+            for stream in (sys.stdout, sys.stderr):
+                stream.flush()
+            if os.fork() == 0:
+                server.close()
+                serve_run(connection, message, fds)
+            for fd in fds:
+                os.close(fd)
+            return
+        for fd in fds:
+            os.close(fd)
+        if command == 'status':
+            connection.send(self.status())
+        elif command == 'stop':
+            self.running = False
+            connection.send(self.status())
+        else:
+            connection.send({'error': f'unknown request {command!r}'})
+
+    def status(self):
+        return {'pid': os.getpid(), 'socket': self.path, 'runs': self.runs,
+                'uptime': round(time.time() - self.started, 1)}
+
+
+def start(path=None, timeout=START_TIMEOUT):
+    """Start a daemon in the background and wait until it answers; returns its status."""
+    import subprocess
+    path = path or socket_path()
+    status = request({'command': 'status'}, path)
+    if status is not None:
+        return status
+    env = dict(os.environ)
+    env[SOCKET_ENV] = path
+    env.pop(CLIENT_ENV, None)
+    subprocess.Popen([sys.executable, '-m', 'opalg.daemon', 'serve'], env=env,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = request({'command': 'status'}, path)
+        if status is not None:
+            return status
+    raise Exception(f"The daemon did not start listening on {path} within {timeout:.0f}s")
+
+
+def build_arg_parser():
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(
+        prog='opalg daemon', description='Keep opalg loaded in the background to skip its startup cost.')
+    arg_parser.add_argument('action', choices=['start', 'stop', 'status', 'serve'],
+                            help='serve runs the daemon in the foreground')
+    arg_parser.add_argument('--socket', default=None, help=f'socket path (default: ${SOCKET_ENV} '
+                                                           f'or <cache dir>/{SOCKET_NAME})')
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if not supported():
+        print("Error: the daemon needs Unix sockets and fork().")
+        sys.exit(1)
+    path = args.socket or socket_path()
+    try:
+        if args.action == 'serve':
+            Daemon(path).serve()
+            return
+        if args.action == 'start':
+            status = start(path)
+        else:
+            status = request({'command': args.action}, path)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if status is None:
+        print(f"No daemon is listening on {path}.")
+        sys.exit(1)
+    verb = {'start': 'running', 'stop': 'stopped', 'status': 'running'}[args.action]
+    print(f"opalg daemon {verb} (pid {status['pid']}, {status['runs']} runs, "
+          f"up {status['uptime']}s) on {status['socket']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+# opalg/interpreter/closure_compiler.py
+
+#
+# Closure-compilation execution engine.
+#
+# fenote: The tree-walking Interpreter looks up an execute_/evaluate_ method by name on
+#         every visit of every node. ClosureCompiler walks the AST once instead and turns
+#         each statement and expression into a Python closure that captures its already
+#         compiled children, so running a loop body is just a chain of direct calls.
+#
+# fenote: Operators are resolved to plain callables at compile time, literals become
+#         constants captured by the closure, and nodes without a dedicated compiler fall
+#         back to the tree-walker, so both engines share the same semantics.
+#
+# fenote: Variables are read through the slot addresses assigned by the resolver. The
+#         common case (one address, in the current frame or its parent) compiles to a
+#         direct index into the frame's slot list.
+#
+# fenote: A `return f(...)` the resolver marked as a tail call raises TailCall with the
+#         callee and its arguments instead of calling it; CompiledFunction.invoke catches
+#         it and runs the callee in the same frame, so tail recursion stays flat.
+#
+# fenote: As in the tree-walker, only the first PYTHON_CALL_DEPTH nested calls run on the
+#         Python stack; invoke() makes the calls nested deeper on the VM.
+
+import operator
+
+from opalg.compiler.ast_nodes import *
+from opalg.compiler.visitor import Visitor
+from opalg.interpreter.interpreter import (
+    PYTHON_CALL_DEPTH, Interpreter, Environment, ReturnException, ThrowException, UNSET, thrown_value, unwind
+)
+
+BINARY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '&&': lambda left, right: left and right,
+    '||': lambda left, right: left or right,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+UNARY_OPERATORS = {
+    '!': operator.not_,
+    '-': operator.neg,
+}
+
+
+def is_near(address):
+    """A single address in the current frame or its parent: compiled to a direct slot access."""
+    return len(address) == 1 and address[0][0] <= 1
+
+
+class TailCall(ReturnException):
+    """Ends a function body with a call of `function`, which invoke() makes in its place."""
+    def __init__(self, function, args):
+        super().__init__(None)
+        self.function = function
+        self.args = args
+
+
+class CompiledFunction:
+    """A FunctionDeclarationNode whose body has been compiled to closures."""
+    def __init__(self, node, body):
+        self.node = node
+        self.name = node.name
+        self.parameters = node.parameters
+        self.param_names = tuple(param.name for param in node.parameters)
+        self.param_slots = node.param_slots
+        self.scope = node.scope
+        self.body = body  # tuple of statement closures
+
+    def invoke(self, args, interpreter):
+        depth = interpreter.depth
+        if depth >= PYTHON_CALL_DEPTH:
+            return interpreter.call_on_vm(self, args)
+        function = self
+        call_env = Environment(interpreter.global_env, self.scope)
+        interpreter.depth = depth + 1
+        try:
+            while True:
+                if len(args) != len(function.param_names):
+                    raise Exception(f"Function '{function.name}' expects {len(function.param_names)} arguments, got {len(args)}")
+                slots = call_env.slots
+                for index, value in zip(function.param_slots, args):
+                    slots[index] = value
+                try:
+                    for stmt in function.body:
+                        stmt(call_env)
+                except TailCall as call:
+                    function, args = call.function, call.args
+                    call_env.scope = function.scope
+                    call_env.slots = [UNSET] * len(function.scope.names)
+                    continue
+                except ReturnException as ret:
+                    return ret.value
+                return None
+        finally:
+            interpreter.depth = depth
+
+
+class ClosureCompiler(Visitor):
+    dispatch = {
+        '_compile_table': ('compile_', 'generic_compile'),
+        '_compile_expr_table': ('compile_expr_', 'generic_compile_expression'),
+    }
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def compile_program(self, node):
+        statements = self.compile_block(node.statements)
+
+        def run_program(env):
+            for stmt in statements:
+                stmt(env)
+        return run_program
+
+    def compile_block(self, statements):
+        return tuple(self.compile(stmt) for stmt in statements)
+
+    # ---------------------
+    # Statements
+    # ---------------------
+
+    def compile(self, node):
+        return self._compile_table[type(node)](self, node)
+
+    def generic_compile(self, node):
+        execute = self.interpreter.execute
+
+        def run_fallback(env):
+            completion = execute(node, env)
+            if completion is not None:
+                unwind(completion)
+        return run_fallback
+
+    def compile_VariableDeclarationNode(self, node):
+        slot = node.slot
+        value = self.compile_expression(node.value)
+
+        def run_declaration(env):
+            env.slots[slot] = value(env)
+        return run_declaration
+
+    def compile_FunctionDeclarationNode(self, node):
+        function = CompiledFunction(node, self.compile_block(node.body.statements))
+        declare = self.interpreter.declare_function
+
+        def run_function_declaration(env):
+            declare(function.name, function)
+        return run_function_declaration
+
+    def compile_ReturnStatementNode(self, node):
+        if node.tail:
+            return self.compile_tail_call(node.expression)
+        value = self.compile_expression(node.expression) if node.expression else None
+
+        def run_return(env):
+            raise ReturnException(value(env) if value else None)
+        return run_return
+
+    def compile_tail_call(self, expr):
+        name = expr.function.name
+        args = tuple(self.compile_expression(arg) for arg in expr.arguments)
+        functions = self.interpreter.functions
+
+        def run_tail_call(env):
+            function = functions.get(name)
+            if function is None:
+                raise Exception(f"Function '{name}' not defined")
+            raise TailCall(function, [arg(env) for arg in args])
+        return run_tail_call
+
+    def compile_ShowStatementNode(self, node):
+        value = self.compile_expression(node.value)
+
+        def run_show(env):
+            print(value(env))
+        return run_show
+
+    def compile_ExpressionStatementNode(self, node):
+        expression = self.compile_expression(node.expression)
+
+        def run_expression(env):
+            expression(env)
+        return run_expression
+
+    def compile_IfStatementNode(self, node):
+        condition = self.compile_expression(node.condition)
+        then_block = self.compile_block(node.then_block.statements)
+        then_scope = node.then_scope
+        else_block = self.compile_block(node.else_block.statements) if node.else_block else None
+        else_scope = node.else_scope
+
+        def run_if(env):
+            if condition(env):
+                block_env = Environment(env, then_scope)
+                for stmt in then_block:
+                    stmt(block_env)
+            elif else_block is not None:
+                block_env = Environment(env, else_scope)
+                for stmt in else_block:
+                    stmt(block_env)
+        return run_if
+
+    def compile_WhileStatementNode(self, node):
+        condition = self.compile_expression(node.condition)
+        body = self.compile_block(node.body.statements)
+        body_scope = node.body_scope
+        declares = bool(body_scope.names)
+
+        def run_while(env):
+            body_env = Environment(env, body_scope)
+            while condition(env):
+                if declares:
+                    body_env.reset()
+                for stmt in body:
+                    stmt(body_env)
+        return run_while
+
+    def compile_ForStatementNode(self, node):
+        slot = node.slot
+        iterable = self.compile_expression(node.iterable)
+        body = self.compile_block(node.body.statements)
+        body_scope = node.body_scope
+        declares = bool(body_scope.names)
+
+        def run_for(env):
+            body_env = Environment(env, body_scope)
+            slots = env.slots
+            for item in iterable(env):
+                slots[slot] = item
+                if declares:
+                    body_env.reset()
+                for stmt in body:
+                    stmt(body_env)
+        return run_for
+
+    def compile_ThrowStatementNode(self, node):
+        value = self.compile_expression(node.expression)
+
+        def run_throw(env):
+            raise ThrowException(value(env))
+        return run_throw
+
+    def compile_TryCatchFinallyNode(self, node):
+        try_block = self.compile_block(node.try_block.statements)
+        catch_block = self.compile_block(node.catch_block.statements) if node.catch_block else None
+        finally_block = self.compile_block(node.finally_block.statements) if node.finally_block else None
+        exception_slot = node.exception_slot if node.exception_var else None
+        try_scope, catch_scope, finally_scope = node.try_scope, node.catch_scope, node.finally_scope
+
+        def run_try(env):
+            try:
+                try_env = Environment(env, try_scope)
+                for stmt in try_block:
+                    stmt(try_env)
+            except ReturnException:
+                raise
+            except Exception as error:
+                if catch_block is None:
+                    raise
+                catch_env = Environment(env, catch_scope)
+                if exception_slot is not None:
+                    catch_env.slots[exception_slot] = thrown_value(error)
+                for stmt in catch_block:
+                    stmt(catch_env)
+            finally:
+                if finally_block is not None:
+                    finally_env = Environment(env, finally_scope)
+                    for stmt in finally_block:
+                        stmt(finally_env)
+        return run_try
+
+    # --------------------
+    # Expressions
+    # --------------------
+
+    def compile_expression(self, expr):
+        return self._compile_expr_table[type(expr)](self, expr)
+
+    def generic_compile_expression(self, expr):
+        evaluate = self.interpreter.evaluate
+
+        def eval_fallback(env):
+            return evaluate(expr, env)
+        return eval_fallback
+
+    def compile_literal(self, expr):
+        value = expr.value
+
+        def eval_literal(env):
+            return value
+        return eval_literal
+
+    compile_expr_NumberLiteralNode = compile_literal
+    compile_expr_StringLiteralNode = compile_literal
+    compile_expr_BoolLiteralNode = compile_literal
+
+    def compile_expr_IdentifierNode(self, expr):
+        name = expr.name
+        address = expr.address
+        if is_near(address):
+            depth, index = address[0]
+
+            def eval_slot(env):
+                value = (env.parent if depth else env).slots[index]
+                if value is UNSET:
+                    raise Exception(f"Variable '{name}' not defined")
+                return value
+            return eval_slot
+
+        def eval_identifier(env):
+            return env.lookup(address, name)
+        return eval_identifier
+
+    def compile_expr_BinaryOperationNode(self, expr):
+        if expr.op in ('=', '+='):
+            return self.compile_assignment(expr)
+        if expr.op not in BINARY_OPERATORS:
+            # Unknown operators keep failing at run time, like in the tree-walker.
+            return self.generic_compile_expression(expr)
+        op = BINARY_OPERATORS[expr.op]
+        left = self.compile_expression(expr.left)
+        right = self.compile_expression(expr.right)
+
+        def eval_binary(env):
+            return op(left(env), right(env))
+        return eval_binary
+
+    def compile_assignment(self, expr):
+        name = expr.left.name
+        address = expr.left.address
+        value = self.compile_expression(expr.right)
+        add = expr.op == '+='
+        if is_near(address):
+            depth, index = address[0]
+            if add:
+                def eval_add_assign_slot(env):
+                    slots = (env.parent if depth else env).slots
+                    current = slots[index]
+                    if current is UNSET:
+                        raise Exception(f"Variable '{name}' not defined")
+                    result = current + value(env)
+                    slots[index] = result
+                    return result
+                return eval_add_assign_slot
+
+            def eval_assign_slot(env):
+                result = value(env)
+                slots = (env.parent if depth else env).slots
+                if slots[index] is UNSET:
+                    raise Exception(f"Variable '{name}' not defined")
+                slots[index] = result
+                return result
+            return eval_assign_slot
+
+        if not add:
+            def eval_assign(env):
+                result = value(env)
+                env.store(address, name, result)
+                return result
+            return eval_assign
+
+        def eval_add_assign(env):
+            result = env.lookup(address, name) + value(env)
+            env.store(address, name, result)
+            return result
+        return eval_add_assign
+
+    def compile_expr_UnaryOperationNode(self, expr):
+        if expr.op not in UNARY_OPERATORS:
+            return self.generic_compile_expression(expr)
+        op = UNARY_OPERATORS[expr.op]
+        operand = self.compile_expression(expr.operand)
+
+        def eval_unary(env):
+            return op(operand(env))
+        return eval_unary
+
+    def compile_expr_FunctionCallNode(self, expr):
+        name = expr.function.name if isinstance(expr.function, IdentifierNode) else None
+        args = tuple(self.compile_expression(arg) for arg in expr.arguments)
+        interpreter = self.interpreter
+        functions = interpreter.functions
+
+        def eval_call(env):
+            function = functions.get(name)
+            if function is None:
+                raise Exception(f"Function '{name}' not defined")
+            return function.invoke([arg(env) for arg in args], interpreter)
+        return eval_call
+
+
+class ClosureInterpreter(Interpreter):
+    """
+    Drop-in replacement for Interpreter that compiles the program to closures once
+    and then runs them. Selected with `opalg --engine closure`.
+    """
+    def __init__(self):
+        super().__init__()
+        self.compiler = ClosureCompiler(self)
+
+    def interpret(self, node):
+        if not isinstance(node, ProgramNode):
+            raise Exception("Invalid AST root node")
+        self.resolve(node)
+        program = self.compiler.compile_program(node)
+        program(self.global_env)
+
+    def execute_FunctionDeclarationNode(self, node, env):
+        # Reached from the VM running a deep call (see vm.CallStack).
+        self.declare_function(node.name, CompiledFunction(node, self.compiler.compile_block(node.body.statements)))
+
+    def call_function(self, func, args):
+        # Reached from tree-walker fallbacks (e.g. JTML content) calling a compiled function.
+        return func.invoke(args, self)
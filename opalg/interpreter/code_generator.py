@@ -3,21 +3,25 @@
 from opalg.compiler.ast_nodes import (
     ProgramNode, VariableDeclarationNode, FunctionDeclarationNode,
     ReturnStatementNode, ShowStatementNode, SaveStatementNode,
-    DeleteStatementNode, IfStatementNode, WhileStatementNode, ForStatementNode,
+    DeleteStatementNode, ImportStatementNode, IfStatementNode, WhileStatementNode, ForStatementNode,
     ExpressionStatementNode, BinaryOperationNode, UnaryOperationNode,
     NumberLiteralNode, StringLiteralNode, BoolLiteralNode, IdentifierNode,
     FunctionCallNode, MemberAccessNode, AwaitExpressionNode,
     VoidType, IntType, FloatType, StringType, BoolType, CustomType, TypeNode
 )
+from opalg.compiler.visitor import Visitor
+
+class CodeGenerator(Visitor):
+    dispatch = {
+        '_generate_table': ('generate_', 'generic_generate'),
+        '_generate_expr_table': ('generate_expr_', 'generic_generate_expression'),
+    }
 
-class CodeGenerator:
     def __init__(self):
         self.output = []
     
     def generate(self, node):
-        method_name = f'generate_{type(node).__name__}'
-        generator = getattr(self, method_name, self.generic_generate)
-        generator(node)
+        self._generate_table[type(node)](self, node)
     
     def generic_generate(self, node):
         raise NotImplementedError(f'No generate_{type(node).__name__} method')
@@ -62,6 +66,9 @@ class CodeGenerator:
     def generate_DeleteStatementNode(self, node):
         self.output.append(f'delete({node.identifier});')
     
+    def generate_ImportStatementNode(self, node):
+        self.output.append(f'import "{node.path}";')
+    
     def generate_IfStatementNode(self, node):
         condition = self.generate_expression(node.condition)
         self.output.append(f'if ({condition}) {{')
@@ -94,9 +101,7 @@ class CodeGenerator:
     
     # Expression generation
     def generate_expression(self, expr):
-        method_name = f'generate_expr_{type(expr).__name__}'
-        generator = getattr(self, method_name, self.generic_generate_expression)
-        return generator(expr)
+        return self._generate_expr_table[type(expr)](self, expr)
     
     def generic_generate_expression(self, expr):
         raise NotImplementedError(f'No generate_expr_{type(expr).__name__} method')
@@ -0,0 +1,26 @@
+# opalg/interpreter/engines.py
+
+#
+# Registry of execution engines selectable with `opalg --engine <name>`.
+#
+# fenote: Engines are referenced by module path and imported on demand so that the
+#         CLI only loads the engine it actually runs.
+
+import importlib
+
+DEFAULT_ENGINE = 'tree'
+
+ENGINES = {
+    'tree': ('opalg.interpreter.interpreter', 'Interpreter'),
+    'closure': ('opalg.interpreter.closure_compiler', 'ClosureInterpreter'),
+    'vm': ('opalg.interpreter.vm', 'VMInterpreter'),
+    'python': ('opalg.interpreter.py_compiler', 'PyInterpreter'),
+}
+
+
+def get_engine(name):
+    """Return the interpreter class registered under `name`."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}'. Available engines: {', '.join(sorted(ENGINES))}")
+    module_name, class_name = ENGINES[name]
+    return getattr(importlib.import_module(module_name), class_name)
@@ -1,75 +1,261 @@
 # opalg/interpreter/interpreter.py
 
+import itertools
+
 from opalg.compiler.ast_nodes import *
-from opalg.interpreter.optimizer import Optimizer   # If you have an optimizer.py
-from opalg.interpreter.code_generator import CodeGenerator  # If you want to reference the code generator
+from opalg.compiler.resolver import Resolver, Scope
+from opalg.compiler.visitor import Visitor
+from opalg.interpreter import quickening
+from opalg.interpreter.quickening import QUICKEN_AFTER
+from opalg.startup import lazy_import
+
+# The jtml engine is the pybind11 extension "jtml_engine". It is only imported
+# the first time a JTML element is executed, so plain programs never load it.
+jtml_engine = lazy_import('jtml_engine')
+
 
-# If your jtml engine is exposed via pybind11 as "import jtml_engine"
-# then you must do:
-import jtml_engine
+class _Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<unset>'
+
+# Marks a slot whose variable has not been defined (yet) in this frame.
+UNSET = _Unset()
 
 
 class Environment:
-    def __init__(self, parent=None):
-        self.vars = {}
+    """
+    An array-backed frame. Variables live in `slots`, laid out by a resolver Scope, and
+    resolved code reaches them by (depth, index) address. The name-based methods serve
+    code that was not resolved; set() grows the scope on demand.
+    """
+    __slots__ = ('slots', 'parent', 'scope')
+
+    def __init__(self, parent=None, scope=None, slots=None):
         self.parent = parent
-    
+        self.scope = scope if scope is not None else Scope()
+        self.slots = slots if slots is not None else [UNSET] * len(self.scope.names)
+
+    def reset(self):
+        """Unbind every slot so a loop body can reuse the frame for its next iteration."""
+        self.slots[:] = [UNSET] * len(self.slots)
+
+    def grow(self):
+        """Make room for names declared in the scope after this frame was created."""
+        missing = len(self.scope.names) - len(self.slots)
+        if missing > 0:
+            self.slots.extend([UNSET] * missing)
+
+    # ---------------------
+    # Resolved access
+    # ---------------------
+
+    def lookup(self, address, name):
+        for depth, index in address:
+            env = self
+            while depth:
+                env = env.parent
+                depth -= 1
+            value = env.slots[index]
+            if value is not UNSET:
+                return value
+        raise Exception(f"Variable '{name}' not defined")
+
+    def store(self, address, name, value):
+        """Rebind an existing variable in the frame that defines it."""
+        for depth, index in address:
+            env = self
+            while depth:
+                env = env.parent
+                depth -= 1
+            if env.slots[index] is not UNSET:
+                env.slots[index] = value
+                return
+        raise Exception(f"Variable '{name}' not defined")
+
+    # ---------------------
+    # Access by name
+    # ---------------------
+
     def set(self, name, value):
-        self.vars[name] = value
-    
+        index = self.scope.index.get(name)
+        if index is None:
+            index = self.scope.declare(name)
+        if index >= len(self.slots):
+            self.grow()
+        self.slots[index] = value
+
+    def find(self, name):
+        """The (frame, index) where `name` is bound, or (None, None)."""
+        env = self
+        while env is not None:
+            index = env.scope.index.get(name)
+            if index is not None and index < len(env.slots) and env.slots[index] is not UNSET:
+                return env, index
+            env = env.parent
+        return None, None
+
     def get(self, name):
-        if name in self.vars:
-            return self.vars[name]
-        elif self.parent:
-            return self.parent.get(name)
-        else:
+        env, index = self.find(name)
+        if env is None:
             raise Exception(f"Variable '{name}' not defined")
-    
+        return env.slots[index]
+
+    def assign(self, name, value):
+        """Rebind an existing variable in the scope that defines it."""
+        env, index = self.find(name)
+        if env is None:
+            raise Exception(f"Variable '{name}' not defined")
+        env.slots[index] = value
+
     def exists(self, name):
-        if name in self.vars:
-            return True
-        elif self.parent:
-            return self.parent.exists(name)
-        else:
-            return False
+        return self.find(name)[0] is not None
+
+
+# Statements complete normally by returning None. A `return` or `throw` completes abruptly: its
+# handler returns a Completion, and every statement that runs a block hands the first
+# Completion of the block on to its own caller, up to the function call (which takes the
+# returned value) or the try statement (which catches the thrown one). Unwinding this way
+# costs a comparison per statement instead of a Python exception per call.
+#
+# fenote: A tail call (a `return f(...)` the resolver marked) completes with TAIL_CALL and
+#         the callee, its arguments and its frame padding. The call that is running the
+#         function then runs the callee in the same frame (see run_tail_calls), so a chain
+#         of tail calls needs neither Python stack nor new frames.
+RETURN = 'return'
+THROW = 'throw'
+TAIL_CALL = 'tail call'
+
+
+class Completion:
+    """The abrupt completion of a statement: how (RETURN or THROW) and with which value."""
+    __slots__ = ('kind', 'value')
+
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+    def __repr__(self):
+        return f'Completion({self.kind}, {self.value!r})'
 
 
-class Interpreter:
+class ReturnException(Exception):
+    """
+    Unwinds a function body up to its call site, carrying the returned value. The
+    tree-walker only raises it for a `return` outside any function (see unwind()).
+    """
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+
+class ThrowException(Exception):
+    """A thrown opalg value crossing a function call or leaving the program."""
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+
+# Calls. A call site keeps the function it last called in FunctionCallNode.target, tagged with
+# the epoch of the interpreter that called it. Every function declaration starts a new epoch,
+# so a site only looks its callee up by name again after some function was (re)defined. The
+# target also holds the callee's frame layout, checked against the site's argument count
+# when it is bound: a call then builds its frame in one step, arguments already in place.
+#
+# fenote: Every call the tree-walker runs nests a few Python frames, so recursion used to be
+#         capped by Python's recursion limit, at a depth of a hundred or so calls. Only the
+#         first PYTHON_CALL_DEPTH nested calls run on the Python stack: a call nested deeper
+#         runs on the VM (see call_on_vm and vm.CallStack), whose frames live on an explicit
+#         stack in the heap. MAX_CALL_DEPTH bounds the calls in progress on both.
+EPOCHS = itertools.count(1)
+PYTHON_CALL_DEPTH = 20
+MAX_CALL_DEPTH = 100000
+
+
+class Interpreter(Visitor):
+    dispatch = {
+        '_execute_table': ('execute_', 'generic_execute'),
+        '_evaluate_table': ('evaluate_', 'generic_evaluate'),
+    }
+
     def __init__(self):
-        self.global_env = Environment()
+        self.global_env = Environment(scope=Scope(kind='global'))
         self.functions = {}
-        # If you plan to actually use the CodeGenerator or Optimizer, you can instantiate them here
-        # e.g. self.codegen = CodeGenerator() or self.optimizer = Optimizer()
+        self.epoch = next(EPOCHS)
+        self.depth = 0         # nested function calls in progress on the Python stack
+        self.vm = None         # runs the calls nested deeper (see call_on_vm)
+        self.quickening_stats = None   # a quickening.QuickeningStats to count into, if any
+        self.modules = set()   # import paths of the modules already run by this interpreter
+        # If you plan to actually use the CodeGenerator or Optimizer, import them where they are
+        # used (opalg.interpreter.code_generator / opalg.interpreter.optimizer) to keep startup cheap
 
     def interpret(self, node):
         if isinstance(node, ProgramNode):
-            for stmt in node.statements:
-                self.execute(stmt, self.global_env)
+            self.resolve(node)
+            completion = self.execute_block(node.statements, self.global_env)
+            if completion is not None:
+                unwind(completion)
         else:
             raise Exception("Invalid AST root node")
     
+    def resolve(self, program):
+        """
+        Give every variable of `program` its frame slot. The global scope is kept across
+        calls, so names defined by an earlier program stay visible to the next one.
+        """
+        Resolver().resolve(program, self.global_env.scope)
+        self.global_env.grow()
+
     def execute(self, node, env):
-        method_name = f'execute_{type(node).__name__}'
-        executor = getattr(self, method_name, self.generic_execute)
-        return executor(node, env)
+        return self._execute_table[type(node)](self, node, env)
     
     def generic_execute(self, node, env):
         raise NotImplementedError(f'No execute_{type(node).__name__} method')
+
+    def execute_block(self, statements, env):
+        """Run `statements` in `env`; returns the Completion that cut them short, or None."""
+        table = self._execute_table
+        for stmt in statements:
+            completion = table[type(stmt)](self, stmt, env)
+            if completion is not None:
+                return completion
+        return None
     
     # ---------------------
     # Statement Handlers
     # ---------------------
 
     def execute_VariableDeclarationNode(self, node, env):
-        value = self.evaluate(node.value, env)
-        env.set(node.name, value)
+        env.slots[node.slot] = self.evaluate(node.value, env)
     
     def execute_FunctionDeclarationNode(self, node, env):
-        self.functions[node.name] = node
+        self.declare_function(node.name, node)
+
+    def declare_function(self, name, function):
+        """Bind `name` to `function`; call sites bound to earlier functions look it up again."""
+        self.functions[name] = function
+        self.epoch = next(EPOCHS)
+    
+    def execute_ImportStatementNode(self, node, env):
+        # The caller runs imported modules first, with interpret() on this interpreter (see
+        # watch.py), so their names are already in the global scope.
+        if node.path not in self.modules:
+            raise Exception(f"Module '{node.path}' is not loaded")
     
     def execute_ReturnStatementNode(self, node, env):
+        if node.tail:
+            call = node.expression
+            target = call.target
+            if target is None or target[0] != self.epoch:
+                target = call.target = self.bind_call(call)
+            _, func, padding = target
+            args = [self.evaluate(arg, env) for arg in call.arguments]
+            if padding is not None:
+                return Completion(TAIL_CALL, (func, args, padding))
+            return Completion(RETURN, self.call_function(func, args))
         value = self.evaluate(node.expression, env) if node.expression else None
-        raise ReturnException(value)
+        return Completion(RETURN, value)
     
     def execute_ShowStatementNode(self, node, env):
         value = self.evaluate(node.value, env)
@@ -78,30 +264,79 @@ class Interpreter:
     def execute_IfStatementNode(self, node, env):
         condition = self.evaluate(node.condition, env)
         if condition:
-            new_env = Environment(env)
-            for stmt in node.then_block.statements:
-                self.execute(stmt, new_env)
+            return self.execute_block(node.then_block.statements, Environment(env, node.then_scope))
         elif node.else_block:
-            new_env = Environment(env)
-            for stmt in node.else_block.statements:
-                self.execute(stmt, new_env)
+            return self.execute_block(node.else_block.statements, Environment(env, node.else_scope))
+        return None
     
     def execute_WhileStatementNode(self, node, env):
+        # One frame for the whole loop, cleared between iterations if the body declares anything.
+        body_env = Environment(env, node.body_scope)
+        declares = bool(node.body_scope.names)
+        table = self._execute_table
         while self.evaluate(node.condition, env):
-            new_env = Environment(env)
+            if declares:
+                body_env.reset()
             for stmt in node.body.statements:
-                self.execute(stmt, new_env)
+                completion = table[type(stmt)](self, stmt, body_env)
+                if completion is not None:
+                    return completion
+        return None
     
     def execute_ForStatementNode(self, node, env):
         iterable = self.evaluate(node.iterable, env)
+        body_env = Environment(env, node.body_scope)
+        declares = bool(node.body_scope.names)
+        table = self._execute_table
         for item in iterable:
-            env.set(node.iterator.name, item)
-            new_env = Environment(env)
+            env.slots[node.slot] = item
+            if declares:
+                body_env.reset()
             for stmt in node.body.statements:
-                self.execute(stmt, new_env)
+                completion = table[type(stmt)](self, stmt, body_env)
+                if completion is not None:
+                    return completion
+        return None
     
     def execute_ExpressionStatementNode(self, node, env):
         self.evaluate(node.expression, env)
+
+    def execute_ThrowStatementNode(self, node, env):
+        return Completion(THROW, self.evaluate(node.expression, env))
+
+    def execute_TryCatchFinallyNode(self, node, env):
+        # The finally block runs however the rest completes; when it completes abruptly
+        # itself, that completion replaces the pending one (or the pending Python error).
+        try:
+            completion = self.execute_try_catch(node, env)
+        except BaseException:
+            if node.finally_block:
+                outcome = self.execute_block(node.finally_block.statements, Environment(env, node.finally_scope))
+                if outcome is not None:
+                    return outcome
+            raise
+        if node.finally_block:
+            outcome = self.execute_block(node.finally_block.statements, Environment(env, node.finally_scope))
+            if outcome is not None:
+                return outcome
+        return completion
+
+    def execute_try_catch(self, node, env):
+        try:
+            completion = self.execute_block(node.try_block.statements, Environment(env, node.try_scope))
+        except ReturnException:
+            raise
+        except Exception as error:
+            # Errors raised by Python operations, and values thrown inside called functions.
+            if not node.catch_block:
+                raise
+            completion = Completion(THROW, thrown_value(error))
+        if completion is None or completion.kind is not THROW or not node.catch_block:
+            return completion
+        catch_env = Environment(env, node.catch_scope)
+        if node.exception_var:
+            catch_env.slots[node.exception_slot] = completion.value
+        return self.execute_block(node.catch_block.statements, catch_env)
     
     # -----------------------
     # Jtml Integration
@@ -122,40 +357,25 @@ class Interpreter:
         into a single jtml snippet that the C++ engine accepts.
         E.g.: #tagName attr:"val",attr2:"val2"\\ show "Hello"\\ #tagName
         """
-        snippet = f"#{node.tag_name}"
-        if node.attributes:
-            attr_parts = []
-            for k, v in node.attributes.items():
-                attr_parts.append(f'{k}:"{v}"')
-            if attr_parts:
-                snippet += " " + ", ".join(attr_parts)
-        snippet += " \\"  # open block (like #div style:"..."\\ )
-
+        content = []
         for item in node.content:
             if isinstance(item, ShowStatementNode):
                 # Evaluate the show statement's value in opalg
-                text_val = self.evaluate(item.value, env)
-                snippet += f'show "{text_val}"\\\\'
+                content.append(('show', None, self.evaluate(item.value, env)))
             elif isinstance(item, VariableDeclarationNode):
-                # define varName="val"\\
-                val = self.evaluate(item.value, env)
-                snippet += f'define {item.name}="{val}"\\\\'
+                content.append(('define', item.name, self.evaluate(item.value, env)))
             else:
                 raise NotImplementedError(
                     f"Cannot serialize {type(item).__name__} in jtml content"
                 )
-
-        snippet += f"#{node.tag_name}"
-        return snippet
+        return jtml_snippet(node.tag_name, node.attributes, content)
 
     # --------------------
     # Expression evaluation
     # --------------------
     
     def evaluate(self, expr, env):
-        method_name = f'evaluate_{type(expr).__name__}'
-        evaluator = getattr(self, method_name, self.generic_evaluate)
-        return evaluator(expr, env)
+        return self._evaluate_table[type(expr)](self, expr, env)
     
     def generic_evaluate(self, expr, env):
         raise NotImplementedError(f'No evaluate_{type(expr).__name__} method')
@@ -170,22 +390,235 @@ class Interpreter:
         return expr.value
     
     def evaluate_IdentifierNode(self, expr, env):
-        return env.get(expr.name)
+        address = expr.address
+        if len(address) == 1:
+            depth, index = address[0]
+            frame = env
+            while depth:
+                frame = frame.parent
+                depth -= 1
+            value = frame.slots[index]
+            if value is not UNSET:
+                return value
+        return env.lookup(address, expr.name)
     
     def evaluate_BinaryOperationNode(self, expr, env):
+        if expr.op == '=':
+            value = self.evaluate(expr.right, env)
+            env.store(expr.left.address, expr.left.name, value)
+            return value
+        elif expr.op == '+=':
+            target = expr.left
+            value = env.lookup(target.address, target.name) + self.evaluate(expr.right, env)
+            env.store(target.address, target.name, value)
+            return value
         left = self.evaluate(expr.left, env)
         right = self.evaluate(expr.right, env)
-        if expr.op == '+':
-            return left + right
+        if expr.observed < QUICKEN_AFTER:
+            quickening.observe(expr, left, right, self.quickening_stats)
+        return binary_operation(expr.op, left, right)
+
+    # ---------------------
+    # Quickened operations (see quickening.py): one evaluate_ handler per specialization,
+    # made by quickened_handler; a failed type check deoptimizes the node
+    # ---------------------
+
+    def deoptimize(self, expr, left, right):
+        quickening.deoptimize(expr, self.quickening_stats)
+        return binary_operation(expr.op, left, right)
+
+    def evaluate_UnaryOperationNode(self, expr, env):
+        operand = self.evaluate(expr.operand, env)
+        if expr.op == '!':
+            return not operand
         elif expr.op == '-':
-            return left - right
-        elif expr.op == '*':
-            return left * right
-        elif expr.op == '/':
-            return left / right
-        elif expr.op == '&&':
-            return left and right
-        elif expr.op == '||':
-            return left or right
-        elif expr.op == '==':
-            return left 
+            return -operand
+        else:
+            raise Exception(f"Unknown unary operator {expr.op}")
+
+    def evaluate_FunctionCallNode(self, expr, env):
+        target = expr.target
+        if target is None or target[0] != self.epoch:
+            target = expr.target = self.bind_call(expr)
+        _, func, padding = target
+        args = [self.evaluate(arg, env) for arg in expr.arguments]
+        depth = self.depth + 1
+        if padding is None or depth > PYTHON_CALL_DEPTH:
+            return self.call_function(func, args)
+        # run_function and execute_body, inlined for the common case
+        frame = Environment(self.global_env, func.scope, args + padding)
+        self.depth = depth
+        try:
+            completion = self.execute_block(func.body.statements, frame)
+            if completion is not None and completion.kind is TAIL_CALL:
+                completion = self.run_tail_calls(completion, frame)
+        finally:
+            self.depth = depth - 1
+        if completion is None:
+            return None
+        if completion.kind is RETURN:
+            return completion.value
+        raise ThrowException(completion.value)
+
+    def bind_call(self, expr):
+        """
+        The target of call site `expr` in the current epoch: (epoch, function, padding), where
+        padding fills the frame after the arguments, or is None to go through call_function.
+        """
+        name = expr.function.name if isinstance(expr.function, IdentifierNode) else None
+        if name not in self.functions:
+            raise Exception(f"Function '{name}' not defined")
+        func = self.functions[name]
+        padding = None
+        if isinstance(func, FunctionDeclarationNode) and len(expr.arguments) == len(func.parameters):
+            padding = frame_padding(func)
+        return (self.epoch, func, padding)
+
+    def call_function(self, func, args):
+        if len(args) != len(func.parameters):
+            raise Exception(f"Function '{func.name}' expects {len(func.parameters)} arguments, got {len(args)}")
+        if self.depth >= PYTHON_CALL_DEPTH:
+            return self.call_on_vm(func, args)
+        call_env = Environment(self.global_env, func.scope)
+        for index, value in zip(func.param_slots, args):
+            call_env.slots[index] = value
+        return self.run_function(func, call_env)
+
+    def call_on_vm(self, func, args):
+        """The value of a call nested too deep for the Python stack, made on the VM (see the header)."""
+        if self.vm is None:
+            from opalg.interpreter.vm import CallStack
+            self.vm = CallStack(self)
+        return self.vm.call(func, args)
+
+    def run_function(self, func, frame):
+        """Run the body of `func` in its call frame; returns the value of the call."""
+        depth = self.depth
+        self.depth = depth + 1
+        try:
+            completion = self.execute_body(func, frame)
+        finally:
+            self.depth = depth
+        if completion is None:
+            return None
+        if completion.kind is RETURN:
+            return completion.value
+        raise ThrowException(completion.value)
+
+    def execute_body(self, func, frame):
+        """Run the body of `func` in `frame`, and the tail calls it ends with; returns the completion."""
+        completion = self.execute_block(func.body.statements, frame)
+        if completion is not None and completion.kind is TAIL_CALL:
+            completion = self.run_tail_calls(completion, frame)
+        return completion
+
+    def run_tail_calls(self, completion, frame):
+        """Run the callee of each TAIL_CALL completion in `frame`; returns the first other completion."""
+        while completion is not None and completion.kind is TAIL_CALL:
+            func, args, padding = completion.value
+            frame.scope = func.scope
+            slots = frame.slots
+            slots[:] = args
+            slots.extend(padding)
+            completion = self.execute_block(func.body.statements, frame)
+        return completion
+
+
+def quickened_handler(node_class):
+    """The evaluate_ handler of a quickening specialization: check both operand types, apply the operator."""
+    operand_type = node_class.operand_type
+    operation = node_class.operation
+    index = quickening.INDEX[node_class]
+
+    def evaluate(self, expr, env):
+        left = self.evaluate(expr.left, env)
+        right = self.evaluate(expr.right, env)
+        if type(left) is operand_type and type(right) is operand_type:
+            if self.quickening_stats is not None:
+                self.quickening_stats.hits[index] += 1
+            return operation(left, right)
+        return self.deoptimize(expr, left, right)
+    evaluate.__name__ = f'evaluate_{node_class.__name__}'
+    evaluate.__qualname__ = f'Interpreter.{evaluate.__name__}'
+    return evaluate
+
+
+for _node_class in quickening.SPECIALIZATIONS:
+    setattr(Interpreter, f'evaluate_{_node_class.__name__}', quickened_handler(_node_class))
+
+
+def binary_operation(op, left, right):
+    """Apply binary operator `op` (anything but '=' and '+=') to two evaluated operands."""
+    if op == '+':
+        return left + right
+    elif op == '-':
+        return left - right
+    elif op == '*':
+        return left * right
+    elif op == '/':
+        return left / right
+    elif op == '&&':
+        return left and right
+    elif op == '||':
+        return left or right
+    elif op == '==':
+        return left == right
+    elif op == '!=':
+        return left != right
+    elif op == '<':
+        return left < right
+    elif op == '>':
+        return left > right
+    elif op == '<=':
+        return left <= right
+    elif op == '>=':
+        return left >= right
+    else:
+        raise Exception(f"Unknown binary operator {op}")
+
+
+def frame_padding(func):
+    """
+    The UNSET slots that follow the arguments in a call frame of `func`, or None when its
+    parameters do not hold the first slots in order (a parameter name is repeated).
+    """
+    if func.param_slots != tuple(range(len(func.param_slots))):
+        return None
+    return [UNSET] * (len(func.scope.names) - len(func.param_slots))
+
+
+def unwind(completion):
+    """Raise the exception a Completion leaving the tree-walker turns into (see ReturnException)."""
+    if completion.kind is RETURN:
+        raise ReturnException(completion.value)
+    raise ThrowException(completion.value)
+
+
+def thrown_value(error):
+    """The value a `catch (e)` block sees for a Python-level exception."""
+    return error.value if isinstance(error, ThrowException) else str(error)
+
+
+def jtml_snippet(tag_name, attributes, content):
+    """
+    The jtml snippet for an element whose content was evaluated to `content`:
+    ('show', None, value) and ('define', name, value) items, in order.
+    """
+    snippet = f"#{tag_name}"
+    if attributes:
+        attr_parts = []
+        for k, v in attributes.items():
+            attr_parts.append(f'{k}:"{v}"')
+        if attr_parts:
+            snippet += " " + ", ".join(attr_parts)
+    snippet += " \\"  # open block (like #div style:"..."\\ )
+
+    for kind, name, value in content:
+        if kind == 'show':
+            snippet += f'show "{value}"\\\\'
+        else:
+            # define varName="val"\\
+            snippet += f'define {name}="{value}"\\\\'
+
+    snippet += f"#{tag_name}"
+    return snippet
@@ -1,15 +1,16 @@
 # interpreter/optimizer.py
 
 from opalg.compiler.ast_nodes import *
+from opalg.compiler.visitor import Visitor
+
+class Optimizer(Visitor):
+    dispatch = {'_optimize_table': ('optimize_', 'generic_optimize')}
 
-class Optimizer:
     def __init__(self):
         pass
     
     def optimize(self, node):
-        method_name = f'optimize_{type(node).__name__}'
-        optimizer = getattr(self, method_name, self.generic_optimize)
-        return optimizer(node)
+        return self._optimize_table[type(node)](self, node)
     
     def generic_optimize(self, node):
         return node
@@ -0,0 +1,675 @@
+# opalg/interpreter/py_compiler.py
+
+#
+# Execution engine that compiles opalg programs to CPython code objects.
+#
+# fenote: PyCompiler lowers a resolved program into a Python `ast.Module` and compile()s it,
+#         so statements and expressions run as CPython bytecode instead of being dispatched
+#         node by node. Every opalg function becomes a module-level `def`, the top-level
+#         statements the body of `program()`. Variables of the global scope are Python
+#         globals (g_<name>) of a namespace the interpreter keeps across interpret() calls;
+#         variables of every other scope are locals of the enclosing def (l<n>_<name>, one n
+#         per Scope), so entering a block costs nothing.
+#
+# fenote: As in the tree-walker frames, an unbound variable holds UNSET. A read of a variable
+#         that is certainly bound at that point (declared earlier in the same or an enclosing
+#         block of the same function) is a plain name load. Any other read tests the address
+#         candidates of the resolver in order and raises "not defined" after the last one.
+#         The global name always ends the chain, whatever earlier programs declared, so the
+#         generated code only depends on the program and can be cached. Names a block may
+#         leave unbound (for-loop variables) are reset to UNSET whenever the block is entered.
+#
+# fenote: Calls index the interpreter's FunctionTable with a constant (name, number of
+#         arguments) key and call the Python function they get directly. `&&` and `||`
+#         evaluate both sides, like the tree-walker: they become Python `and`/`or` only when
+#         the right side can neither fail nor have an effect. Nodes the tree-walker has no
+#         handler for raise its NotImplementedError when they run.
+#
+# fenote: Every opalg call nests one Python frame, so the engine raises Python's recursion
+#         limit to RECURSION_LIMIT (for the whole process, never lowering it) and reports a
+#         RecursionError as opalg's "Maximum call depth exceeded". A tail call of the running
+#         function itself (`return f(...)` inside f, outside any loop) does not nest: the
+#         def runs its body in a `while True` loop, and the call rebinds the parameters and
+#         starts the body over, unless `f` has been redefined meanwhile.
+#
+# fenote: Like __pycache__, code objects are cached (marshal) in <cache dir>/code. An entry is
+#         named after the sha256 of the serialized AST (compiler/serializer.py) and a stamp of
+#         the Python version and of the code that produced it. After every write the directory
+#         is trimmed to $OPALG_CODE_CACHE_SIZE bytes (default 64 MiB); 0 turns the cache off.
+
+import ast
+import hashlib
+import marshal
+import os
+import sys
+import types
+
+from opalg.compiler.ast_nodes import *
+from opalg.compiler.visitor import Visitor
+from opalg.interpreter import interpreter as tree_interpreter
+from opalg.interpreter.interpreter import (
+    Interpreter, ReturnException, ThrowException, UNSET, jtml_snippet, thrown_value
+)
+
+CACHE_SIZE_ENV = 'OPALG_CODE_CACHE_SIZE'
+CACHE_SUBDIR = 'code'
+ENTRY_SUFFIX = '.opcode'
+FILENAME = '<opalg>'
+RECURSION_LIMIT = 20000
+DEPTH_ERROR = "Maximum call depth exceeded"
+
+ARITHMETIC_OPERATORS = {'+': ast.Add, '-': ast.Sub, '*': ast.Mult, '/': ast.Div}
+COMPARISON_OPERATORS = {'==': ast.Eq, '!=': ast.NotEq, '<': ast.Lt, '>': ast.Gt, '<=': ast.LtE, '>=': ast.GtE}
+LOGICAL_OPERATORS = {'&&': (ast.And, 'and_'), '||': (ast.Or, 'or_')}
+
+
+# ---------------------
+# Runtime
+# ---------------------
+
+def undefined(name):
+    raise Exception(f"Variable '{name}' not defined")
+
+
+def and_(left, right):
+    return left and right
+
+
+def or_(left, right):
+    return left or right
+
+
+def unknown_binary(left, right, op):
+    raise Exception(f"Unknown binary operator {op}")
+
+
+def unknown_unary(operand, op):
+    raise Exception(f"Unknown unary operator {op}")
+
+
+def unsupported(message):
+    raise NotImplementedError(message)
+
+
+def caught_value(error):
+    """thrown_value, with Python running out of recursion reported as opalg's depth error."""
+    if isinstance(error, RecursionError):
+        return DEPTH_ERROR
+    return thrown_value(error)
+
+
+# Names the generated code expects in its namespace, besides the per-interpreter ones.
+RUNTIME = {
+    'UNSET': UNSET,
+    'ReturnException': ReturnException,
+    'ThrowException': ThrowException,
+    'thrown_value': caught_value,
+    'undefined': undefined,
+    'and_': and_,
+    'or_': or_,
+    'unknown_binary': unknown_binary,
+    'unknown_unary': unknown_unary,
+    'unsupported': unsupported,
+}
+
+
+class FunctionTable(dict):
+    """(name, number of arguments) -> Python function, indexed by the call sites."""
+    def __init__(self):
+        super().__init__()
+        self.arity = {}   # name -> number of parameters of the function declared last
+
+    def declare(self, name, arity, function):
+        previous = self.arity.get(name)
+        if previous is not None:
+            del self[name, previous]
+        self.arity[name] = arity
+        self[name, arity] = function
+
+    def __missing__(self, key):
+        name, count = key
+        if name not in self.arity:
+            raise Exception(f"Function '{name}' not defined")
+        expected = self.arity[name]
+
+        # Raised once the arguments are evaluated, like in the tree-walker.
+        def wrong_arity(*args):
+            raise Exception(f"Function '{name}' expects {expected} arguments, got {count}")
+        return wrong_arity
+
+
+# ---------------------
+# Lowering
+# ---------------------
+
+def load(name):
+    return ast.Name(id=name, ctx=ast.Load())
+
+
+def call(function, *args):
+    return ast.Call(func=load(function), args=list(args), keywords=[])
+
+
+def is_set(name):
+    return ast.Compare(left=load(name), ops=[ast.IsNot()], comparators=[load('UNSET')])
+
+
+def locate(statement, lineno):
+    """Give a generated statement the opalg source line it comes from."""
+    statement.lineno = statement.end_lineno = lineno
+    statement.col_offset = statement.end_col_offset = 0
+    return statement
+
+
+class FunctionState:
+    """The Python function being generated: its scope chain and what is bound so far."""
+    def __init__(self, global_scope, top_level=False, function=None, name=None):
+        self.scopes = [global_scope]   # resolver Scopes, innermost last
+        self.top_level = top_level     # program(): `return` raises ReturnException
+        self.function = function       # the FunctionDeclarationNode being lowered, if any
+        self.name = name               # ... the name of its def
+        self.parameters = ()           # ... and the Python names of its parameters
+        self.loops = 0                 # Python loops around the current statement
+        self.restarts = False          # a self tail call starts the body over (see the header)
+        self.bound = set()             # Python names certainly bound at the current point
+        self.scope_ids = {}            # Scope -> n of its local names
+        self.stored_globals = set()    # global names assigned, for the `global` statement
+        self.temps = 0
+
+
+class PyCompiler(Visitor):
+    dispatch = {
+        '_lower_table': ('lower_', 'generic_lower'),
+        '_lower_expr_table': ('lower_expr_', 'generic_lower_expression'),
+    }
+
+    def __init__(self):
+        self.functions = []   # the defs of the opalg functions
+        self.state = None
+        self.lineno = 1
+
+    def lower_program(self, node):
+        """The ast.Module of a resolved ProgramNode; running it runs the program."""
+        self.state = FunctionState(node.scope, top_level=True)
+        body = self.lower_statements(node.statements)
+        program = self.make_function('program', [], body)
+        module = ast.Module(body=self.functions + [program, ast.Expr(value=call('program'))], type_ignores=[])
+        return ast.fix_missing_locations(module)
+
+    def make_function(self, name, parameters, body, lineno=1):
+        if self.state.stored_globals:
+            body.insert(0, ast.Global(names=sorted(self.state.stored_globals)))
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=parameter) for parameter in parameters],
+                                  vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+        return locate(ast.FunctionDef(name=name, args=arguments, body=body or [ast.Pass()], decorator_list=[],
+                                      returns=None), lineno)
+
+    # ---------------------
+    # Names
+    # ---------------------
+
+    def python_name(self, scope, name):
+        if scope.kind == 'global':
+            return f'g_{name}'
+        scope_ids = self.state.scope_ids
+        if scope not in scope_ids:
+            scope_ids[scope] = len(scope_ids)
+        return f'l{scope_ids[scope]}_{name}'
+
+    def candidates(self, expr):
+        """The Python names an identifier may refer to, nearest first (see the header)."""
+        scopes = self.state.scopes
+        names = []
+        for depth, _index in expr.address:
+            scope = scopes[-1 - depth]
+            if scope.kind != 'global':
+                names.append(self.python_name(scope, expr.name))
+        if not names or names[-1] not in self.state.bound:
+            names.append(f'g_{expr.name}')
+        return names
+
+    def temp(self):
+        self.state.temps += 1
+        return f't{self.state.temps}'
+
+    def target(self, name):
+        if name.startswith('g_'):
+            self.state.stored_globals.add(name)
+        return ast.Name(id=name, ctx=ast.Store())
+
+    def assign(self, name, value):
+        return ast.Assign(targets=[self.target(name)], value=value)
+
+    def read(self, expr):
+        bound = self.state.bound
+        value = call('undefined', ast.Constant(expr.name))
+        for name in reversed(self.candidates(expr)):
+            if name in bound:
+                value = load(name)
+            else:
+                value = ast.IfExp(test=is_set(name), body=load(name), orelse=value)
+        return value
+
+    def store(self, expr, value):
+        """Statements rebinding the variable `expr` refers to, where it is bound, to `value`."""
+        names = self.candidates(expr)
+        if names[0] in self.state.bound:
+            return [self.assign(names[0], value)]
+        temp = self.temp()
+        chain = [ast.Expr(value=call('undefined', ast.Constant(expr.name)))]
+        for name in reversed(names):
+            if name in self.state.bound:
+                chain = [self.assign(name, load(temp))]
+            else:
+                chain = [ast.If(test=is_set(name), body=[self.assign(name, load(temp))], orelse=chain)]
+        return [self.assign(temp, value)] + chain
+
+    # ---------------------
+    # Statements
+    # ---------------------
+
+    def lower(self, node):
+        if node.lineno is not None:
+            self.lineno = node.lineno
+        lineno = self.lineno
+        statements = self._lower_table[type(node)](self, node)
+        for statement in statements:
+            if getattr(statement, 'lineno', None) is None:
+                locate(statement, lineno)
+        return statements
+
+    def lower_statements(self, statements):
+        body = []
+        for stmt in statements:
+            body.extend(self.lower(stmt))
+        return body
+
+    def lower_block(self, statements, scope, entry=()):
+        """
+        The statements of a block run in a frame of `scope`, after `entry`: (name, value)
+        pairs bound when the block is entered.
+        """
+        state = self.state
+        state.scopes.append(scope)
+        saved = set(state.bound)
+        body = [self.assign(self.python_name(scope, name), value) for name, value in entry]
+        state.bound.update(self.python_name(scope, name) for name, _value in entry)
+        # Frames start empty: clear what an earlier run of the block may have bound.
+        unbound = []
+        for stmt in statements:
+            if isinstance(stmt, ForStatementNode):
+                name = self.python_name(scope, stmt.iterator.name)
+                if name not in state.bound and name not in unbound:
+                    unbound.append(name)
+        if unbound:
+            body.insert(0, ast.Assign(targets=[self.target(name) for name in unbound], value=load('UNSET')))
+        body.extend(self.lower_statements(statements))
+        state.scopes.pop()
+        state.bound = saved
+        return body
+
+    def generic_lower(self, node):
+        message = f'No execute_{type(node).__name__} method'
+        return [ast.Raise(exc=call('NotImplementedError', ast.Constant(message)), cause=None)]
+
+    def lower_VariableDeclarationNode(self, node):
+        value = self.lower_expression(node.value)
+        name = self.python_name(self.state.scopes[-1], node.name)
+        statement = self.assign(name, value)
+        self.state.bound.add(name)
+        return [statement]
+
+    def lower_FunctionDeclarationNode(self, node):
+        outer = self.state
+        index = len(self.functions)
+        self.functions.append(None)   # its place, before the functions declared in its body
+        name = f'f{index}_{node.name}'
+        self.state = FunctionState(outer.scopes[0], function=node, name=name)
+        names = [self.python_name(node.scope, parameter.name) for parameter in node.parameters]
+        if len(set(names)) == len(names):
+            parameters, entry = names, ()
+            self.state.bound.update(names)
+        else:
+            # A repeated parameter is bound to the last argument it names, as in the tree-walker.
+            parameters = [f'a{index}' for index in range(len(names))]
+            entry = [(parameter.name, load(argument)) for parameter, argument in zip(node.parameters, parameters)]
+        self.state.parameters = parameters
+        body = self.lower_block(node.body.statements, node.scope, entry)
+        if self.state.restarts:
+            body = [ast.While(test=ast.Constant(True), body=body + [ast.Return(value=ast.Constant(None))],
+                              orelse=[])]
+        self.functions[index] = self.make_function(name, parameters, body, node.lineno or 1)
+        self.state = outer
+        declare = ast.Attribute(value=load('functions'), attr='declare', ctx=ast.Load())
+        return [ast.Expr(value=ast.Call(func=declare, args=[ast.Constant(node.name), ast.Constant(len(names)),
+                                                            load(name)], keywords=[]))]
+
+    def lower_ImportStatementNode(self, node):
+        return [ast.Expr(value=call('require', ast.Constant(node.path)))]
+
+    def lower_ReturnStatementNode(self, node):
+        if node.tail and self.is_self_call(node.expression):
+            return self.lower_self_tail_call(node.expression)
+        value = self.lower_expression(node.expression) if node.expression else ast.Constant(None)
+        if self.state.top_level:
+            return [ast.Raise(exc=call('ReturnException', value), cause=None)]
+        return [ast.Return(value=value)]
+
+    def is_self_call(self, expr):
+        state = self.state
+        return (state.function is not None and not state.loops and expr.function.name == state.function.name
+                and len(expr.arguments) == len(state.parameters))
+
+    def lower_self_tail_call(self, expr):
+        """`return f(...)` in f: start the body over with the new arguments, if f is still f."""
+        callee = self.temp()
+        key = ast.Constant((expr.function.name, len(expr.arguments)))
+        statements = [self.assign(callee, ast.Subscript(value=load('functions'), slice=key, ctx=ast.Load()))]
+        args = []
+        for arg in expr.arguments:
+            args.append(self.temp())
+            statements.append(self.assign(args[-1], self.lower_expression(arg)))
+        restart = [ast.Continue()]
+        if args:
+            targets = ast.Tuple(elts=[ast.Name(id=name, ctx=ast.Store()) for name in self.state.parameters],
+                                ctx=ast.Store())
+            restart.insert(0, ast.Assign(targets=[targets], value=ast.Tuple(elts=[load(arg) for arg in args],
+                                                                            ctx=ast.Load())))
+        self.state.restarts = True
+        test = ast.Compare(left=load(callee), ops=[ast.Is()], comparators=[load(self.state.name)])
+        fallback = ast.Return(value=ast.Call(func=load(callee), args=[load(arg) for arg in args], keywords=[]))
+        return statements + [ast.If(test=test, body=restart, orelse=[]), fallback]
+
+    def lower_ShowStatementNode(self, node):
+        return [ast.Expr(value=call('print', self.lower_expression(node.value)))]
+
+    def lower_ExpressionStatementNode(self, node):
+        expr = node.expression
+        if isinstance(expr, BinaryOperationNode) and expr.op in ('=', '+='):
+            return self.store(expr.left, self.assigned_value(expr))
+        return [ast.Expr(value=self.lower_expression(expr))]
+
+    def lower_IfStatementNode(self, node):
+        test = self.lower_expression(node.condition)
+        body = self.lower_block(node.then_block.statements, node.then_scope)
+        orelse = self.lower_block(node.else_block.statements, node.else_scope) if node.else_block else []
+        return [ast.If(test=test, body=body or [ast.Pass()], orelse=orelse)]
+
+    def lower_WhileStatementNode(self, node):
+        test = self.lower_expression(node.condition)
+        self.state.loops += 1
+        body = self.lower_block(node.body.statements, node.body_scope)
+        self.state.loops -= 1
+        return [ast.While(test=test, body=body or [ast.Pass()], orelse=[])]
+
+    def lower_ForStatementNode(self, node):
+        iterable = self.lower_expression(node.iterable)
+        target = self.target(self.python_name(self.state.scopes[-1], node.iterator.name))
+        self.state.loops += 1
+        body = self.lower_block(node.body.statements, node.body_scope)
+        self.state.loops -= 1
+        return [ast.For(target=target, iter=iterable, body=body or [ast.Pass()], orelse=[])]
+
+    def lower_ThrowStatementNode(self, node):
+        return [ast.Raise(exc=call('ThrowException', self.lower_expression(node.expression)), cause=None)]
+
+    def lower_TryCatchFinallyNode(self, node):
+        body = self.lower_block(node.try_block.statements, node.try_scope)
+        handlers = []
+        if node.catch_block:
+            error = self.temp()
+            entry = [(node.exception_var.name, call('thrown_value', load(error)))] if node.exception_var else ()
+            catch_body = self.lower_block(node.catch_block.statements, node.catch_scope, entry)
+            if self.state.top_level:
+                handlers.append(ast.ExceptHandler(type=load('ReturnException'), name=None,
+                                                  body=[ast.Raise(exc=None, cause=None)]))
+            handlers.append(ast.ExceptHandler(type=load('Exception'), name=error, body=catch_body or [ast.Pass()]))
+        finalbody = self.lower_block(node.finally_block.statements, node.finally_scope) if node.finally_block else []
+        if not handlers and not finalbody:
+            return body
+        return [ast.Try(body=body or [ast.Pass()], handlers=handlers, orelse=[], finalbody=finalbody)]
+
+    def lower_JTMLElementNode(self, node):
+        content = []
+        for item in node.content:
+            if isinstance(item, ShowStatementNode):
+                content.append(ast.Tuple(elts=[ast.Constant('show'), ast.Constant(None),
+                                               self.lower_expression(item.value)], ctx=ast.Load()))
+            elif isinstance(item, VariableDeclarationNode):
+                content.append(ast.Tuple(elts=[ast.Constant('define'), ast.Constant(item.name),
+                                               self.lower_expression(item.value)], ctx=ast.Load()))
+            else:
+                message = f"Cannot serialize {type(item).__name__} in jtml content"
+                content.append(call('unsupported', ast.Constant(message)))
+                break
+        attributes = ast.Dict(keys=[ast.Constant(str(key)) for key in (node.attributes or {})],
+                              values=[ast.Constant(str(value)) for value in (node.attributes or {}).values()])
+        return [ast.Expr(value=call('jtml', ast.Constant(node.tag_name), attributes,
+                                    ast.List(elts=content, ctx=ast.Load())))]
+
+    # --------------------
+    # Expressions
+    # --------------------
+
+    def lower_expression(self, expr):
+        return self._lower_expr_table[type(expr)](self, expr)
+
+    def generic_lower_expression(self, expr):
+        return call('unsupported', ast.Constant(f'No evaluate_{type(expr).__name__} method'))
+
+    def lower_literal(self, expr):
+        return ast.Constant(expr.value)
+
+    lower_expr_NumberLiteralNode = lower_literal
+    lower_expr_StringLiteralNode = lower_literal
+    lower_expr_BoolLiteralNode = lower_literal
+
+    def lower_expr_IdentifierNode(self, expr):
+        return self.read(expr)
+
+    def lower_expr_BinaryOperationNode(self, expr):
+        op = expr.op
+        if op in ('=', '+='):
+            return self.lower_assignment(expr)
+        left = self.lower_expression(expr.left)
+        right = self.lower_expression(expr.right)
+        if op in ARITHMETIC_OPERATORS:
+            return ast.BinOp(left=left, op=ARITHMETIC_OPERATORS[op](), right=right)
+        if op in COMPARISON_OPERATORS:
+            return ast.Compare(left=left, ops=[COMPARISON_OPERATORS[op]()], comparators=[right])
+        if op in LOGICAL_OPERATORS:
+            operator, helper = LOGICAL_OPERATORS[op]
+            if self.is_safe(expr.right):
+                return ast.BoolOp(op=operator(), values=[left, right])
+            return call(helper, left, right)
+        # Unknown operators keep failing at run time, like in the tree-walker.
+        return call('unknown_binary', left, right, ast.Constant(op))
+
+    def assigned_value(self, expr):
+        """The value an `=` or `+=` expression stores."""
+        value = self.lower_expression(expr.right)
+        if expr.op == '+=':
+            return ast.BinOp(left=self.read(expr.left), op=ast.Add(), right=value)
+        return value
+
+    def lower_assignment(self, expr):
+        value = self.assigned_value(expr)
+        names = self.candidates(expr.left)
+        if names[0] in self.state.bound:
+            return ast.NamedExpr(target=self.target(names[0]), value=value)
+        temp = self.temp()
+        chain = call('undefined', ast.Constant(expr.left.name))
+        for name in reversed(names):
+            rebind = ast.NamedExpr(target=self.target(name), value=load(temp))
+            chain = rebind if name in self.state.bound else ast.IfExp(test=is_set(name), body=rebind, orelse=chain)
+        pair = ast.Tuple(elts=[ast.NamedExpr(target=self.target(temp), value=value), chain], ctx=ast.Load())
+        return ast.Subscript(value=pair, slice=ast.Constant(1), ctx=ast.Load())
+
+    def lower_expr_UnaryOperationNode(self, expr):
+        operand = self.lower_expression(expr.operand)
+        if expr.op == '!':
+            return ast.UnaryOp(op=ast.Not(), operand=operand)
+        if expr.op == '-':
+            return ast.UnaryOp(op=ast.USub(), operand=operand)
+        return call('unknown_unary', operand, ast.Constant(expr.op))
+
+    def lower_expr_FunctionCallNode(self, expr):
+        name = expr.function.name if isinstance(expr.function, IdentifierNode) else None
+        function = ast.Subscript(value=load('functions'), slice=ast.Constant((name, len(expr.arguments))),
+                                 ctx=ast.Load())
+        return ast.Call(func=function, args=[self.lower_expression(arg) for arg in expr.arguments], keywords=[])
+
+    def is_safe(self, expr):
+        """Whether evaluating `expr` can neither raise nor have an effect."""
+        if isinstance(expr, (NumberLiteralNode, StringLiteralNode, BoolLiteralNode)):
+            return True
+        if isinstance(expr, IdentifierNode):
+            return any(name in self.state.bound for name in self.candidates(expr))
+        if isinstance(expr, UnaryOperationNode):
+            return expr.op == '!' and self.is_safe(expr.operand)
+        if isinstance(expr, BinaryOperationNode):
+            return expr.op in ('==', '!=', '&&', '||') and self.is_safe(expr.left) and self.is_safe(expr.right)
+        return False
+
+
+# ---------------------
+# Code cache
+# ---------------------
+
+_code_stamp = None
+
+
+def code_stamp():
+    """Identifies what a code object depends on besides the program (see ast_cache.toolchain_stamp)."""
+    global _code_stamp
+    if _code_stamp is None:
+        from importlib.util import MAGIC_NUMBER
+        from opalg.parser.ast_cache import toolchain_stamp
+
+        package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        files = [os.path.join(package, 'compiler', 'resolver.py'), os.path.abspath(__file__)]
+        digest = hashlib.sha256(f'{toolchain_stamp()}\n{MAGIC_NUMBER.hex()}\n'.encode('utf-8'))
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f'{os.path.basename(path)} {stat.st_size} {stat.st_mtime_ns}\n'.encode('utf-8'))
+        _code_stamp = digest.hexdigest()
+    return _code_stamp
+
+
+def code_cache_dir():
+    from opalg.parser.table_cache import cache_dir
+    return os.path.join(cache_dir(), CACHE_SUBDIR)
+
+
+def entry_path(program, directory=None):
+    """Where the code of `program` (not resolved yet) is cached, or None if it cannot be."""
+    from opalg.compiler import serializer
+
+    try:
+        data = serializer.dumps(program)
+    except ValueError:
+        return None
+    key = hashlib.sha256(code_stamp().encode('utf-8') + b'\0' + data)
+    return os.path.join(directory or code_cache_dir(), key.hexdigest()[:32] + ENTRY_SUFFIX)
+
+
+def load_code(path):
+    try:
+        with open(path, 'rb') as f:
+            code = marshal.load(f)
+    except OSError:
+        return None
+    except (EOFError, ValueError, TypeError):
+        code = None
+    if not isinstance(code, types.CodeType):
+        _remove(path)
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return code
+
+
+def store_code(path, code, limit):
+    from opalg.parser.ast_cache import evict
+
+    directory = os.path.dirname(path)
+    # Write to a private file first so concurrent runs never read a partial entry.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(code, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        _remove(tmp_path)
+        return None
+    evict(directory, limit, keep=path, suffix=ENTRY_SUFFIX)
+    return path
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def global_names(code):
+    """The opalg globals the code object (and the functions it defines) refer to."""
+    names = {name for name in code.co_names if name.startswith('g_')}
+    for const in code.co_consts:
+        if hasattr(const, 'co_names'):
+            names |= global_names(const)
+    return names
+
+
+class PyInterpreter(Interpreter):
+    """
+    Compiles the program to a CPython code object, or loads it from the code cache,
+    and runs it. Selected with `opalg --engine python`.
+    """
+    def __init__(self, use_cache=True):
+        super().__init__()
+        self.use_cache = use_cache
+        self.functions = FunctionTable()
+        self.namespace = dict(RUNTIME, functions=self.functions, require=self.require, jtml=self.jtml)
+
+    def interpret(self, node):
+        if not isinstance(node, ProgramNode):
+            raise Exception("Invalid AST root node")
+        code = self.compile(node)
+        for name in global_names(code):
+            self.namespace.setdefault(name, UNSET)
+        if sys.getrecursionlimit() < RECURSION_LIMIT:
+            sys.setrecursionlimit(RECURSION_LIMIT)
+        try:
+            exec(code, self.namespace)
+        except RecursionError:
+            raise Exception(DEPTH_ERROR) from None
+
+    def compile(self, program):
+        """The code object of `program`, from the code cache when possible."""
+        from opalg.parser.ast_cache import cache_size_limit
+
+        limit = cache_size_limit(CACHE_SIZE_ENV) if self.use_cache else 0
+        path = entry_path(program) if limit > 0 else None
+        code = load_code(path) if path else None
+        if code is None:
+            self.resolve(program)
+            code = compile(PyCompiler().lower_program(program), FILENAME, 'exec', dont_inherit=True)
+            if path:
+                store_code(path, code, limit)
+        return code
+
+    def require(self, path):
+        # The caller runs imported modules first (see Interpreter.execute_ImportStatementNode).
+        if path not in self.modules:
+            raise Exception(f"Module '{path}' is not loaded")
+
+    def jtml(self, tag_name, attributes, content):
+        tree_interpreter.jtml_engine.interpret_string(jtml_snippet(tag_name, attributes, content))
@@ -0,0 +1,144 @@
+# opalg/interpreter/quickening.py
+
+#
+# Quickening: type-specialized binary operations for the tree-walker.
+#
+# fenote: The generic evaluate_BinaryOperationNode picks the operation by comparing
+#         `expr.op` against every operator in turn. While it runs, it counts the
+#         evaluations of the node (`observed`, reset by the resolver). After QUICKEN_AFTER
+#         of them it rewrites the node in place, by switching its class to the subclass
+#         that handles the operator for the operand types it sees (int + int, float * float,
+#         str + str, int < int, ...). The dispatch table then sends the node to a handler
+#         that only checks both operand types and applies the operator; the tree-walker
+#         generates one such handler per specialization (quickened_handler in interpreter.py).
+#
+# fenote: A type check that fails deoptimizes the node: it gets its generic class back for
+#         good, and the generic handler computes the result. Nodes whose operand types the
+#         SemanticAnalyzer inferred (`operand_types`) are specialized at their first
+#         evaluation, as soon as the values agree with the inferred types.
+#
+# fenote: Specialized nodes are still BinaryOperationNodes to every other pass (handlers are
+#         found along the MRO), and they serialize as one (see `node_class`). Nodes read
+#         through an arena view are never specialized.
+#
+# fenote: An interpreter whose `quickening_stats` is a QuickeningStats counts, for every
+#         specialization, how often it was made (quickened), how often its guard held (hits)
+#         and how often it failed (misses); `opalg --quickening-stats` prints them. It is
+#         None by default, and then nothing is counted.
+
+import operator
+
+from opalg.compiler.ast_nodes import BinaryOperationNode
+from opalg.opalg_types.node_types import IntType, FloatType, StringType
+
+# Evaluations a node is observed for before it is specialized.
+QUICKEN_AFTER = 4
+
+# Analyzer types -> the Python type of their values.
+STATIC_TYPES = ((IntType, int), (FloatType, float), (StringType, str))
+
+
+class QuickenedNode(BinaryOperationNode):
+    """A BinaryOperationNode specialized for one operator and one pair of operand types."""
+    __slots__ = ()
+    node_class = BinaryOperationNode   # what the serializer and the arena store it as
+    op_name = None
+    operand_type = None
+    operation = None   # the Python function of the operator
+
+
+def specialization(name, op, operand_type, operation):
+    return type(name, (QuickenedNode,), {'__slots__': (), 'op_name': op, 'operand_type': operand_type,
+                                         'operation': staticmethod(operation)})
+
+
+IntAddNode = specialization('IntAddNode', '+', int, operator.add)
+IntSubNode = specialization('IntSubNode', '-', int, operator.sub)
+IntMulNode = specialization('IntMulNode', '*', int, operator.mul)
+FloatAddNode = specialization('FloatAddNode', '+', float, operator.add)
+FloatSubNode = specialization('FloatSubNode', '-', float, operator.sub)
+FloatMulNode = specialization('FloatMulNode', '*', float, operator.mul)
+FloatDivNode = specialization('FloatDivNode', '/', float, operator.truediv)
+StrConcatNode = specialization('StrConcatNode', '+', str, operator.add)
+IntEqualNode = specialization('IntEqualNode', '==', int, operator.eq)
+IntNotEqualNode = specialization('IntNotEqualNode', '!=', int, operator.ne)
+IntLessNode = specialization('IntLessNode', '<', int, operator.lt)
+IntGreaterNode = specialization('IntGreaterNode', '>', int, operator.gt)
+IntLessEqualNode = specialization('IntLessEqualNode', '<=', int, operator.le)
+IntGreaterEqualNode = specialization('IntGreaterEqualNode', '>=', int, operator.ge)
+
+SPECIALIZATIONS = (
+    IntAddNode, IntSubNode, IntMulNode,
+    FloatAddNode, FloatSubNode, FloatMulNode, FloatDivNode,
+    StrConcatNode,
+    IntEqualNode, IntNotEqualNode, IntLessNode, IntGreaterNode, IntLessEqualNode, IntGreaterEqualNode,
+)
+
+# (operator, operand type) -> specialized node class
+SPECIALIZED = {(node_class.op_name, node_class.operand_type): node_class for node_class in SPECIALIZATIONS}
+
+# Index of every specialization in the QuickeningStats counters.
+INDEX = {node_class: index for index, node_class in enumerate(SPECIALIZATIONS)}
+
+
+class QuickeningStats:
+    """The specialization counters of one interpreter (see the header)."""
+    def __init__(self):
+        self.quickened = [0] * len(SPECIALIZATIONS)
+        self.hits = [0] * len(SPECIALIZATIONS)
+        self.misses = [0] * len(SPECIALIZATIONS)
+
+    def rows(self):
+        """(specialization name, times made, guard hits, guard misses) for every specialization."""
+        return [(node_class.__name__, self.quickened[index], self.hits[index], self.misses[index])
+                for index, node_class in enumerate(SPECIALIZATIONS)]
+
+    def report(self, out):
+        """Write the counters of the specializations that were made to `out`, with their hit rates."""
+        out.write(f"{'specialization':<22}{'quickened':>10}{'hits':>12}{'misses':>8}{'hit rate':>10}\n")
+        for name, quickened, hits, misses in self.rows():
+            if quickened:
+                out.write(f'{name:<22}{quickened:>10}{hits:>12}{misses:>8}{hits / max(hits + misses, 1):>10.1%}\n')
+
+
+def observe(expr, left, right, stats=None):
+    """Count an evaluation of the generic node `expr`, and specialize it once it is due."""
+    expr.observed += 1
+    if expr.observed >= QUICKEN_AFTER or static_types(expr) == (type(left), type(right)):
+        quicken(expr, left, right, stats)
+
+
+def static_types(expr):
+    """The Python types the SemanticAnalyzer inferred for the operands of `expr`, or None."""
+    inferred = getattr(expr, 'operand_types', None)
+    if inferred is None:
+        return None
+    return tuple(python_type(opalg_type) for opalg_type in inferred)
+
+
+def python_type(opalg_type):
+    for type_class, value_type in STATIC_TYPES:
+        if isinstance(opalg_type, type_class):
+            return value_type
+    return None
+
+
+def quicken(expr, left, right, stats=None):
+    """Rewrite `expr` into the specialization for these operands, if there is one; stop observing it."""
+    expr.observed = QUICKEN_AFTER
+    if type(expr) is not BinaryOperationNode or type(left) is not type(right):
+        return   # arena views keep their class; mixed operands have no specialization
+    node_class = SPECIALIZED.get((expr.op, type(left)))
+    if node_class is not None:
+        expr.__class__ = node_class
+        if stats is not None:
+            stats.quickened[INDEX[node_class]] += 1
+
+
+def deoptimize(expr, stats=None):
+    """Give a specialized node whose guard failed its generic class back, for good."""
+    if stats is not None:
+        stats.misses[INDEX[type(expr)]] += 1
+    expr.__class__ = BinaryOperationNode
+    expr.observed = QUICKEN_AFTER
+
@@ -0,0 +1,278 @@
+# opalg/interpreter/vm.py
+
+#
+# Stack-based virtual machine for the bytecode in opalg.compiler.bytecode.
+#
+# fenote: The VM runs one flat dispatch loop. Calls do not recurse in Python: the
+#         caller's registers (code, pc, value stack, environment, handlers) are pushed
+#         onto an explicit frame stack and restored on RETURN_VALUE, so deep opalg
+#         recursion is bounded by MAX_CALL_DEPTH rather than by Python's C stack. TAIL_CALL
+#         reuses the current frame, so tail recursion does not count against it.
+#
+# fenote: The other engines hand the calls they nest deeper than PYTHON_CALL_DEPTH to a
+#         CallStack: a VM on their global frame that compiles their functions to bytecode
+#         when it first needs them.
+#
+# fenote: Exceptions raised by any instruction are caught around the dispatch loop and
+#         routed to the innermost SETUP_TRY handler, unwinding frames as needed. A
+#         `return` that escapes the top-level program raises ReturnException, exactly
+#         like the tree-walker.
+
+import operator
+
+from opalg.compiler.bytecode import *
+from opalg.interpreter.interpreter import (
+    EPOCHS, MAX_CALL_DEPTH, Interpreter, Environment, ReturnException, ThrowException, UNSET, thrown_value, unwind
+)
+
+BINARY_FUNCTIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '&&': lambda left, right: left and right,
+    '||': lambda left, right: left or right,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+BINARY_TABLE = tuple(BINARY_FUNCTIONS[op] for op in BINARY_OPERATORS)
+UNARY_TABLE = tuple({'!': operator.not_, '-': operator.neg}[op] for op in UNARY_OPERATORS)
+
+
+class VMInterpreter(Interpreter):
+    """
+    Compiles the program to bytecode and runs it on the VM.
+    Selected with `opalg --engine vm`.
+    """
+    def interpret(self, node):
+        if not isinstance(node, ProgramNode):
+            raise Exception("Invalid AST root node")
+        self.resolve(node)
+        self.run(BytecodeCompiler.compile_program(node), self.global_env)
+
+    def call_function(self, func, args):
+        # Reached from tree-walker fallbacks calling a compiled function.
+        return self.run(None, None, entry=(func, args))
+
+    def make_call_env(self, func, args):
+        if len(args) != len(func.param_names):
+            raise Exception(f"Function '{func.name}' expects {len(func.param_names)} arguments, got {len(args)}")
+        call_env = Environment(self.global_env, func.scope)
+        slots = call_env.slots
+        for index, value in zip(func.param_slots, args):
+            slots[index] = value
+        return call_env
+
+    def run(self, code_object, env, entry=None):
+        functions = self.functions
+        binary_table = BINARY_TABLE
+        unary_table = UNARY_TABLE
+        max_depth = MAX_CALL_DEPTH - self.depth   # calls already in progress elsewhere
+
+        if entry is not None:
+            func, args = entry
+            env = self.make_call_env(func, args)
+            code_object = func.code
+            max_depth -= 1
+        code = code_object.ops
+        consts = code_object.consts
+        names = code_object.names
+        stack = []
+        handlers = []
+        frames = []  # saved caller state: (code_object, pc, stack, env, handlers)
+        pc = 0
+
+        while True:
+            try:
+                while True:
+                    op = code[pc]
+                    arg = code[pc + 1]
+                    pc += 2
+
+                    if op == LOAD_LOCAL:
+                        value = env.slots[arg]
+                        if value is UNSET:
+                            raise Exception(f"Variable '{env.scope.names[arg]}' not defined")
+                        stack.append(value)
+                    elif op == LOAD_CONST:
+                        stack.append(consts[arg])
+                    elif op == BINARY_OP:
+                        right = stack.pop()
+                        stack[-1] = binary_table[arg](stack[-1], right)
+                    elif op == JUMP_IF_FALSE:
+                        if not stack.pop():
+                            pc = arg
+                    elif op == JUMP:
+                        pc = arg
+                    elif op == LOAD_PARENT:
+                        value = env.parent.slots[arg]
+                        if value is UNSET:
+                            raise Exception(f"Variable '{env.parent.scope.names[arg]}' not defined")
+                        stack.append(value)
+                    elif op == ASSIGN_LOCAL:
+                        if env.slots[arg] is UNSET:
+                            raise Exception(f"Variable '{env.scope.names[arg]}' not defined")
+                        env.slots[arg] = stack[-1]
+                    elif op == ASSIGN_PARENT:
+                        if env.parent.slots[arg] is UNSET:
+                            raise Exception(f"Variable '{env.parent.scope.names[arg]}' not defined")
+                        env.parent.slots[arg] = stack[-1]
+                    elif op == STORE_LOCAL:
+                        env.slots[arg] = stack.pop()
+                    elif op == POP_TOP:
+                        stack.pop()
+                    elif op == ENTER_FRAME:
+                        env = stack[-arg]
+                        if env.scope.names:
+                            env.reset()
+                    elif op == EXIT_SCOPE:
+                        env = env.parent
+                    elif op == LOAD_VAR:
+                        stack.append(env.lookup(*consts[arg]))
+                    elif op == ASSIGN_VAR:
+                        address, name = consts[arg]
+                        env.store(address, name, stack[-1])
+                    elif op == NEW_FRAME:
+                        stack.append(Environment(env, consts[arg]))
+                    elif op == ENTER_SCOPE:
+                        env = Environment(env, consts[arg])
+                    elif op == LOAD_FUNCTION:
+                        name = names[arg]
+                        if name not in functions:
+                            raise Exception(f"Function '{name}' not defined")
+                        stack.append(functions[name])
+                    elif op == CALL_FUNCTION:
+                        if arg:
+                            args = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            args = []
+                        func = stack.pop()
+                        call_env = self.make_call_env(func, args)
+                        if len(frames) >= max_depth:
+                            raise Exception("Maximum call depth exceeded")
+                        frames.append((code_object, pc, stack, env, handlers))
+                        code_object = func.code
+                        code = code_object.ops
+                        consts = code_object.consts
+                        names = code_object.names
+                        stack = []
+                        handlers = []
+                        env = call_env
+                        pc = 0
+                    elif op == TAIL_CALL:
+                        args = stack[-arg:] if arg else []
+                        func = stack[-arg - 1]
+                        env = self.make_call_env(func, args)
+                        code_object = func.code
+                        code = code_object.ops
+                        consts = code_object.consts
+                        names = code_object.names
+                        stack = []
+                        handlers = []
+                        pc = 0
+                    elif op == RETURN_VALUE:
+                        value = stack.pop()
+                        if not frames:
+                            if entry is not None:
+                                return value
+                            raise ReturnException(value)
+                        code_object, pc, stack, env, handlers = frames.pop()
+                        code = code_object.ops
+                        consts = code_object.consts
+                        names = code_object.names
+                        stack.append(value)
+                    elif op == UNARY_OP:
+                        stack[-1] = unary_table[arg](stack[-1])
+                    elif op == FOR_ITER:
+                        try:
+                            stack.append(next(stack[-1]))
+                        except StopIteration:
+                            stack.pop()
+                            pc = arg
+                    elif op == GET_ITER:
+                        stack[-1] = iter(stack[-1])
+                    elif op == SHOW:
+                        print(stack.pop())
+                    elif op == MAKE_FUNCTION:
+                        func = consts[arg]
+                        self.declare_function(func.name, func)
+                    elif op == SETUP_TRY:
+                        handlers.append((arg, len(stack), env))
+                    elif op == POP_TRY:
+                        handlers.pop()
+                    elif op == STORE_ERROR:
+                        env.slots[arg] = thrown_value(stack[-1])
+                    elif op == THROW:
+                        raise ThrowException(stack.pop())
+                    elif op == RERAISE:
+                        raise stack.pop()
+                    elif op == EXEC_NODE:
+                        completion = self.execute(consts[arg], env)
+                        if completion is not None:
+                            unwind(completion)
+                    elif op == EVAL_NODE:
+                        stack.append(self.evaluate(consts[arg], env))
+                    elif op == HALT:
+                        return None
+                    else:
+                        raise Exception(f"Unknown opcode {op}")
+            except ReturnException:
+                # Only raised for a `return` outside any function; never caught by `try`.
+                raise
+            except Exception as error:
+                # Unwind to the innermost active handler, popping frames that have none.
+                while not handlers and frames:
+                    code_object, pc, stack, env, handlers = frames.pop()
+                if not handlers:
+                    raise
+                pc, depth, env = handlers.pop()
+                code = code_object.ops
+                consts = code_object.consts
+                names = code_object.names
+                del stack[depth:]
+                stack.append(error)
+
+
+class CallStack(VMInterpreter):
+    """
+    Runs the calls another engine nests too deep for the Python stack (see
+    Interpreter.call_on_vm), on the engine's global frame and functions.
+    """
+    def __init__(self, host):
+        super().__init__()
+        self.host = host
+        self.global_env = host.global_env
+        self.modules = host.modules
+        self.quickening_stats = host.quickening_stats
+        self.codes = {}      # FunctionDeclarationNode -> its FunctionCode
+        self.synced = None   # the host epoch self.functions was built in
+
+    def call(self, func, args):
+        """The value of calling `func`, a function of the host, with `args`."""
+        host = self.host
+        if self.synced != host.epoch:
+            # Updated in place: the runs in progress hold on to the dict.
+            self.functions.clear()
+            self.functions.update((name, self.code(function)) for name, function in host.functions.items())
+            self.synced = host.epoch
+            self.epoch = next(EPOCHS)
+        self.depth = host.depth
+        return self.run(None, None, entry=(self.code(func), args))
+
+    def code(self, function):
+        node = getattr(function, 'node', function)   # the closure engine's CompiledFunction
+        code = self.codes.get(node)
+        if code is None:
+            code = self.codes[node] = BytecodeCompiler.compile_function(node)
+        return code
+
+    def declare_function(self, name, function):
+        # The host declares it its own way; both then call the new function.
+        self.host.execute_FunctionDeclarationNode(function.node, self.global_env)
+        super().declare_function(name, function)
+        self.synced = self.host.epoch
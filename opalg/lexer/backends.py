@@ -0,0 +1,25 @@
+# lexer/backends.py
+
+#
+# Registry of lexer backends selectable with `opalg --lexer <name>`.
+#
+# fenote: Both backends produce the same tokens. 'ply' is the lex.lex() lexer built from
+#         the rules in lexer.py; 'fast' scans with one master regular expression
+#         (lexer/fast_lexer.py). Like the engine registry, backends are referenced by module
+#         path and imported on demand.
+
+import importlib
+
+DEFAULT_LEXER = 'ply'
+
+LEXERS = {
+    'ply': 'opalg.lexer.lexer',
+    'fast': 'opalg.lexer.fast_lexer',
+}
+
+
+def get_lexer(name):
+    """Return a fresh lexer of the backend registered under `name`."""
+    if name not in LEXERS:
+        raise ValueError(f"Unknown lexer '{name}'. Available lexers: {', '.join(sorted(LEXERS))}")
+    return importlib.import_module(LEXERS[name]).lexer.clone()
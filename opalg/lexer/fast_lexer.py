@@ -0,0 +1,132 @@
+# lexer/fast_lexer.py
+
+#
+# Lexer backend that scans with one precompiled regular expression.
+#
+# fenote: PATTERN is a single alternation of named groups built from the rules in
+#         lexer.py, in the order PLY tries them (function rules by definition order, then
+#         string rules longest pattern first, compiled with re.VERBOSE like lex.lex()),
+#         behind a prefix that skips t_ignore characters. Two groups are added at the end:
+#         any single character, which is reported and skipped the way t_error does, and the
+#         end of the input (for trailing whitespace). finditer then walks the whole input in
+#         C, and the group that matched (m.lastgroup) is the token type; only identifiers
+#         and literals need any work in Python.
+#
+# fenote: The tokens are PLY LexTokens with the same type, value, lineno and lexpos as the
+#         PLY lexer's, and FastLexer has the input()/token() interface the parser uses, so
+#         parser.parse(source, lexer=FastLexer()) works unchanged. Select it with
+#         `opalg --lexer fast` (see lexer/backends.py). scan() is the same scanner without
+#         the LexTokens, for consumers that store tokens their own way (token_buffer.py).
+
+import functools
+import re
+
+from ply.lex import LexToken
+
+from opalg.lexer import lexer as rules
+from opalg.lexer.line_index import line_index
+
+# Matches that produce no token: the end of the input, comments and (unreachable while
+# newlines are in t_ignore) the newline rule.
+DISCARD = frozenset(['END', 'COMMENT', 'newline'])
+
+
+def rule_patterns():
+    """(group name, regex) of every rule in lexer.py, in the order PLY tries them."""
+    functions, strings = [], []
+    for name, value in vars(rules).items():
+        if not name.startswith('t_') or name in ('t_ignore', 't_error'):
+            continue
+        if callable(value):
+            functions.append((value.__code__.co_firstlineno, name[2:], value.__doc__))
+        elif isinstance(value, str):
+            strings.append((name[2:], value))
+    functions.sort(key=lambda rule: rule[0])
+    strings.sort(key=lambda rule: len(rule[1]), reverse=True)
+    return [(name, regex) for _line, name, regex in functions] + strings
+
+
+def master_pattern():
+    groups = [f'(?P<{name}>{regex})' for name, regex in rule_patterns()]
+    groups += [r'(?P<ERROR>[\s\S])', r'(?P<END>\Z)']
+    return re.compile(f'[{re.escape(rules.t_ignore)}]*(?:' + '|'.join(groups) + ')', re.VERBOSE)
+
+
+PATTERN = master_pattern()
+
+
+def scan(data, error, pos=0):
+    """
+    Generate (type, value, start, end) for every token of `data` from `pos` on;
+    error(position) is called for each illegal character instead.
+    """
+    reserved = rules.reserved
+    for match in PATTERN.finditer(data, pos):
+        kind = match.lastgroup
+        if kind in DISCARD:
+            continue
+        start, end = match.span(kind)
+        text = data[start:end]
+        if kind == 'IDENTIFIER':
+            kind = reserved.get(text, 'IDENTIFIER')
+            value = text if kind != 'BOOL_LITERAL' else text == 'true'
+        elif kind == 'INT_LITERAL':
+            value = int(text)
+        elif kind == 'FLOAT_LITERAL':
+            value = float(text)
+        elif kind == 'STRING_LITERAL':
+            value = text[1:-1]
+        elif kind == 'ERROR':
+            error(start)
+            continue
+        else:
+            value = text
+        yield kind, value, start, end
+
+
+class FastLexer:
+    def __init__(self):
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lineno = 1
+        self.token = functools.partial(next, iter(()), None)
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        # token() returns the next token or None; bound per input so each call stays in C.
+        self.token = functools.partial(next, self.generate(data), None)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        tok = self.token()
+        if tok is None:
+            raise StopIteration
+        return tok
+
+    def clone(self):
+        lexer = FastLexer()
+        lexer.lineno = self.lineno
+        return lexer
+
+    def generate(self, data):
+        lineno = self.lineno
+        for kind, value, start, end in scan(data, self.error):
+            tok = LexToken()
+            tok.type = kind
+            tok.value = value
+            tok.lineno = lineno
+            tok.lexpos = start
+            tok.lexer = self
+            self.lexpos = end
+            yield tok
+        self.lexpos = len(data)
+
+    def error(self, lexpos):
+        line, column = line_index(self).position(lexpos)
+        print(f"Illegal character '{self.lexdata[lexpos]}' at line {line}, column {column}")
+
+
+lexer = FastLexer()
@@ -0,0 +1,93 @@
+# lexer/incremental.py
+
+#
+# Re-lexing only the part of a source that an edit can affect, for editor integrations.
+#
+# fenote: relex(buffer, offset, deleted, inserted) applies a text edit to a TokenBuffer
+#         (token_buffer.py) that holds its source. Scanning restarts at the beginning of the
+#         edited line: no token spans a newline and no rule looks past one, so the tokens of
+#         earlier lines cannot change. (Restarting closer to the edit is not safe: whether a
+#         " is an illegal character or opens a string literal depends on the rest of its
+#         line.) It stops as soon as a new token starts where an old token starts in the
+#         unchanged text after the edit; the lexer keeps no state between tokens, so from
+#         there on both scans are the same. The old tokens in between are replaced by the
+#         new ones and the positions of the tokens after them are shifted by the change in
+#         length.
+#
+# fenote: The result is a TokenDiff: tokens [start, start + removed) of the old buffer were
+#         replaced by tokens [start, start + added) of the updated one. Literal values of
+#         replaced tokens stay in buffer.literals; tokenize the file again now and then to
+#         drop them.
+
+import bisect
+from array import array
+
+from opalg.lexer.fast_lexer import FastLexer, scan
+from opalg.lexer.token_buffer import KIND, LITERAL_KINDS
+
+
+class TokenDiff:
+    def __init__(self, start, removed, added, delta):
+        self.start = start        # index of the first replaced token
+        self.removed = removed    # number of old tokens replaced
+        self.added = added        # number of new tokens in their place
+        self.delta = delta        # shift of the positions of the tokens after them
+
+    def __repr__(self):
+        return f'TokenDiff(start={self.start}, removed={self.removed}, added={self.added}, delta={self.delta})'
+
+
+def relex(buffer, offset, deleted, inserted):
+    """
+    Replace `deleted` characters at `offset` of buffer.source with `inserted`, update the
+    buffer's tokens to match and return the TokenDiff.
+    """
+    old = buffer.source
+    if old is None:
+        raise ValueError("The token buffer has no source text to edit")
+    if offset < 0 or deleted < 0 or offset + deleted > len(old):
+        raise ValueError(f"Edit at {offset}+{deleted} is outside the source ({len(old)} characters)")
+    new = old[:offset] + inserted + old[offset + deleted:]
+    delta = len(inserted) - deleted
+    edit_end = offset + deleted          # old text from here on is unchanged
+
+    lexpos = buffer.lexpos
+    count = len(lexpos)
+    restart = old.rfind('\n', 0, offset) + 1
+    first = bisect.bisect_left(lexpos, restart)
+    reuse = bisect.bisect_left(lexpos, edit_end)   # candidate old token to resynchronize on
+
+    lexer = FastLexer()
+    lexer.lexdata = new   # for its error messages
+    lineno = lexer.lineno
+    kinds, positions, values = array('B'), array('I'), array('I')
+    strings, literals = buffer.strings, buffer.literals
+    for token_type, value, start, _end in scan(new, lexer.error, restart):
+        old_start = start - delta
+        if old_start >= edit_end:
+            while reuse < count and lexpos[reuse] < old_start:
+                reuse += 1
+            if reuse < count and lexpos[reuse] == old_start:
+                break
+        kind = KIND[token_type]
+        kinds.append(kind)
+        positions.append(start)
+        if kind in LITERAL_KINDS:
+            values.append(len(literals))
+            literals.append(value)
+        else:
+            values.append(strings.intern(value))
+    else:
+        reuse = count
+
+    added = len(kinds)
+    buffer.kinds[first:reuse] = kinds
+    buffer.values[first:reuse] = values
+    buffer.lineno[first:reuse] = array('I', [lineno]) * added
+    if delta:
+        positions.extend([position + delta for position in lexpos[reuse:]])
+        lexpos[first:] = positions
+    else:
+        lexpos[first:reuse] = positions
+    buffer.source = new
+    return TokenDiff(first, reuse - first, added, delta)
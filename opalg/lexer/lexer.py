@@ -2,6 +2,8 @@
 
 import ply.lex as lex
 
+from opalg.lexer.line_index import line_index
+
 # Reserved words mapped to their token types
 reserved = {
     'define': 'DEFINE',
@@ -24,6 +26,7 @@ reserved = {
     'show': 'SHOW',
     'save': 'SAVE',
     'delete': 'DELETE',
+    'import': 'IMPORT',
     'true': 'BOOL_LITERAL',
     'false': 'BOOL_LITERAL',
     'const': 'CONST',
@@ -85,7 +88,7 @@ tokens = [
     'NOT',
     'HASH',
     'BACKSLASH'
-] + list(set(reserved.values()))  # Include all reserved token types except duplicates
+] + sorted(set(reserved.values()))  # Reserved token types without duplicates, in a stable order
 
 # Regular expressions for simple tokens
 t_PLUS       = r'\+'
@@ -145,13 +148,12 @@ def t_newline(t):
 t_ignore = ' \t\r\n'
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}' at line {t.lineno}, column {find_column(t)}")
+    line, column = line_index(t.lexer).position(t.lexpos)
+    print(f"Illegal character '{t.value[0]}' at line {line}, column {column}")
     t.lexer.skip(1)
 
 def find_column(token):
-    input_data = token.lexer.lexdata
-    start_of_line = input_data.rfind('\n', 0, token.lexpos) + 1
-    return token.lexpos - start_of_line + 1
+    return line_index(token.lexer).column(token.lexpos)
 
 # Build the lexer
 lexer = lex.lex()
@@ -0,0 +1,72 @@
+# lexer/line_index.py
+
+#
+# Line/column lookup for positions (lexpos values) in a source text.
+#
+# fenote: LineIndex records where every line starts, once per source text, and answers
+#         position(lexpos) -> (line, column) with a binary search instead of scanning back
+#         for the previous newline. Line and column numbers are 1-based. The same index
+#         serves lexer and parser diagnostics (find_column, t_error, p_error) and anything
+#         else that maps token or node positions back to the source, e.g.
+#         index.position(node.lexpos) for an AST node.
+#
+# fenote: line_index(lexer) returns the index of the text the lexer is reading, building
+#         it the first time it is asked for and again only after lexer.input() switches to
+#         another text. A StreamLexer answers with an index of its current window, offset to
+#         absolute positions and line numbers.
+
+import bisect
+import re
+from array import array
+
+NEWLINE = re.compile('\n')
+
+
+class LineIndex:
+    """
+    Line starts of `text`. `offset` is the absolute position of text[0], `first_line` the
+    number of the line holding it and `first_line_start` where that line starts (before
+    `offset` when text begins mid-line; `prefix` is the known end of that earlier part).
+    """
+
+    def __init__(self, text, offset=0, first_line=1, first_line_start=None, prefix=''):
+        self.text = text
+        self.offset = offset
+        self.first_line = first_line
+        self.prefix = prefix
+        self.starts = array('q', [offset if first_line_start is None else first_line_start])
+        self.starts.extend(offset + match.end() for match in NEWLINE.finditer(text))
+
+    def line_of(self, lexpos):
+        return bisect.bisect_right(self.starts, lexpos) - 1 + self.first_line
+
+    def column(self, lexpos):
+        return lexpos - self.starts[bisect.bisect_right(self.starts, lexpos) - 1] + 1
+
+    def position(self, lexpos):
+        """(line, column) of `lexpos`."""
+        index = bisect.bisect_right(self.starts, lexpos) - 1
+        return index + self.first_line, lexpos - self.starts[index] + 1
+
+    def line_start(self, line):
+        return self.starts[line - self.first_line]
+
+    def line_text(self, line):
+        """The text of `line`, without its newline; '' for a line outside the index."""
+        index = line - self.first_line
+        if not 0 <= index < len(self.starts):
+            return ''
+        start = self.starts[index] - self.offset
+        end = self.starts[index + 1] - 1 - self.offset if index + 1 < len(self.starts) else len(self.text)
+        if start < 0:
+            return self.prefix + self.text[:end]
+        return self.text[start:end]
+
+
+def line_index(lexer):
+    """The LineIndex of the text `lexer` is reading, built at most once per input."""
+    index = getattr(lexer, 'line_index', None)
+    if index is None or index.text is not lexer.lexdata:
+        index = LineIndex(lexer.lexdata)
+        lexer.line_index = index
+    return index
@@ -0,0 +1,156 @@
+# lexer/stream.py
+
+#
+# Tokenizing a source file without holding all of it in memory.
+#
+# fenote: StreamLexer reads the file in chunks (CHUNK_SIZE characters) and runs a clone of
+#         the PLY lexer over a window: whatever is left of the previous chunk followed by
+#         the next one. Tokens are produced lazily and carry absolute lexpos values, so they
+#         are interchangeable with the tokens of lexer.input(whole_source). The object has
+#         the token() method PLY expects, so parser.parse(lexer=StreamLexer(f)) parses a
+#         file of any size in memory proportional to the chunk size, not the file size.
+#
+# fenote: A token that ends close to the end of the window is not final: more input could
+#         extend it ("whi" + "le", "12" + ".5", "<" + "="), or turn a failed earlier match
+#         into a successful one. Such a token is handed back and lexed again, from its start,
+#         once the next chunk is in; the same goes for everything after the last accepted
+#         token (whitespace, a comment running into the end of the window). An illegal
+#         character with no newline after it in the window may be the start of a string
+#         literal, || or \\ that the next chunk completes, so it is deferred the same way.
+#         No token spans a newline, so a token is final as soon as the window holds
+#         LOOKAHEAD characters past its end.
+#
+# fenote: The part of a window that is already tokenized is dropped when the next chunk
+#         comes in, so peak memory is one chunk plus the longest single token. Only the
+#         last LINE_CONTEXT characters of the current line are kept from dropped text, for
+#         syntax error messages. Newlines in dropped text are counted, so line_index (a
+#         LineIndex of the window) still reports absolute line numbers.
+
+from opalg.lexer.lexer import lexer as base_lexer
+from opalg.lexer.line_index import LineIndex
+
+CHUNK_SIZE = 1 << 20
+
+# Characters a token's regular expression may examine past the end of its match: the
+# "\d+\.\d" of a float literal looks two characters beyond an int literal.
+LOOKAHEAD = 2
+
+# Characters of the current line kept from dropped windows, to quote in error messages.
+LINE_CONTEXT = 1024
+
+
+class _NeedMore(Exception):
+    """Raised from the error rule when the next chunk may make the input legal."""
+
+
+class StreamLexer:
+    """
+    A PLY-compatible lexer over a text stream or file path. Iterating yields tokens;
+    token() returns the next one or None at the end, like lex.Lexer.token().
+    """
+
+    def __init__(self, source, chunk_size=CHUNK_SIZE):
+        if isinstance(source, str):
+            source = open(source, 'r', encoding='utf-8')
+            self.owns_stream = True
+        else:
+            self.owns_stream = False
+        self.stream = source
+        self.chunk_size = chunk_size
+        self.lexer = base_lexer.clone()
+        self.lexer.lexerrorf = self.on_error
+        self.lexdata = ''      # current window
+        self.offset = 0        # absolute position of lexdata[0]
+        self.line_start = 0    # absolute position where the line holding lexdata[0] starts
+        self.line_prefix = ''  # end of the text between line_start and lexdata[0]
+        self.first_line = 1    # number of the line holding lexdata[0]
+        self.window_index = None
+        self.eof = False
+        self.resume = 0        # window position the next window starts from
+        self.tokens = self.generate()
+
+    def token(self):
+        return next(self.tokens, None)
+
+    def __iter__(self):
+        return self.tokens
+
+    def close(self):
+        if self.owns_stream:
+            self.stream.close()
+            self.owns_stream = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def generate(self):
+        lexer = self.lexer
+        try:
+            while self.fill():
+                window_end = len(self.lexdata)
+                lexer.input(self.lexdata)
+                self.resume = 0
+                while True:
+                    try:
+                        tok = lexer.token()
+                    except _NeedMore:
+                        break
+                    if tok is None:
+                        break
+                    if not self.eof and lexer.lexpos + LOOKAHEAD > window_end:
+                        self.resume = tok.lexpos
+                        break
+                    self.resume = lexer.lexpos
+                    tok.lexpos += self.offset
+                    tok.lexer = self
+                    yield tok
+                self.advance(self.resume)
+        finally:
+            self.close()
+
+    def fill(self):
+        """Append the next chunk to the window; False once nothing is left to tokenize."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True   # one last pass over what is left of the window
+        self.lexdata += chunk
+        return bool(self.lexdata)
+
+    def advance(self, position):
+        """Drop the tokenized window text before `position`."""
+        newline = self.lexdata.rfind('\n', 0, position)
+        if newline >= 0:
+            self.first_line += self.lexdata.count('\n', 0, newline + 1)
+            self.line_start = self.offset + newline + 1
+            self.line_prefix = self.lexdata[newline + 1:position][-LINE_CONTEXT:]
+        else:
+            self.line_prefix = (self.line_prefix + self.lexdata[:position])[-LINE_CONTEXT:]
+        self.lexdata = self.lexdata[position:]
+        self.offset += position
+
+    def on_error(self, t):
+        if not self.eof and self.lexdata.find('\n', t.lexpos) < 0:
+            raise _NeedMore()
+        line, column = self.line_index.position(t.lexpos + self.offset)
+        print(f"Illegal character '{t.value[0]}' at line {line}, column {column}")
+        t.lexer.skip(1)
+        self.resume = t.lexer.lexpos   # reported once, never lexed again
+
+    @property
+    def line_index(self):
+        """LineIndex of the current window, in absolute positions and line numbers."""
+        if self.window_index is None or self.window_index.text is not self.lexdata:
+            self.window_index = LineIndex(self.lexdata, self.offset, self.first_line, self.line_start,
+                                          self.line_prefix)
+        return self.window_index
+
+
+def tokenize(source, chunk_size=CHUNK_SIZE):
+    """Generate the tokens of a text stream or file path, one chunk at a time."""
+    with StreamLexer(source, chunk_size) as stream:
+        yield from stream
@@ -0,0 +1,147 @@
+# lexer/token_buffer.py
+
+#
+# Compact storage for the tokens of whole files, for tools that keep many of them around
+# (highlighting, indexing, linting).
+#
+# fenote: A TokenBuffer stores token i as four array columns instead of a LexToken:
+#           kinds[i]     index of the token type in TOKEN_TYPES       array('B')
+#           lexpos[i]    position in the source                      array('I')
+#           lineno[i]    line number as the lexer reported it        array('I')
+#           values[i]    index of the value, see below               array('I')
+#         String values (identifiers, keywords, operators, string literals) are interned in
+#         a StringTable, which can be shared by the buffers of a whole project so every
+#         distinct name is stored once. Numbers and booleans go to the buffer's own
+#         `literals` list; the kind says which table values[i] refers to.
+#
+# fenote: TokenBuffer.tokenize(source) fills a buffer straight from the fast lexer's
+#         scanner, without creating LexTokens; extend() accepts tokens from any lexer.
+#         reader() returns an object with the token() method PLY expects, so a buffer can
+#         be parsed (parser.parse(lexer=buffer.reader())) as often as needed without
+#         lexing the source again.
+
+from array import array
+
+from ply.lex import LexToken
+
+from opalg.lexer.lexer import tokens as TOKEN_TYPES
+
+KIND = {token_type: kind for kind, token_type in enumerate(TOKEN_TYPES)}
+
+# Token types whose values are not strings and live in TokenBuffer.literals.
+LITERAL_TYPES = frozenset(['INT_LITERAL', 'FLOAT_LITERAL', 'BOOL_LITERAL'])
+LITERAL_KINDS = frozenset(KIND[token_type] for token_type in LITERAL_TYPES)
+
+
+class StringTable:
+    """Interned strings, addressed by index."""
+
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def intern(self, string):
+        index = self.index.get(string)
+        if index is None:
+            index = self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+    def __getitem__(self, index):
+        return self.strings[index]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class TokenBuffer:
+    def __init__(self, strings=None, source=None):
+        self.strings = strings if strings is not None else StringTable()
+        self.source = source    # text the tokens come from, for diagnostics (optional)
+        self.kinds = array('B')
+        self.lexpos = array('I')
+        self.lineno = array('I')
+        self.values = array('I')
+        self.literals = []
+
+    @classmethod
+    def tokenize(cls, source, strings=None):
+        """A buffer of the tokens of `source`, scanned with the fast lexer."""
+        from opalg.lexer.fast_lexer import FastLexer, scan
+
+        buffer = cls(strings, source)
+        lexer = FastLexer()
+        lexer.lexdata = source   # for its error messages
+        lineno = lexer.lineno
+        append = buffer.append
+        for token_type, value, start, _end in scan(source, lexer.error):
+            append(token_type, value, lineno, start)
+        return buffer
+
+    def append(self, token_type, value, lineno, lexpos):
+        kind = KIND[token_type]
+        self.kinds.append(kind)
+        self.lexpos.append(lexpos)
+        self.lineno.append(lineno)
+        if kind in LITERAL_KINDS:
+            self.values.append(len(self.literals))
+            self.literals.append(value)
+        else:
+            self.values.append(self.strings.intern(value))
+
+    def extend(self, tokens):
+        """Append LexTokens (or anything with type, value, lineno and lexpos)."""
+        for tok in tokens:
+            self.append(tok.type, tok.value, tok.lineno, tok.lexpos)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type_of(self, i):
+        return TOKEN_TYPES[self.kinds[i]]
+
+    def value_of(self, i):
+        if self.kinds[i] in LITERAL_KINDS:
+            return self.literals[self.values[i]]
+        return self.strings[self.values[i]]
+
+    def token(self, i):
+        """Token i as a LexToken."""
+        tok = LexToken()
+        tok.type = TOKEN_TYPES[self.kinds[i]]
+        tok.value = self.value_of(i)
+        tok.lineno = self.lineno[i]
+        tok.lexpos = self.lexpos[i]
+        return tok
+
+    def __iter__(self):
+        return (self.token(i) for i in range(len(self.kinds)))
+
+    def reader(self):
+        return BufferReader(self)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the token columns and the literal list (not the shared strings)."""
+        columns = (self.kinds, self.lexpos, self.lineno, self.values)
+        return sum(column.itemsize * len(column) for column in columns) + 8 * len(self.literals)
+
+
+class BufferReader:
+    """Hands out the tokens of a TokenBuffer through the lexer token() protocol."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.lexdata = buffer.source if buffer.source is not None else ''
+        self.position = 0
+
+    def token(self):
+        if self.position >= len(self.buffer):
+            return None
+        tok = self.buffer.token(self.position)
+        tok.lexer = self
+        self.position += 1
+        return tok
+
+    def __iter__(self):
+        return iter(self.token, None)
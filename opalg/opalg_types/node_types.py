@@ -1,10 +1,28 @@
 # types.py
 
-class Type:
+class Positioned:
+    """
+    Slotted base of AST and type nodes: where the construct starts in the source.
+    The parser fills lineno/lexpos from the first token of the rule; nodes built by
+    hand or by later passes keep None.
+    """
+    __slots__ = ('lineno', 'lexpos')
+
+    def __new__(cls, *args, **kwargs):
+        node = super().__new__(cls)
+        node.lineno = None
+        node.lexpos = None
+        return node
+
+class Type(Positioned):
+    __slots__ = ()
+
     def is_compatible_with(self, other):
         return isinstance(other, self.__class__)
 
 class PrimitiveType(Type):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -12,26 +30,38 @@ class PrimitiveType(Type):
         return self.name
 
 class IntType(PrimitiveType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('int')
 
 class FloatType(PrimitiveType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('float')
 
 class StringType(PrimitiveType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('string')
 
 class BoolType(PrimitiveType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('bool')
 
 class VoidType(PrimitiveType):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('void')
 
 class FunctionType(Type):
+    __slots__ = ('param_types', 'return_type')
+
     def __init__(self, param_types, return_type):
         self.param_types = param_types  # List of Type
         self.return_type = return_type  # Type
@@ -51,6 +81,8 @@ class FunctionType(Type):
         return f"({params}) -> {self.return_type}"
 
 class CustomType(Type):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -73,7 +105,9 @@ class SymbolTable:
             return self.parent.lookup(name)
         else:
             return None
-class TypeNode:
+class TypeNode(Positioned):
+    __slots__ = ('name', 'generic_arguments')
+
     def __init__(self, name, generic_arguments=None):
         self.name = name  # Should be a string like 'int'
         self.generic_arguments = generic_arguments
@@ -85,6 +119,8 @@ class TypeNode:
         return self.name
     
 class AnyType(TypeNode):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('any')
 
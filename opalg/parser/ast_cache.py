@@ -0,0 +1,210 @@
+# parser/ast_cache.py
+
+#
+# On-disk cache of parsed programs, so `opalg file.op` can skip lexing and parsing.
+#
+# fenote: Like __pycache__, an entry stores the serialized AST (opalg.compiler.serializer)
+#         of one source file, behind a header with the source's mtime (ns), size and
+#         sha256. An entry is used when mtime and size still match, or failing that, when
+#         the sha256 of the current source matches (a touched but unchanged file). The entry
+#         file name is derived from the absolute source path and a toolchain stamp covering
+#         the lexer, grammar, node classes and encoding, so edits to any of them never load
+#         a stale tree.
+#
+# fenote: Entries live in <cache dir>/ast (see table_cache.cache_dir). Using an entry bumps
+#         its mtime; after every write the directory is trimmed to $OPALG_AST_CACHE_SIZE
+#         bytes (default 64 MiB) by deleting the least recently used entries first.
+#         OPALG_AST_CACHE_SIZE=0 turns the cache off.
+#
+# fenote: This module must stay cheap to import: on a cache hit the parser (and its tables)
+#         are never loaded.
+
+import glob
+import hashlib
+import os
+import struct
+
+from opalg.compiler import serializer
+from opalg.lexer.backends import DEFAULT_LEXER
+from opalg.parser.table_cache import cache_dir
+
+CACHE_SIZE_ENV = 'OPALG_AST_CACHE_SIZE'
+DEFAULT_CACHE_SIZE = 64 * 2**20
+CACHE_SUBDIR = 'ast'
+ENTRY_SUFFIX = '.opast'
+
+# source mtime_ns, source size, source sha256
+HEADER = struct.Struct('<qq32s')
+
+_toolchain_stamp = None
+
+
+def cache_size_limit(variable=CACHE_SIZE_ENV):
+    try:
+        return int(os.environ.get(variable, DEFAULT_CACHE_SIZE))
+    except ValueError:
+        return DEFAULT_CACHE_SIZE
+
+
+def ast_cache_dir():
+    return os.path.join(cache_dir(), CACHE_SUBDIR)
+
+
+def toolchain_stamp():
+    """Identifies the code that turns source into an AST: size and mtime of every such file."""
+    global _toolchain_stamp
+    if _toolchain_stamp is None:
+        package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        files = sorted(glob.glob(os.path.join(package, 'parser', '*.py')))
+        files += [os.path.join(package, 'lexer', 'lexer.py'),
+                  os.path.join(package, 'lexer', 'fast_lexer.py'),
+                  os.path.join(package, 'compiler', 'ast_nodes.py'),
+                  os.path.join(package, 'compiler', 'arena.py'),
+                  os.path.join(package, 'opalg_types', 'node_types.py')]
+        digest = hashlib.sha256(f'format {serializer.FORMAT_VERSION}\n'.encode('utf-8'))
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f'{os.path.basename(path)} {stat.st_size} {stat.st_mtime_ns}\n'.encode('utf-8'))
+        _toolchain_stamp = digest.hexdigest()
+    return _toolchain_stamp
+
+
+def entry_path(source_path, directory=None):
+    directory = directory or ast_cache_dir()
+    key = hashlib.sha256(f'{os.path.abspath(source_path)}\0{toolchain_stamp()}'.encode('utf-8'))
+    return os.path.join(directory, key.hexdigest()[:32] + ENTRY_SUFFIX)
+
+
+def source_digest(source):
+    return hashlib.sha256(source.encode('utf-8')).digest()
+
+
+def file_digest(source_path, chunk_size=1 << 20):
+    """source_digest() of the text of `source_path`, read one chunk at a time."""
+    digest = hashlib.sha256()
+    with open(source_path, 'r', encoding='utf-8') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            digest.update(chunk.encode('utf-8'))
+    return digest.digest()
+
+
+def load(source_path, source=None):
+    """
+    The cached AST of `source_path`, or None when there is no valid entry. `source` is the
+    current text of the file; if it is not given and the mtime/size check fails, the file is
+    hashed chunk by chunk.
+    """
+    if cache_size_limit() <= 0:
+        return None
+    path = entry_path(source_path)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        stat = os.stat(source_path)
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    mtime_ns, size, digest = HEADER.unpack_from(data)
+    if (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+        try:
+            current = file_digest(source_path) if source is None else source_digest(source)
+        except (OSError, UnicodeDecodeError):
+            return None
+        if current != digest:
+            return None
+    try:
+        program = serializer.loads(data[HEADER.size:])
+    except ValueError:
+        _remove(path)
+        return None
+    _touch(path)
+    return program
+
+
+def store(source_path, source, program):
+    """Cache the AST parsed from `source` (the current text of `source_path`, or None)."""
+    limit = cache_size_limit()
+    if limit <= 0:
+        return None
+    try:
+        stat = os.stat(source_path)
+        digest = file_digest(source_path) if source is None else source_digest(source)
+        data = serializer.dumps(program)
+    except (OSError, UnicodeDecodeError, ValueError):
+        return None
+    path = entry_path(source_path)
+    directory = os.path.dirname(path)
+    # Write to a private file first so concurrent runs never read a partial entry.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(stat.st_mtime_ns, stat.st_size, digest))
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        _remove(tmp_path)
+        return None
+    evict(directory, limit, keep=path)
+    return path
+
+
+def evict(directory, limit, keep=None, suffix=ENTRY_SUFFIX):
+    """Delete least recently used entries until the directory holds at most `limit` bytes."""
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _mtime, size, _path in entries)
+    for _mtime, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        _remove(path)
+        total -= size
+
+
+def parse_source(source_path, source=None, use_cache=True, lexer=DEFAULT_LEXER):
+    """
+    The AST of `source` (the text of `source_path`), from the cache when possible, lexed by
+    the backend named `lexer` (see lexer/backends.py). Without `source` the file is
+    tokenized as a stream (opalg.lexer.stream) instead of read whole.
+    """
+    program = load(source_path, source) if use_cache else None
+    if program is None:
+        from opalg.parser.instances import local_parser
+        parser = local_parser(lexer)
+        if source is None:
+            from opalg.lexer.stream import StreamLexer
+            with StreamLexer(source_path) as stream:
+                program = parser.parse_tokens(stream)
+        else:
+            program = parser.parse(source)
+        if use_cache:
+            store(source_path, source, program)
+    return program
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -42,7 +42,8 @@ def p_parameters_opt(p):
 
 def p_parameters_multiple(p):
     '''parameters : parameters COMMA parameter'''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_parameters_single(p):
     '''parameters : parameter'''
@@ -0,0 +1,102 @@
+# parser/instances.py
+
+#
+# Independent lexer/parser instances, for parsing from several threads at once.
+#
+# fenote: The module-level `lexer` (lexer.py) and `parser` (parser.py) keep per-run state
+#         (lexdata, lexpos, the parser's stacks and error-recovery flags), so two threads
+#         using them at the same time corrupt each other's run. PLY's parse() without a
+#         lexer argument even falls back to the last lexer PLY built. A Parser pairs its own
+#         lexer with its own shallow copy of the LR parser: the action/goto tables and the
+#         productions (with their position-tracking actions) are shared read-only, so
+#         creating one costs a few attribute copies, not a table build.
+#
+# fenote: Three ways to use them:
+#           local_parser()   the calling thread's own Parser, created on first use
+#           ParserPool       a fixed set of Parsers handed out with `with pool.parser() as p`
+#           parse_all()      parse many sources on a ThreadPoolExecutor
+#         None of them takes a lock around parsing. The grammar actions keep no state
+#         outside the parse, so instances never share anything mutable.
+
+import copy
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from opalg.lexer.backends import DEFAULT_LEXER, get_lexer
+
+_local = threading.local()
+
+
+def new_lr_parser(lr_parser=None):
+    """A copy of `lr_parser` (default: the opalg parser) that shares its tables."""
+    from opalg.parser import parser as parser_module
+
+    lr_parser = copy.copy(lr_parser if lr_parser is not None else parser_module.parser)
+    return parser_module.track_positions(lr_parser)
+
+
+class Parser:
+    """One lexer and one LR parser, for use by one thread at a time."""
+
+    def __init__(self, lexer=DEFAULT_LEXER, lr_parser=None):
+        self.lexer_name = lexer
+        self.lexer = get_lexer(lexer)
+        self.lr_parser = new_lr_parser(lr_parser)
+
+    def parse(self, source):
+        return self.lr_parser.parse(source, lexer=self.lexer)
+
+    def parse_tokens(self, lexer):
+        """Parse from another token source (a StreamLexer, a TokenBuffer reader, ...)."""
+        return self.lr_parser.parse(lexer=lexer)
+
+    def clone(self):
+        return Parser(self.lexer_name, self.lr_parser)
+
+
+def local_parser(lexer=DEFAULT_LEXER):
+    """The calling thread's Parser for the `lexer` backend."""
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(lexer)
+    if parser is None:
+        parser = parsers[lexer] = Parser(lexer)
+    return parser
+
+
+def parse(source, lexer=DEFAULT_LEXER):
+    """Parse `source` with the calling thread's Parser; safe to call from any thread."""
+    return local_parser(lexer).parse(source)
+
+
+class ParserPool:
+    """A fixed number of Parsers shared by any number of threads."""
+
+    def __init__(self, size=4, lexer=DEFAULT_LEXER):
+        self.idle = queue.SimpleQueue()
+        first = Parser(lexer)
+        self.idle.put(first)
+        for _ in range(size - 1):
+            self.idle.put(first.clone())
+
+    @contextmanager
+    def parser(self):
+        """Borrow a Parser, waiting for one to be returned if all are in use."""
+        parser = self.idle.get()
+        try:
+            yield parser
+        finally:
+            self.idle.put(parser)
+
+    def parse(self, source):
+        with self.parser() as parser:
+            return parser.parse(source)
+
+
+def parse_all(sources, max_workers=None, lexer=DEFAULT_LEXER):
+    """The ASTs of `sources`, in order, parsed on a ThreadPoolExecutor."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda source: parse(source, lexer), sources))
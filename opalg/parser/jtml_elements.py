@@ -37,9 +37,8 @@ def p_jtml_attributes(p):
     '''jtml_attributes : jtml_attributes attribute
                        | attribute'''
     if len(p) == 3:
-        d = dict(p[1])
-        d.update(p[2])
-        p[0] = d
+        p[1].update(p[2])
+        p[0] = p[1]
     else:
         p[0] = p[1]
 
@@ -59,7 +58,8 @@ def p_jtml_content_item_list(p):
     '''jtml_content_item_list : jtml_content_item_list jtml_content_item
                               | jtml_content_item'''
     if len(p) == 3:
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = [p[1]]
 
@@ -1,8 +1,14 @@
 # parser/parser.py
 
-import ply.yacc as yacc
+import sys
+
+from ply.lex import LexToken
+
+from opalg.parser.table_cache import load_parser
 from opalg.lexer.lexer import tokens
+from opalg.lexer.line_index import line_index
 from opalg.compiler.ast_nodes import (
+    Positioned,
     ProgramNode, BlockNode,
     VariableDeclarationNode, FunctionDeclarationNode, ParameterNode,
     ClassDeclarationNode, ForStatementNode, IfStatementNode, WhileStatementNode,
@@ -59,11 +65,14 @@ def p_program(p):
                | empty'''
     p[0] = ProgramNode(p[1] if p[1] else [])
 
+# Sequences are left-recursive and append to the list built so far: each reduction is
+# O(1) amortized and the parser stack stays shallow however long the sequence is.
 def p_item_list(p):
     '''item_list : item_list item
                  | item'''
     if len(p) == 3:
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = [p[1]]
 
@@ -85,8 +94,9 @@ def p_statement_list_single(p):
     p[0] = [p[1]]
 
 def p_statement_list_multiple(p):
-    '''statement_list : statement BACKSLASH statement_list'''
-    p[0] = [p[1]] + p[3]
+    '''statement_list : statement_list statement BACKSLASH'''
+    p[1].append(p[2])
+    p[0] = p[1]
 
 def p_statement(p):
     '''statement : variable_declaration
@@ -94,6 +104,7 @@ def p_statement(p):
                  | show_statement
                  | save_statement
                  | delete_statement
+                 | import_statement
                  | return_statement
                  | throw_statement
                  | connect_statement
@@ -168,10 +179,9 @@ def serialize_expression(expr):
 # Error handling
 def p_error(p):
     if p:
-        column = find_column(p)
-        line = p.lineno
-        lines = p.lexer.lexdata.split('\n')
-        error_line = lines[line - 1] if line <= len(lines) else ''
+        index = line_index(p.lexer)
+        line, column = index.position(p.lexpos)
+        error_line = index.line_text(line)
         message = f"Syntax error at line {line}, column {column}: Unexpected token '{p.value}'\n"
         message += f"    {error_line}\n"
         message += "    " + " "*(column-1) + "^"
@@ -180,9 +190,48 @@ def p_error(p):
         raise SyntaxError("Syntax error at EOF")
 
 def find_column(token):
-    input_data = token.lexer.lexdata
-    start_of_line = input_data.rfind('\n', 0, token.lexpos) + 1
-    return token.lexpos - start_of_line + 1
-
-# Build the parser
-parser = yacc.yacc(debug=True, write_tables=False)
+    return line_index(token.lexer).column(token.lexpos)
+
+def track_positions(lr_parser):
+    """
+    Wrap every grammar action that builds a node so that the node records where its
+    rule starts: the first token of the rule, or the position of its first positioned
+    child. Pass-through actions (p[0] = p[1]) are left alone.
+    """
+    for production in lr_parser.productions:
+        action = production.callable
+        if action is not None and builds_nodes(action) and not getattr(action, 'tracks_positions', False):
+            production.callable = with_position(action)
+    return lr_parser
+
+def builds_nodes(action):
+    """Does the action refer to an AST or type node class?"""
+    scope = action.__globals__
+    return any(
+        isinstance(scope.get(name), type) and issubclass(scope[name], Positioned)
+        for name in action.__code__.co_names
+    )
+
+def with_position(action):
+    def run_action(p):
+        action(p)
+        node = p[0]
+        if not isinstance(node, Positioned) or node.lineno is not None:
+            return
+        for symbol in p.slice[1:]:
+            if isinstance(symbol, LexToken):
+                node.lineno, node.lexpos = symbol.lineno, symbol.lexpos
+                return
+            child = symbol.value
+            if isinstance(child, list) and child:
+                child = child[0]
+            if isinstance(child, Positioned) and child.lineno is not None:
+                node.lineno, node.lexpos = child.lineno, child.lexpos
+                return
+    run_action.tracks_positions = True
+    run_action.__name__ = action.__name__
+    run_action.__wrapped__ = action
+    return run_action
+
+# Build the parser (tables are loaded from the on-disk cache when the grammar is unchanged)
+parser = track_positions(load_parser(sys.modules[__name__]))
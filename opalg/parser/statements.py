@@ -2,7 +2,8 @@
 
 from opalg.compiler.ast_nodes import (
     ReturnStatementNode, ThrowStatementNode,
-    ExpressionStatementNode, ShowStatementNode, SaveStatementNode, DeleteStatementNode
+    ExpressionStatementNode, ShowStatementNode, SaveStatementNode, DeleteStatementNode,
+    ImportStatementNode
 )
 from opalg.lexer.lexer import tokens
 
@@ -21,6 +22,10 @@ def p_save_statement(p):
 def p_delete_statement(p):
     '''delete_statement : DELETE IDENTIFIER'''
     p[0] = DeleteStatementNode(p[2])
+
+def p_import_statement(p):
+    '''import_statement : IMPORT STRING_LITERAL'''
+    p[0] = ImportStatementNode(p[2])
     
 def p_throw_statement(p):
     '''throw_statement : THROW expression'''
@@ -0,0 +1,133 @@
+# parser/table_cache.py
+
+#
+# Persistent cache for the LALR tables PLY builds from the grammar.
+#
+# fenote: Building the LALR automaton is the most expensive part of importing the
+#         parser. The tables only depend on the grammar, so they are pickled into a
+#         per-user cache directory under a name derived from a hash of the grammar
+#         (rule docstrings, rule function names, tokens, precedence and start symbol).
+#         Any edit to a p_* rule in opalg/parser/*.py yields a new hash, so stale
+#         tables are never loaded; superseded table files are pruned on rebuild.
+#
+# fenote: Prebuild the tables at install time with `opalg-build-tables`
+#         (or `python -m opalg.parser.table_cache`).
+
+import hashlib
+import os
+import pickle
+import sys
+
+from opalg.startup import lazy_import
+
+# Only needed once tables are hashed or built; opalg.parser.ast_cache imports this module
+# for cache_dir() alone and must not pay for PLY.
+ply = lazy_import('ply')
+yacc = lazy_import('ply.yacc')
+
+CACHE_DIR_ENV = 'OPALG_CACHE_DIR'
+DEBUG_ENV = 'OPALG_PARSER_DEBUG'
+TABLE_PREFIX = 'parsetab-'
+TABLE_SUFFIX = '.pickle'
+
+
+def cache_dir():
+    """
+    Directory holding opalg's on-disk caches.
+    $OPALG_CACHE_DIR wins, then $XDG_CACHE_HOME/opalg, then ~/.cache/opalg.
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return override
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'opalg')
+
+
+def grammar_hash(module):
+    """
+    Hash every input that shapes the parse tables of the grammar defined in `module`.
+    """
+    pinfo = yacc.ParserReflect(dict(vars(module)), log=yacc.NullLogger())
+    pinfo.get_all()
+    digest = hashlib.sha256()
+    digest.update(f'ply {ply.__version__} tab {yacc.__tabversion__}\n'.encode('utf-8'))
+    digest.update(f'start {pinfo.start}\n'.encode('utf-8'))
+    for assoc in pinfo.prec or ():
+        digest.update(f'prec {" ".join(assoc)}\n'.encode('utf-8'))
+    digest.update(f'tokens {" ".join(sorted(pinfo.tokens or ()))}\n'.encode('utf-8'))
+    for _line, _module, name, doc in sorted(pinfo.pfuncs, key=lambda f: f[2]):
+        digest.update(f'rule {name}\n{doc}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def table_path(module, directory=None):
+    directory = directory or cache_dir()
+    return os.path.join(directory, f'{TABLE_PREFIX}{grammar_hash(module)[:20]}{TABLE_SUFFIX}')
+
+
+def load_parser(module, debug=None):
+    """
+    Return a PLY parser for the grammar in `module`, loading cached tables when the
+    grammar hash matches and building (then caching) them otherwise.
+    """
+    if debug is None:
+        debug = bool(os.environ.get(DEBUG_ENV))
+    path = table_path(module)
+
+    if os.path.exists(path):
+        try:
+            return yacc.yacc(module=module, debug=debug, picklefile=path)
+        except (EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            # Truncated or foreign file: throw it away and rebuild below.
+            _remove(path)
+
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return yacc.yacc(module=module, debug=debug, write_tables=False)
+
+    # Write to a private file first so concurrent processes never read a partial table.
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    parser = yacc.yacc(module=module, debug=debug, picklefile=tmp_path)
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, path)
+        prune_tables(directory, keep=path)
+    return parser
+
+
+def prune_tables(directory, keep=None):
+    """Remove cached tables for grammars other than `keep`."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith(TABLE_PREFIX) and name.endswith(TABLE_SUFFIX) and path != keep:
+            _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def main():
+    """
+    Prebuild the parse tables, e.g. as a post-install step:
+      opalg-build-tables
+    """
+    from opalg.parser import parser as parser_module
+    path = table_path(parser_module)
+    if not os.path.exists(path):
+        print(f"Error: could not write parse tables to '{os.path.dirname(path)}'")
+        return 1
+    print(f"Parse tables cached at {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
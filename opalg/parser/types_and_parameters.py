@@ -89,7 +89,8 @@ def p_type_list_single(p):
 
 def p_type_list_multiple(p):
     '''type_list : type_list COMMA type'''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_parameter_list(p):
     '''parameter_list : LPAREN parameters_opt RPAREN'''
@@ -102,7 +103,8 @@ def p_parameters_opt(p):
 
 def p_parameters_multiple(p):
     '''parameters : parameters COMMA parameter'''
-    p[0] = p[1] + [p[3]]
+    p[1].append(p[3])
+    p[0] = p[1]
 
 def p_parameters_single(p):
     '''parameters : parameter'''
@@ -129,7 +131,8 @@ def p_argument_list(p):
     elif len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_identifier_list_single(p):
     '''identifier_list : IDENTIFIER'''
@@ -137,4 +140,5 @@ def p_identifier_list_single(p):
 
 def p_identifier_list_multiple(p):
     '''identifier_list : identifier_list COMMA IDENTIFIER'''
-    p[0] = p[1] + [IdentifierNode(p[3])]
\ No newline at end of file
+    p[1].append(IdentifierNode(p[3]))
+    p[0] = p[1]
\ No newline at end of file
@@ -0,0 +1,137 @@
+# startup.py
+
+#
+# Helpers that keep `opalg` cold starts cheap.
+#
+# fenote: LazyModule defers importing optional or heavy subsystems (the C++ jtml_engine,
+#         the parser tables, ...) until the first attribute access, so programs that never
+#         use them never pay for them.
+#
+# fenote: ImportProfiler backs `opalg --startup-profile`. It wraps every loader found after
+#         it is installed and records how long each module took to execute, both including
+#         (cumulative) and excluding (self) the modules it imported in turn.
+
+import importlib
+import sys
+import time
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Return the module if it is already imported, otherwise a LazyModule for it."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class ImportRecord:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.cumulative = 0.0
+        self.self_time = 0.0
+
+
+class ImportProfiler:
+    """Meta path finder that times the execution of every module imported while installed."""
+    # Finders and loaders are duck-typed: subclassing importlib.abc would import
+    # importlib.resources, pathlib and tempfile (~20 ms) on every start.
+    def __init__(self):
+        self.records = []   # ImportRecord, in import order
+        self._stack = []    # [record, time spent in nested imports]
+        self._finding = set()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        if name in self._finding:
+            return None
+        self._finding.add(name)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(name)
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self, name):
+        record = ImportRecord(name, len(self._stack))
+        self.records.append(record)
+        self._stack.append([record, 0.0])
+        return record
+
+    def _leave(self, elapsed):
+        record, nested = self._stack.pop()
+        record.cumulative = elapsed
+        record.self_time = elapsed - nested
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+    def total(self):
+        return sum(record.cumulative for record in self.records if record.depth == 0)
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        out.write(f"{'self [ms]':>10} {'cumulative [ms]':>16}  module\n")
+        for record in self.records:
+            indent = '  ' * record.depth
+            out.write(f"{record.self_time * 1000:10.2f} {record.cumulative * 1000:16.2f}  {indent}{record.name}\n")
+        out.write(f"{'':>10} {self.total() * 1000:16.2f}  total\n")
+
+
+class _TimedLoader:
+    """Delegating loader that reports exec_module timings to an ImportProfiler."""
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module its real loader back; only the execution needs timing.
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.profiler._enter(module.__name__)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profiler._leave(time.perf_counter() - start)
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
@@ -0,0 +1,212 @@
+# watch.py
+
+#
+# `opalg watch <path>...`: build a project again every time one of its files is saved.
+#
+# fenote: A Watcher stays in one process, so the parser tables, the compiler, the execution
+#         engine and the parsed programs are loaded once and stay warm. Every --interval
+#         seconds it stats the watched files (the sources under the given paths and every
+#         module they import); a new mtime or size, a new file or a deleted one starts a
+#         rebuild. The rebuild plans the project with an in-memory ModuleGraph
+#         (compiler/modules.py), so only the modules whose source changed and the modules
+#         importing them are compiled again. Only files whose content changed are parsed
+#         again; the programs of the others are kept in memory. With --run, every rebuilt
+#         program that compiled is then executed.
+#
+# fenote: After each rebuild one line gives the turnaround: the time from the newest save
+#         to the end of the rebuild (what the author waits for, polling delay included),
+#         and the time the rebuild itself took.
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from opalg.build import BuildResult, discover, report
+from opalg.compiler.modules import ModuleGraph, display, module_path
+from opalg.interpreter.engines import DEFAULT_ENGINE, ENGINES
+from opalg.lexer.backends import DEFAULT_LEXER, LEXERS
+
+DEFAULT_INTERVAL = 0.25
+
+
+def file_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Watcher:
+    def __init__(self, paths, run=False, engine=DEFAULT_ENGINE, use_cache=True,
+                 lexer=DEFAULT_LEXER, explain=False, out=None):
+        self.paths = paths
+        self.run = run
+        self.engine = engine
+        self.use_cache = use_cache
+        self.lexer = lexer
+        self.explain = explain
+        self.out = out or sys.stdout
+        self.graph = ModuleGraph(paths, persistent=False)
+        self.stats = {}      # module path -> (mtime_ns, size)
+        self.programs = {}   # module path -> (source digest, program)
+
+    def files(self):
+        """The module paths of the sources under the watched paths."""
+        return [module_path(path) for path in discover(self.paths)]
+
+    def poll(self):
+        """The watched files that were added, changed or deleted since the last poll."""
+        stats = {}
+        for path in set(self.files()) | set(self.graph.modules):
+            stat = file_stat(path)
+            if stat is not None:
+                stats[path] = stat
+        changed = [path for path, stat in stats.items() if self.stats.get(path) != stat]
+        changed += [path for path in self.stats if path not in stats]
+        self.stats = stats
+        return sorted(changed)
+
+    def program(self, module):
+        """The AST of `module`, parsed again only when its source changed."""
+        from opalg.parser.ast_cache import parse_source
+
+        cached = self.programs.get(module.path)
+        if cached is not None and cached[0] == module.digest:
+            return cached[1], False
+        with open(module.path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        program = parse_source(module.path, source, self.use_cache, self.lexer)
+        self.programs[module.path] = (module.digest, program)
+        return program, True
+
+    def compile(self, module):
+        """Compile a planned module and record the result in the graph."""
+        from opalg.compiler.compiler import Compiler
+
+        result = BuildResult(module.path, reason=module.reason)
+        program = None
+        start = time.perf_counter()
+        try:
+            modules = self.graph.imported(module)
+            with contextlib.redirect_stdout(io.StringIO()):
+                program, parsed = self.program(module)
+                if parsed:
+                    result.parse_time = time.perf_counter() - start
+                start = time.perf_counter()
+                compiler = Compiler(modules)
+                output = compiler.compile(program)
+            result.compile_time = time.perf_counter() - start
+            result.output_lines = output.count('\n') + 1 if output else 0
+            module.exports = dict(compiler.semantic_analyzer.symbol_table)
+            module.output = output
+        except Exception as e:
+            result.error = f'{type(e).__name__}: {e}'
+            if program is None:
+                result.parse_time = time.perf_counter() - start
+            else:
+                result.compile_time = time.perf_counter() - start
+        return result
+
+    def execute(self, module):
+        """Run the program of `module`, after the modules it imports, in a new interpreter."""
+        from opalg.interpreter.engines import get_engine
+
+        interpreter = get_engine(self.engine)()
+        self.out.write(f"--- {display(module.path)}\n")
+        self.out.flush()
+        try:
+            self.load(interpreter, module, set())
+        except Exception as e:
+            self.out.write(f"Runtime error: {e}\n")
+
+    def load(self, interpreter, module, loaded):
+        for written, dependency in module.imports.items():
+            if dependency not in loaded:
+                loaded.add(dependency)
+                self.load(interpreter, self.graph.modules[dependency], loaded)
+            interpreter.modules.add(written)
+        interpreter.interpret(self.programs[module.path][1])
+
+    def rebuild(self, changed=()):
+        """Plan the project, compile what is out of date and run it; returns the number of failures."""
+        start = time.perf_counter()
+        self.graph.advance()
+        files = set(self.files())
+        rebuilt = []
+
+        def results():
+            for module in self.graph.plan(sorted(files)):
+                if module.reason is None:
+                    yield BuildResult(module.path)
+                else:
+                    result = self.compile(module)
+                    rebuilt.append(result)
+                    yield result
+
+        failures = report(results(), self.out, verbose=False, explain=self.explain)
+        if self.run:
+            for result in rebuilt:
+                if result.ok and result.path in files:
+                    self.execute(self.graph.modules[result.path])
+        for path in self.graph.modules:   # start watching newly imported modules
+            if path not in self.stats:
+                stat = file_stat(path)
+                if stat is not None:
+                    self.stats[path] = stat
+        end = time.perf_counter()
+        saved = [self.stats[path][0] for path in changed if path in self.stats]
+        if saved:
+            turnaround = time.time() - max(saved) / 1e9
+            self.out.write(f"rebuilt {len(rebuilt)} of {len(self.graph.modules)} modules: turnaround "
+                           f"{turnaround * 1000:.1f} ms (rebuild {(end - start) * 1000:.1f} ms)\n")
+        self.out.flush()
+        return failures
+
+    def watch(self, interval=DEFAULT_INTERVAL, rounds=None):
+        """Build, then rebuild after every change; `rounds` limits the number of polls (tests)."""
+        from opalg.parser.instances import local_parser
+
+        local_parser(self.lexer)   # load the parser tables before the first save
+        self.poll()
+        self.rebuild()
+        while rounds is None or rounds > 0:
+            time.sleep(interval)
+            changed = self.poll()
+            if changed:
+                self.out.write(f"changed: {', '.join(display(path) for path in changed)}\n")
+                self.rebuild(changed)
+            if rounds is not None:
+                rounds -= 1
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog='opalg watch',
+                                         description='Rebuild OPALG sources whenever they change.')
+    arg_parser.add_argument('paths', nargs='+', help='source files or directories to search for .op files')
+    arg_parser.add_argument('--run', action='store_true', help='run every rebuilt program after compiling it')
+    arg_parser.add_argument('--engine', choices=sorted(ENGINES), default=DEFAULT_ENGINE,
+                            help=f'execution engine for --run (default: {DEFAULT_ENGINE})')
+    arg_parser.add_argument('--lexer', choices=sorted(LEXERS), default=DEFAULT_LEXER,
+                            help=f'lexer backend (default: {DEFAULT_LEXER})')
+    arg_parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                            help=f'seconds between checks for changed files (default: {DEFAULT_INTERVAL})')
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help='parse without reading or writing the AST cache')
+    arg_parser.add_argument('--explain', action='store_true', help='say why each module was compiled again')
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.interval <= 0:
+        print("Error: --interval must be positive.")
+        sys.exit(1)
+    watcher = Watcher(args.paths, args.run, args.engine, not args.no_cache, args.lexer, args.explain)
+    try:
+        watcher.watch(args.interval)
+    except KeyboardInterrupt:
+        pass
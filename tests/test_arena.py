@@ -0,0 +1,101 @@
+# tests/test_arena.py
+
+import contextlib
+import io
+import unittest
+
+from opalg.parser.parser import parser
+from opalg.compiler.arena import Arena, ArenaBuilder, ArenaParser
+from opalg.compiler.ast_nodes import NumberLiteralNode, ProgramNode
+from opalg.compiler.semantic_analyzer import SemanticAnalyzer
+from opalg.interpreter.interpreter import Interpreter
+from opalg.interpreter.optimizer import Optimizer
+
+
+PROGRAMS = [
+    r'define x = 1\\ if (true) \\ show x\\ define x = 2\\ show x\\ \\ show x\\',
+    r'define n = 0\\ for (c in "abc") \\ define t = c + c\\ n += 1\\ show t\\ \\ show n\\ show c\\',
+    r'define e = 9\\ try \\ throw 1\\ catch (e) \\ e = 5\\ show e\\ \\ show e\\',
+    r'define i = 0\\ while (i < 5) \\ i += 1\\ \\ show i * (2 + 3)\\',
+]
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(program):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        Interpreter().interpret(program)
+    return out.getvalue()
+
+
+class TestArena(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.arena_parser = ArenaParser()
+
+    def parse_arena(self, code):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.arena_parser.parse(code)
+
+    def test_parser_builds_the_same_tree(self):
+        for code in PROGRAMS:
+            with self.subTest(code=code):
+                arena = self.parse_arena(code)
+                expected = parse(code).to_dict()
+                self.assertEqual(arena.program.to_dict(), expected)
+                self.assertEqual(arena.tree().to_dict(), expected)
+
+    def test_parser_records_positions(self):
+        code = r'define x = 1\\ show x + 22\\'
+        show = self.parse_arena(code).program.statements[1]
+        self.assertEqual(show.lexpos, code.index('show'))
+        self.assertEqual(show.value.right.lexpos, code.index('22'))
+
+    def test_interpreter_runs_on_views(self):
+        for code in PROGRAMS + [r'function f(a: int): int \\ return a * 2 + g\\ \\ define g = 5\\ show f(3)\\']:
+            with self.subTest(code=code):
+                self.assertEqual(run(self.parse_arena(code).program), run(parse(code)))
+
+    def test_optimizer_rewrites_fields_in_the_arena(self):
+        arena = self.parse_arena(r'define x = 2 * 3 + 4\\')
+        Optimizer().optimize(arena.program)
+        value = arena.program.statements[0].value
+        self.assertIsInstance(value, NumberLiteralNode)
+        self.assertEqual(value.value, 10)
+
+    def test_semantic_analyzer_runs_on_views(self):
+        arena = self.parse_arena(r'define x: int = 1\\ define y: bool = x < 2\\')
+        analyzer = SemanticAnalyzer()
+        analyzer.analyze(arena.program)
+        self.assertEqual(sorted(analyzer.symbol_table), ['x', 'y'])
+
+    def test_builder_and_adopt(self):
+        nodes = ArenaBuilder()
+        program = nodes.ProgramNode([nodes.ExpressionStatementNode(
+            nodes.BinaryOperationNode(nodes.IdentifierNode('x'), '+', NumberLiteralNode(1)))])
+        arena = nodes.finish(program)
+        self.assertEqual(len(arena), 5)
+        self.assertEqual(program, arena.program)
+        self.assertIsInstance(program, ProgramNode)
+        self.assertEqual([arena.node_class(node_id).__name__ for node_id in arena.walk()],
+                         ['ProgramNode', 'ExpressionStatementNode', 'BinaryOperationNode',
+                          'IdentifierNode', 'NumberLiteralNode'])
+
+        copy = Arena()
+        copy.root = copy.adopt(arena.tree())
+        self.assertEqual(copy.program.to_dict(), program.to_dict())
+
+    def test_literals_are_interned_per_type(self):
+        nodes = ArenaBuilder()
+        for value in (1, 1.0, True, 1, 'x', 'x'):
+            nodes.NumberLiteralNode(value)
+        self.assertEqual(nodes.arena.pool, [1, 1.0, True, 'x'])
+        self.assertIs(nodes.arena.view(2).value, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
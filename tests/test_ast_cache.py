@@ -0,0 +1,99 @@
+# tests/test_ast_cache.py
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from opalg.parser import ast_cache
+from opalg.parser.table_cache import CACHE_DIR_ENV
+
+
+class TestAstCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.mkdtemp()
+        self.sources = tempfile.mkdtemp()
+        self.old_env = {name: os.environ.get(name) for name in (CACHE_DIR_ENV, ast_cache.CACHE_SIZE_ENV)}
+        os.environ[CACHE_DIR_ENV] = self.cache
+        os.environ.pop(ast_cache.CACHE_SIZE_ENV, None)
+
+    def tearDown(self):
+        for name, value in self.old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(self.cache, ignore_errors=True)
+        shutil.rmtree(self.sources, ignore_errors=True)
+
+    def write(self, name, source):
+        path = os.path.join(self.sources, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+
+    def parse(self, path):
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ast_cache.parse_source(path, source)
+
+    def test_second_run_loads_the_cached_tree(self):
+        path = self.write('a.op', r'define x = 1\\ show x + 2\\')
+        self.assertIsNone(ast_cache.load(path))
+        parsed = self.parse(path)
+        cached = ast_cache.load(path)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.to_dict(), parsed.to_dict())
+        self.assertEqual(cached.statements[1].lexpos, parsed.statements[1].lexpos)
+
+    def test_touched_but_unchanged_source_still_hits(self):
+        path = self.write('a.op', r'show 1\\')
+        self.parse(path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNotNone(ast_cache.load(path))
+
+    def test_edited_source_misses(self):
+        path = self.write('a.op', r'show 1\\')
+        self.parse(path)
+        self.write('a.op', r'show 2\\')
+        self.assertIsNone(ast_cache.load(path))
+        self.assertEqual(self.parse(path).statements[0].value.value, 2)
+        self.assertEqual(ast_cache.load(path).statements[0].value.value, 2)
+
+    def test_streamed_parse_shares_entries_with_in_memory_parse(self):
+        path = self.write('a.op', 'define x = 1\\\\\nshow x + 2\\\\')
+        with contextlib.redirect_stdout(io.StringIO()):
+            streamed = ast_cache.parse_source(path)
+        self.assertEqual(self.parse(path).to_dict(), streamed.to_dict())
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNotNone(ast_cache.load(path))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        paths = [self.write(f'{name}.op', r'define x = 1\\ show x\\') for name in 'abc']
+        self.parse(paths[0])
+        entry_size = os.path.getsize(ast_cache.entry_path(paths[0]))
+        os.environ[ast_cache.CACHE_SIZE_ENV] = str(2 * entry_size)
+        self.parse(paths[1])
+        # Using a's entry makes b's the least recently used one.
+        old = os.stat(ast_cache.entry_path(paths[1])).st_mtime_ns - 10**9
+        os.utime(ast_cache.entry_path(paths[1]), ns=(old, old))
+        self.assertIsNotNone(ast_cache.load(paths[0]))
+        self.parse(paths[2])
+        self.assertIsNotNone(ast_cache.load(paths[0]))
+        self.assertIsNone(ast_cache.load(paths[1]))
+        self.assertIsNotNone(ast_cache.load(paths[2]))
+
+    def test_zero_size_disables_the_cache(self):
+        os.environ[ast_cache.CACHE_SIZE_ENV] = '0'
+        path = self.write('a.op', r'show 1\\')
+        self.parse(path)
+        self.assertFalse(os.path.exists(ast_cache.ast_cache_dir()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+# tests/test_ast_nodes.py
+
+import contextlib
+import inspect
+import io
+import unittest
+
+from parser.parser import parser
+from compiler import ast_nodes
+from compiler.ast_nodes import BinaryOperationNode, IdentifierNode, NumberLiteralNode, Positioned
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+class TestSlottedNodes(unittest.TestCase):
+    def test_no_node_class_has_an_instance_dict(self):
+        for name, cls in inspect.getmembers(ast_nodes, inspect.isclass):
+            if issubclass(cls, Positioned):
+                with self.subTest(cls=name):
+                    self.assertNotIn('__dict__', dir(cls))
+
+    def test_to_dict_is_unchanged(self):
+        node = BinaryOperationNode(IdentifierNode('x'), '+', NumberLiteralNode(1))
+        self.assertEqual(node.to_dict(), {
+            "type": "BinaryOperation",
+            "left": {"type": "Identifier", "name": "x"},
+            "op": "+",
+            "right": {"type": "NumberLiteral", "value": 1},
+        })
+
+    def test_hand_built_nodes_have_no_position(self):
+        node = IdentifierNode('x')
+        self.assertIsNone(node.lineno)
+        self.assertIsNone(node.lexpos)
+
+    def test_parser_records_source_positions(self):
+        source = r'define x = 1\\ show x + 22\\'
+        show = parse(source).statements[1]
+        self.assertEqual(show.lexpos, source.index('show'))
+        self.assertEqual(show.value.lexpos, source.index('x + 22'))
+        self.assertEqual(show.value.right.lexpos, source.index('22'))
+        self.assertEqual(show.lineno, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/test_build.py
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import build
+import cli
+
+PROGRAMS = {
+    'main.op': 'define x: int = 1\\\\ show x + 1\\\\',
+    os.path.join('lib', 'util.op'): 'define s: string = "util"\\\\',
+    os.path.join('lib', 'broken.op'): 'define = \\\\',
+    os.path.join('lib', 'notes.txt'): 'not a source file',
+    os.path.join('.git', 'skipped.op'): 'show 1\\\\',
+}
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name, source in PROGRAMS.items():
+            self.write(name, source)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, source):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(path, self.root) for path in paths)
+
+    def test_discover(self):
+        found = build.discover([self.root])
+        self.assertEqual(self.relative(found), sorted(['main.op', os.path.join('lib', 'util.op'),
+                                                       os.path.join('lib', 'broken.op')]))
+        self.assertEqual(build.discover([found[0]]), [found[0]])
+
+    def check_results(self, results):
+        by_name = {os.path.relpath(result.path, self.root): result for result in results}
+        self.assertEqual(len(by_name), 3)
+        self.assertTrue(by_name['main.op'].ok)
+        self.assertGreater(by_name['main.op'].output_lines, 0)
+        self.assertGreater(by_name['main.op'].parse_time, 0)
+        broken = by_name[os.path.join('lib', 'broken.op')]
+        self.assertFalse(broken.ok)
+        self.assertIn('SyntaxError', broken.error)
+
+    def test_build_in_process(self):
+        self.check_results(list(build.build([self.root], jobs=1, use_cache=False)))
+
+    def test_build_with_worker_processes(self):
+        self.check_results(list(build.build([self.root], jobs=2, use_cache=False)))
+
+    def test_report(self):
+        out = io.StringIO()
+        failures = build.report(build.build([self.root], jobs=1, use_cache=False), out)
+        self.assertEqual(failures, 1)
+        self.assertIn('broken.op: FAILED SyntaxError', out.getvalue())
+        self.assertIn('total: 3 files, 1 failed', out.getvalue())
+
+    def test_rebuild_only_changed_modules(self):
+        self.write('main.op', 'import "lib/util.op"\\\\ show s\\\\')
+        with unittest.mock.patch.dict(os.environ, {'OPALG_CACHE_DIR': os.path.join(self.root, '.cache')}):
+            list(build.build([self.root], jobs=1))
+            self.write(os.path.join('lib', 'util.op'), 'define s: string = "changed"\\\\')
+            out = io.StringIO()
+            build.report(build.build([self.root], jobs=1), out, explain=True)
+        self.assertIn('util.op  (source changed)', out.getvalue())
+        self.assertIn('main.op  (imports ', out.getvalue())
+        self.assertIn('broken.op: FAILED SyntaxError', out.getvalue())
+        self.assertIn('(failed in the last build)', out.getvalue())
+
+    def test_cli_subcommand(self):
+        with self.assertRaises(SystemExit) as exit_status:
+            with unittest.mock.patch('sys.stdout', io.StringIO()):
+                cli.main(['build', self.root, '--jobs', '1', '--no-cache', '--quiet'])
+        self.assertEqual(exit_status.exception.code, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
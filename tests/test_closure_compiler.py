@@ -0,0 +1,62 @@
+# tests/test_closure_compiler.py
+
+import contextlib
+import io
+import unittest
+
+from parser.parser import parser
+from interpreter.interpreter import Interpreter
+from interpreter.closure_compiler import ClosureInterpreter
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(interpreter_class, code):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            interpreter_class().interpret(parse(code))
+        except Exception as e:
+            print(f"error: {e}")
+    return out.getvalue()
+
+
+PROGRAMS = [
+    r'define x = 10\\ show x * 2 + 1\\ show x / 4\\',
+    r'define i = 0\\ define total = 0\\ while (i < 10) \\ total += i\\ i = i + 1\\ \\ show total\\',
+    r'define x = 3\\ if (x >= 3 && x != 4) \\ show "yes"\\ else \\ show "no"\\ \\ show !(x == 3)\\',
+    r'function fib(n: int): int \\ if (n < 2) \\ return n\\ \\ return fib(n - 1) + fib(n - 2)\\ \\ show fib(12)\\',
+    r'for (c in "abc") \\ show c\\ \\ show c\\',
+    r'try \\ throw "boom"\\ catch (e) \\ show e\\ finally \\ show "done"\\ \\',
+    r'try \\ show 1 / 0\\ catch (e) \\ show e\\ \\',
+    r'show missing\\',
+    r'define y = 1\\ if (true) \\ define z = 2\\ y = z\\ \\ show y\\ show z\\',
+    r'function f(a: int): int \\ return a\\ \\ show f(1, 2)\\',
+]
+
+
+class TestClosureCompiler(unittest.TestCase):
+    def test_matches_tree_walker(self):
+        for code in PROGRAMS:
+            with self.subTest(code=code):
+                self.assertEqual(run(ClosureInterpreter, code), run(Interpreter, code))
+
+    def test_supported_nodes_do_not_use_tree_walker(self):
+        interpreter = ClosureInterpreter()
+
+        def fail(node, env):
+            raise AssertionError(f"tree-walker used for {type(node).__name__}")
+        interpreter.execute = fail
+        interpreter.evaluate = fail
+        interpreter.compiler.interpreter = interpreter
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            interpreter.interpret(parse(PROGRAMS[3]))
+        self.assertEqual(out.getvalue(), "144\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/test_daemon.py
+
+import contextlib
+import io
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+import unittest.mock
+
+import cli
+import daemon
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(daemon.__file__)))
+
+
+@unittest.skipUnless(daemon.supported(), 'needs Unix sockets and fork()')
+class TestDaemon(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        cls.socket = os.path.join(cls.root, 'daemon.sock')
+        path = os.pathsep.join(filter(None, [PACKAGE_ROOT, os.environ.get('PYTHONPATH')]))
+        with unittest.mock.patch.dict(os.environ, {'PYTHONPATH': path}):
+            daemon.start(cls.socket)
+
+    @classmethod
+    def tearDownClass(cls):
+        daemon.request({'command': 'stop'}, cls.socket)
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def write(self, name, source):
+        path = os.path.join(self.root, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+
+    def forward(self, argv):
+        """Run argv in the daemon; returns (status, stdout, stderr)."""
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err, \
+                open(os.devnull, 'rb') as stdin:
+            status = daemon.forward(argv, self.socket, (stdin.fileno(), out.fileno(), err.fileno()))
+            out.seek(0)
+            err.seek(0)
+            return status, out.read().decode('utf-8'), err.read().decode('utf-8')
+
+    def test_run_a_program(self):
+        program = self.write('double.op', 'define x: int = 21\\\\ show x * 2\\\\')
+        status, out, _ = self.forward([program])
+        self.assertEqual(status, 0)
+        self.assertEqual(out.strip().splitlines()[-1], '42')
+
+    def test_failures_report_their_exit_status(self):
+        status, out, _ = self.forward([os.path.join(self.root, 'missing.op')])
+        self.assertEqual(status, 1)
+        self.assertIn('not found', out)
+        status, _, err = self.forward(['--engine', 'nonexistent', 'x.op'])
+        self.assertEqual(status, 2)
+        self.assertIn('invalid choice', err)
+
+    def test_runs_use_the_client_environment(self):
+        program = self.write('env.op', 'show 1\\\\')
+        with unittest.mock.patch.dict(os.environ, {'OPALG_AST_CACHE_SIZE': '0', 'OPALG_DAEMON': '1'}):
+            status, out, _ = self.forward([program])
+        self.assertEqual(status, 0)
+        self.assertEqual(out.strip().splitlines()[-1], '1')
+
+    def test_status(self):
+        status = daemon.request({'command': 'status'}, self.socket)
+        self.assertEqual(status['socket'], self.socket)
+        self.assertNotEqual(status['pid'], os.getpid())
+        self.assertIn('error', daemon.request({'command': 'reboot'}, self.socket))
+
+
+@unittest.skipUnless(daemon.supported(), 'needs Unix sockets and fork()')
+class TestClient(unittest.TestCase):
+    def test_messages_are_framed(self):
+        left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        with daemon.Connection(left) as sender, daemon.Connection(right) as receiver:
+            sender.send({'pid': 1})
+            sender.send({'exit': 3})
+            self.assertEqual(receiver.receive()[0], {'pid': 1})
+            self.assertEqual(receiver.receive()[0], {'exit': 3})
+            sender.close()
+            self.assertEqual(receiver.receive(), (None, []))
+
+    def test_runs_in_process_without_a_daemon(self):
+        root = tempfile.mkdtemp()
+        try:
+            program = os.path.join(root, 'fallback.op')
+            with open(program, 'w', encoding='utf-8') as f:
+                f.write('show 7\\\\')
+            out = io.StringIO()
+            environment = {'OPALG_DAEMON': '1', 'OPALG_DAEMON_SOCKET': os.path.join(root, 'none.sock')}
+            with unittest.mock.patch.dict(os.environ, environment), contextlib.redirect_stdout(out):
+                cli.main([program, '--no-cache'])
+            self.assertEqual(out.getvalue().strip().splitlines()[-1], '7')
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# tests/test_incremental_lexer.py
+
+import contextlib
+import io
+import random
+import unittest
+
+from lexer.incremental import relex
+from lexer.token_buffer import TokenBuffer
+
+SOURCE = '\n'.join(f'define v{k} = v{k - 1} + {k}.5\\\\ // step {k}' for k in range(200))
+
+
+def tuples(buffer):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in buffer]
+
+
+class TestIncrementalLexer(unittest.TestCase):
+    def assertMatchesFullLex(self, buffer):
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = TokenBuffer.tokenize(buffer.source)
+        self.assertEqual(tuples(buffer), tuples(expected))
+
+    def test_edit_in_one_line_replaces_only_its_tokens(self):
+        buffer = TokenBuffer.tokenize(SOURCE)
+        offset = SOURCE.index('v100 =')
+        diff = relex(buffer, offset, len('v100'), 'renamed')
+        self.assertMatchesFullLex(buffer)
+        self.assertEqual((diff.removed, diff.added, diff.delta), (2, 2, 3))
+        self.assertEqual(buffer.type_of(diff.start), 'DEFINE')
+        self.assertEqual(buffer.value_of(diff.start + 1), 'renamed')
+
+    def test_edits_that_change_token_boundaries(self):
+        edits = [
+            ('define x = 12\\\\', 13, 0, '.5'),        # int becomes float
+            ('define whi = 1\\\\', 10, 0, 'le'),        # identifier becomes a keyword
+            ('show a < b\\\\', 7, 1, '<='),             # operator grows
+            ('// note\nshow 1\\\\', 0, 2, ''),          # comment becomes code
+            ('show "a" + "b"\\\\', 7, 1, ''),           # string literal now runs to the next quote
+            ('show 1\\\\\nshow 2\\\\', 8, 1, ''),       # lines join
+            ('', 0, 0, 'show 1\\\\'),
+        ]
+        for source, offset, deleted, inserted in edits:
+            with self.subTest(source=source, inserted=inserted):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    buffer = TokenBuffer.tokenize(source)
+                    relex(buffer, offset, deleted, inserted)
+                self.assertEqual(buffer.source, source[:offset] + inserted + source[offset + deleted:])
+                self.assertMatchesFullLex(buffer)
+
+    def test_random_edits(self):
+        pieces = ['while', '12', '.', '5', '"', 'a b', '\\\\', '<', '=', '//', '\n', ' ', 'x1', '@', '+']
+        rng = random.Random(7)
+        with contextlib.redirect_stdout(io.StringIO()):
+            buffer = TokenBuffer.tokenize(''.join(rng.choice(pieces) for _ in range(300)))
+        for _ in range(200):
+            offset = rng.randint(0, len(buffer.source))
+            deleted = rng.randint(0, min(4, len(buffer.source) - offset))
+            inserted = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 3)))
+            with contextlib.redirect_stdout(io.StringIO()):
+                relex(buffer, offset, deleted, inserted)
+        self.assertMatchesFullLex(buffer)
+
+    def test_edit_outside_the_source(self):
+        buffer = TokenBuffer.tokenize('show 1\\\\')
+        with self.assertRaises(ValueError):
+            relex(buffer, 5, 10, '')
+        with self.assertRaises(ValueError):
+            relex(TokenBuffer(), 0, 0, 'x')
+
+
+if __name__ == '__main__':
+    unittest.main()
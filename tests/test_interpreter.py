@@ -0,0 +1,164 @@
+# tests/test_interpreter.py
+
+import contextlib
+import io
+import unittest
+
+from parser.parser import parser
+from interpreter.closure_compiler import ClosureInterpreter
+from interpreter.interpreter import (
+    Interpreter, Completion, ReturnException, ThrowException, RETURN, THROW, MAX_CALL_DEPTH, PYTHON_CALL_DEPTH
+)
+from interpreter.vm import VMInterpreter
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(code, interpreter_class=Interpreter):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            interpreter_class().interpret(parse(code))
+        except Exception as e:
+            print(f"error: {type(e).__name__}: {e}")
+    return out.getvalue()
+
+
+class TestCompletions(unittest.TestCase):
+    def test_return_leaves_nested_blocks(self):
+        code = (r'function g(n: int): int \\ for (c in "xyz") \\ if (c == "y") \\ return n\\ \\ show c\\ \\ '
+                r'return 0\\ \\ show g(7)\\')
+        self.assertEqual(run(code), "x\n7\n")
+
+    def test_throw_is_caught_in_the_same_function_and_across_calls(self):
+        self.assertEqual(run(r'try \\ throw "boom"\\ show "skipped"\\ catch (e) \\ show e\\ \\'), "boom\n")
+        code = (r'function f(n: int): int \\ throw n + 1\\ return 0\\ \\ '
+                r'try \\ show f(1)\\ catch (e) \\ show e\\ finally \\ show "done"\\ \\')
+        self.assertEqual(run(code), "2\ndone\n")
+
+    def test_finally_runs_and_can_override(self):
+        self.assertEqual(run(r'try \\ throw "inner"\\ finally \\ show "cleanup"\\ \\'),
+                         "cleanup\nerror: ThrowException: inner\n")
+        self.assertEqual(run(r'try \\ show 1 / 0\\ finally \\ throw "replaced"\\ \\'),
+                         "error: ThrowException: replaced\n")
+
+    def test_abrupt_completions_leave_the_program_as_exceptions(self):
+        self.assertEqual(run(r'show 1\\ return 5\\ show 2\\'), "1\nerror: ReturnException: 5\n")
+        self.assertEqual(run(r'throw "up"\\ show 2\\'), "error: ThrowException: up\n")
+
+    def test_statements_report_completions_instead_of_raising(self):
+        interpreter = Interpreter()
+        program = parse(r'return 3\\')
+        interpreter.resolve(program)
+        completion = interpreter.execute(program.statements[0], interpreter.global_env)
+        self.assertIsInstance(completion, Completion)
+        self.assertEqual((completion.kind, completion.value), (RETURN, 3))
+        program = parse(r'if (true) \\ throw "x"\\ \\')
+        interpreter.resolve(program)
+        completion = interpreter.execute(program.statements[0], interpreter.global_env)
+        self.assertEqual((completion.kind, completion.value), (THROW, "x"))
+        self.assertIsNone(interpreter.execute(parse(r'show 1\\').statements[0], interpreter.global_env))
+
+    def test_exception_types_are_still_exported(self):
+        self.assertTrue(issubclass(ReturnException, Exception))
+        self.assertTrue(issubclass(ThrowException, Exception))
+
+
+
+class TestCalls(unittest.TestCase):
+    DOWN = r'function down(n: int): int \\ if (n == 0) \\ return 0\\ \\ return 1 + down(n - 1)\\ \\ '
+
+    def test_deep_recursion_does_not_exhaust_the_python_stack(self):
+        for engine in (Interpreter, ClosureInterpreter, VMInterpreter):
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(self.DOWN + r'show down(3000)\\', engine), "3000\n")
+        code = (r'function sink(n: int): int \\ if (n == 0) \\ throw "bottom"\\ \\ return sink(n - 1)\\ \\ '
+                r'try \\ show sink(500)\\ catch (e) \\ show e\\ \\ show sink(1)\\')
+        self.assertEqual(run(code), "bottom\nerror: ThrowException: bottom\n")
+
+    def test_runaway_recursion_is_bounded(self):
+        self.assertEqual(run(self.DOWN + r'show down(%d)\\' % MAX_CALL_DEPTH),
+                         "error: Exception: Maximum call depth exceeded\n")
+        interpreter = Interpreter()
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(Exception):
+            interpreter.interpret(parse(self.DOWN + r'show down(%d)\\' % MAX_CALL_DEPTH))
+        self.assertEqual(interpreter.depth, 0)
+        self.assertEqual(run(self.DOWN + r'show down(%d)\\' % (MAX_CALL_DEPTH - 1)), f"{MAX_CALL_DEPTH - 1}\n")
+
+    def test_deep_calls_see_functions_declared_on_either_side(self):
+        code = (r'function g(n: int): int \\ if (n == 0) \\ function leaf(): int \\ return 7\\ \\ return leaf()\\ \\ '
+                r'return 1 + g(n - 1)\\ \\ show g(%d)\\ show leaf()\\ '
+                r'function leaf(): int \\ return 1\\ \\ show g(%d)\\' % (PYTHON_CALL_DEPTH * 2, PYTHON_CALL_DEPTH * 2))
+        for engine in (Interpreter, ClosureInterpreter):
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(code, engine), f"{PYTHON_CALL_DEPTH * 2 + 7}\n7\n{PYTHON_CALL_DEPTH * 2 + 7}\n")
+
+    def test_redefinition_rebinds_call_sites(self):
+        code = (r'function f(): int \\ return 1\\ \\ function g(): int \\ return f()\\ \\ show g()\\ '
+                r'function f(): int \\ return 2\\ \\ show g()\\')
+        self.assertEqual(run(code), "1\n2\n")
+        interpreter = Interpreter()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            program = parse(r'function g(): int \\ return f()\\ \\ function f(): int \\ return 1\\ \\ show g()\\')
+            interpreter.interpret(program)
+            interpreter.interpret(parse(r'function f(): int \\ return 3\\ \\ show g()\\'))
+            Interpreter().interpret(program)
+        self.assertEqual(out.getvalue(), "1\n3\n1\n")
+
+    def test_arguments_are_bound_to_their_slots(self):
+        code = (r'function f(a: int, b: int): int \\ define c = a - b\\ return c\\ \\ show f(5, 2)\\ show f(2, 5)\\ '
+                r'function twice(a: int, a: int): int \\ return a\\ \\ show twice(1, 2)\\')
+        self.assertEqual(run(code), "3\n-3\n2\n")
+
+    def test_arity_is_checked_after_the_arguments_are_evaluated(self):
+        code = r'function f(a: int): int \\ return a\\ \\ define x = 1\\ show f((x = 2), 3)\\'
+        self.assertEqual(run(code), "error: Exception: Function 'f' expects 1 arguments, got 2\n")
+        code = r'function f(a: int): int \\ return a\\ \\ define x = 1\\ try \\ show f((x = 2), 3)\\ catch (e) \\ show x\\ \\'
+        self.assertEqual(run(code), "2\n")
+        self.assertEqual(run(r'show g(1)\\'), "error: Exception: Function 'g' not defined\n")
+
+
+
+class TestTailCalls(unittest.TestCase):
+    ENGINES = (Interpreter, ClosureInterpreter, VMInterpreter)
+
+    def test_tail_recursion_runs_in_constant_stack(self):
+        code = (r'function count(n: int, total: int): int \\ if (n == 0) \\ return total\\ \\ '
+                r'return count(n - 1, total + 1)\\ \\ show count(%d, 0)\\' % (MAX_CALL_DEPTH + 1))
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(code, engine), f"{MAX_CALL_DEPTH + 1}\n")
+
+    def test_mutual_tail_calls_from_either_branch(self):
+        code = (r'function even(n: int): bool \\ if (n == 0) \\ return true\\ else \\ return odd(n - 1)\\ \\ \\ '
+                r'function odd(n: int): bool \\ define m = n - 1\\ if (n == 0) \\ return false\\ \\ return even(m)\\ \\ '
+                r'show even(30001)\\ show odd(30001)\\')
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(code, engine), "False\nTrue\n")
+
+    def test_calls_inside_try_statements_keep_their_handlers(self):
+        code = (r'function fail(n: int): int \\ throw n\\ return 0\\ \\ '
+                r'function guard(n: int): int \\ try \\ return fail(n)\\ catch (e) \\ return e + 1\\ '
+                r'finally \\ show "finally"\\ \\ return 0\\ \\ '
+                r'function pass(n: int): int \\ return fail(n)\\ \\ '
+                r'show guard(1)\\ try \\ show pass(5)\\ catch (e) \\ show e\\ \\')
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(code, engine), "finally\n2\n5\n")
+
+    def test_tail_calls_check_their_callee(self):
+        code = r'function f(a: int): int \\ return g(a, 1)\\ \\ function g(a: int): int \\ return a\\ \\ show f(1)\\'
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                self.assertEqual(run(code, engine), "error: Exception: Function 'g' expects 1 arguments, got 2\n")
+                self.assertEqual(run(r'function f(): int \\ return h()\\ \\ show f()\\', engine),
+                                 "error: Exception: Function 'h' not defined\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
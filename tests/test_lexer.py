@@ -1,7 +1,12 @@
 # tests/test_lexer.py
 
+import contextlib
+import io
 import unittest
 from lexer.lexer import lexer
+from lexer.fast_lexer import FastLexer
+from lexer.backends import get_lexer
+from parser.parser import parser
 
 class TestJTMLLexer(unittest.TestCase):
     def setUp(self):
@@ -338,5 +343,31 @@ class TestJTMLLexer(unittest.TestCase):
         self.assertEqual(tokens[6].value, 'Hello')  
 
 
+class TestFastLexer(TestJTMLLexer):
+    """The same expectations, against the master-regex backend."""
+
+    def setUp(self):
+        self.lexer = FastLexer()
+
+    def test_same_tokens_and_diagnostics_as_ply(self):
+        code = 'define x: float = 12.5 // note\n@ show "a\\"b" && !done || y <= 3\\\\\n"open'
+        results = []
+        for backend in (lexer.clone(), self.lexer):
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                backend.input(code)
+                tokens = [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in iter(backend.token, None)]
+            results.append((tokens, output.getvalue()))
+        self.assertEqual(results[0], results[1])
+        self.assertIn("Illegal character '@' at line 2, column 1", results[1][1])
+
+    def test_parser_accepts_fast_tokens(self):
+        code = r'define total = 1 + 2 * 3\\ show total\\'
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = parser.parse(code)
+            program = parser.parse(code, lexer=get_lexer('fast'))
+        self.assertEqual(program.to_dict(), expected.to_dict())
+
+
+
 if __name__ == '__main__':
     unittest.main()
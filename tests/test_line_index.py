@@ -0,0 +1,66 @@
+# tests/test_line_index.py
+
+import contextlib
+import io
+import unittest
+
+from lexer.lexer import lexer
+from lexer.line_index import LineIndex, line_index
+from parser.parser import parser
+
+SOURCE = 'first\nsecond line\n\nlast'
+
+
+class TestLineIndex(unittest.TestCase):
+    def test_positions(self):
+        index = LineIndex(SOURCE)
+        self.assertEqual(index.position(0), (1, 1))
+        self.assertEqual(index.position(5), (1, 6))      # the newline ends its line
+        self.assertEqual(index.position(6), (2, 1))
+        self.assertEqual(index.position(13), (2, 8))
+        self.assertEqual(index.position(18), (3, 1))
+        self.assertEqual(index.position(19), (4, 1))
+        self.assertEqual(index.line_of(21), 4)
+        self.assertEqual(index.column(21), 3)
+
+    def test_line_text(self):
+        index = LineIndex(SOURCE)
+        self.assertEqual([index.line_text(line) for line in range(1, 5)], ['first', 'second line', '', 'last'])
+        self.assertEqual(index.line_text(5), '')
+        self.assertEqual(index.line_start(2), 6)
+
+    def test_index_of_a_window(self):
+        # The window starts in the middle of line 7, whose first 3 characters are known.
+        index = LineIndex('defg\nxyz', offset=100, first_line=7, first_line_start=97, prefix='abc')
+        self.assertEqual(index.position(101), (7, 5))
+        self.assertEqual(index.position(106), (8, 2))
+        self.assertEqual(index.line_text(7), 'abcdefg')
+        self.assertEqual(index.line_text(8), 'xyz')
+
+    def test_built_once_per_input(self):
+        own_lexer = lexer.clone()
+        own_lexer.input(SOURCE)
+        index = line_index(own_lexer)
+        self.assertIs(line_index(own_lexer), index)
+        own_lexer.input('other\ntext')
+        self.assertIsNot(line_index(own_lexer), index)
+        self.assertEqual(line_index(own_lexer).line_text(2), 'text')
+
+    def test_diagnostics_report_the_real_line(self):
+        own_lexer = lexer.clone()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            own_lexer.input('x\n  y @ z')
+            list(iter(own_lexer.token, None))
+        self.assertEqual(output.getvalue(), "Illegal character '@' at line 2, column 5\n")
+
+        code = 'define a = 1\\\\\n\ndefine b = = 2\\\\'
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SyntaxError) as error:
+                parser.parse(code)
+        message = str(error.exception)
+        self.assertIn('line 3, column 12', message)
+        self.assertIn('    define b = = 2\\\\\n', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# tests/test_modules.py
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from opalg import cli
+from compiler.compiler import Compiler
+from compiler.modules import ModuleGraph, scan_imports
+from parser.parser import parser
+
+SOURCES = {
+    'main.op': 'import "lib/two.op"\\\\\ndefine answer: int = base + two\\\\\nshow answer\\\\',
+    os.path.join('lib', 'two.op'): 'import "base.op"\\\\\ndefine two: int = base - 38\\\\',
+    os.path.join('lib', 'base.op'): 'define base: int = 40\\\\',
+    'other.op': 'define other: int = 1\\\\',
+}
+
+
+class TestModuleGraph(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.cache = os.path.join(self.root, '.cache')
+        for name, source in SOURCES.items():
+            self.write(name, source)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write(self, name, source):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+
+    def build(self, *names):
+        """Plan and compile the modules like `opalg build` does; returns ({name: reason}, graph)."""
+        graph = ModuleGraph([self.root], self.cache)
+        names = names or ('main.op', 'other.op')
+        reasons = {}
+        for module in graph.plan([os.path.join(self.root, name) for name in names]):
+            reasons[os.path.relpath(module.path, self.root)] = module.reason
+            if module.reason is None:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    compiler = Compiler(graph.imported(module))
+                    with open(module.path, encoding='utf-8') as f:
+                        module.output = compiler.compile(parser.parse(f.read()))
+                    module.exports = dict(compiler.semantic_analyzer.symbol_table)
+                except Exception:
+                    pass
+        graph.save()
+        return reasons, graph
+
+    def test_scan_imports(self):
+        self.assertEqual(scan_imports(SOURCES['main.op']), ['lib/two.op'])
+        self.assertEqual(scan_imports('define s: string = "import"\\\\'), [])
+
+    def test_imports_are_planned_first(self):
+        reasons, graph = self.build()
+        self.assertEqual(list(reasons), [os.path.join('lib', 'base.op'), os.path.join('lib', 'two.op'),
+                                         'main.op', 'other.op'])
+        self.assertEqual(set(reasons.values()), {'new module'})
+        main = graph.modules[os.path.join(self.root, 'main.op')]
+        self.assertTrue(main.ok)
+        self.assertIn('base', main.exports)
+        self.assertIn('import "lib/two.op";', main.output)
+
+    def test_unchanged_modules_are_not_compiled_again(self):
+        self.build()
+        reasons, graph = self.build()
+        self.assertEqual(set(reasons.values()), {None})
+        self.assertTrue(graph.modules[os.path.join(self.root, 'main.op')].ok)
+
+    def test_changes_propagate_to_importers(self):
+        self.build()
+        self.write(os.path.join('lib', 'base.op'), 'define base: int = 41\\\\')
+        reasons, _ = self.build()
+        self.assertEqual(reasons[os.path.join('lib', 'base.op')], 'source changed')
+        self.assertIn('which changed', reasons[os.path.join('lib', 'two.op')])
+        self.assertIn('which changed', reasons['main.op'])
+        self.assertIsNone(reasons['other.op'])
+
+    def test_keys_depend_on_indirect_imports(self):
+        _, first = self.build()
+        self.write(os.path.join('lib', 'base.op'), 'define base: int = 41\\\\')
+        _, second = self.build()
+        main = os.path.join(self.root, 'main.op')
+        self.assertEqual(first.modules[main].digest, second.modules[main].digest)
+        self.assertNotEqual(first.modules[main].key, second.modules[main].key)
+
+    def test_failed_modules_are_compiled_again(self):
+        self.write('other.op', 'define other: int = "one"\\\\')
+        self.build()
+        reasons, _ = self.build()
+        self.assertEqual(reasons['other.op'], 'failed in the last build')
+        self.assertIsNone(reasons['main.op'])
+
+    def test_import_errors(self):
+        self.write(os.path.join('lib', 'base.op'), 'import "../main.op"\\\\\ndefine base: int = 40\\\\')
+        self.write('other.op', 'import "missing.op"\\\\')
+        _, graph = self.build()
+        base = graph.modules[os.path.join(self.root, 'lib', 'base.op')]
+        self.assertIn('import cycle', base.error)
+        other = graph.modules[os.path.join(self.root, 'other.op')]
+        self.assertIn("module 'missing.op' not found", other.error)
+        with self.assertRaises(Exception):
+            graph.imported(graph.modules[os.path.join(self.root, 'main.op')])
+
+    def test_compile_without_the_imported_module(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = parser.parse(SOURCES['main.op'])
+            with self.assertRaises(Exception) as error:
+                Compiler().compile(program)
+        self.assertIn("Module 'lib/two.op' is not loaded", str(error.exception))
+
+
+class TestRunningImports(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name, source in SOURCES.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(source)
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def run_cli(self, name, *options):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            try:
+                cli.main([os.path.join(self.root, name), '--no-cache', *options])
+            except SystemExit:
+                pass
+        return out.getvalue()
+
+    def test_imported_modules_run_first(self):
+        for engine in ('tree', 'closure', 'vm', 'python'):
+            with self.subTest(engine=engine):
+                self.assertEqual(self.run_cli('main.op', '--engine', engine), "42\n")
+
+    def test_missing_modules_are_runtime_errors(self):
+        self.assertEqual(self.run_cli(os.path.join('lib', 'two.op')), "")
+        with open(os.path.join(self.root, 'other.op'), 'w', encoding='utf-8') as f:
+            f.write('import "missing.op"\\\\\nshow 1\\\\')
+        self.assertIn("Runtime error: module 'missing.op' not found", self.run_cli('other.op'))
+
+
+if __name__ == '__main__':
+    unittest.main()
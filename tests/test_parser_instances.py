@@ -0,0 +1,62 @@
+# tests/test_parser_instances.py
+
+import contextlib
+import io
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from opalg.compiler.serializer import dumps
+from opalg.parser.instances import Parser, ParserPool, local_parser, parse_all
+from opalg.parser.parser import parser
+
+SOURCES = [''.join(f'define v{k} = {n} + {k} * 2\\\\ show "doc {n}"\\\\ ' for k in range(40)) for n in range(24)]
+
+
+class TestParserInstances(unittest.TestCase):
+    def setUp(self):
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.expected = [dumps(parser.parse(source)) for source in SOURCES]
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)   # switch threads often, so shared state would show
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+        self.output.__exit__(None, None, None)
+
+    def test_instances_share_the_tables(self):
+        instance = Parser()
+        self.assertIsNot(instance.lr_parser, parser)
+        self.assertIs(instance.lr_parser.action, parser.action)
+        self.assertIs(instance.lr_parser.productions, parser.productions)
+        self.assertIsNot(instance.lexer, Parser().lexer)
+        program = instance.parse(SOURCES[0])
+        self.assertEqual(dumps(program), self.expected[0])
+        self.assertEqual(program.statements[1].lexpos, SOURCES[0].index('show'))
+
+    def test_parse_all(self):
+        programs = parse_all(SOURCES, max_workers=8)
+        self.assertEqual([dumps(program) for program in programs], self.expected)
+        programs = parse_all(SOURCES, max_workers=8, lexer='fast')
+        self.assertEqual([dumps(program) for program in programs], self.expected)
+
+    def test_pool(self):
+        pool = ParserPool(size=3)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            programs = list(executor.map(pool.parse, SOURCES))
+        self.assertEqual([dumps(program) for program in programs], self.expected)
+
+    def test_local_parser_is_per_thread(self):
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(local_parser()))
+        thread.start()
+        thread.join()
+        self.assertIs(local_parser(), local_parser())
+        self.assertIsNot(seen[0], local_parser())
+        self.assertIsNot(local_parser('fast'), local_parser())
+
+
+if __name__ == '__main__':
+    unittest.main()
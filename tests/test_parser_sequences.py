@@ -0,0 +1,33 @@
+# tests/test_parser_sequences.py
+
+import contextlib
+import io
+import unittest
+
+from opalg.parser.parser import parser
+from opalg.compiler.ast_nodes import FunctionCallNode, WhileStatementNode
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+class TestParserSequences(unittest.TestCase):
+    def test_long_sequences_keep_source_order(self):
+        # while (true) \\ define v0 = 0\\ ... \\ show f(0, 1, ...)\\
+        body = ''.join(f'define v{k} = {k}\\\\ ' for k in range(2000))
+        code = 'while (true) \\\\ ' + body + '\\\\ ' + body + 'show f(' + ', '.join(map(str, range(500))) + ')\\\\'
+        result = parse(code)
+        self.assertEqual(len(result.statements), 2002)
+        loop = result.statements[0]
+        self.assertIsInstance(loop, WhileStatementNode)
+        self.assertEqual([stmt.name for stmt in loop.body.statements], [f'v{k}' for k in range(2000)])
+        self.assertEqual([stmt.value.value for stmt in result.statements[1:2001]], list(range(2000)))
+        call = result.statements[2001].value
+        self.assertIsInstance(call, FunctionCallNode)
+        self.assertEqual([arg.value for arg in call.arguments], list(range(500)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# tests/test_py_compiler.py
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from opalg.parser.parser import parser
+from opalg.interpreter.engines import get_engine
+from opalg.interpreter.interpreter import Interpreter
+from opalg.interpreter.py_compiler import PyCompiler, PyInterpreter, CACHE_SIZE_ENV, entry_path
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(interpreter, *programs):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        for code in programs:
+            try:
+                interpreter.interpret(parse(code))
+            except Exception as e:
+                print(f"error: {e}")
+    return out.getvalue()
+
+
+PROGRAMS = [
+    r'define x = 10\\ show x * 2 + 1\\ show x / 4\\ show -3 * x\\',
+    r'define i = 0\\ define total = 0\\ while (i < 10) \\ total += i\\ i = i + 1\\ \\ show total\\',
+    r'define x = 3\\ if (x >= 3 && x != 4) \\ show "yes"\\ else \\ show "no"\\ \\ show !(x == 3)\\',
+    r'function fib(n: int): int \\ if (n < 2) \\ return n\\ \\ return fib(n - 1) + fib(n - 2)\\ \\ show fib(12)\\',
+    r'for (c in "abc") \\ show c\\ \\ show c\\',
+    r'try \\ throw "boom"\\ catch (e) \\ show e\\ finally \\ show "done"\\ \\',
+    r'try \\ show 1 / 0\\ catch (e) \\ show e\\ \\',
+    r'show missing\\',
+    r'define y = 1\\ if (true) \\ define z = 2\\ y = z\\ \\ show y\\ show z\\',
+    r'function f(a: int): int \\ return a\\ \\ show f(1, 2)\\ show g(1)\\',
+    r'define x = 1\\ if (true) \\ define x = 2\\ x += 1\\ show x\\ \\ show x\\ show (x = 5) + x\\',
+    r'define i = 0\\ define s = "ab"\\ while (i < 2) \\ for (k in s) \\ \\ show k\\ s = ""\\ i += 1\\ \\',
+    r'function f(a: int): int \\ return a + g\\ \\ define g = 10\\ show f(1)\\',
+    r'define n = 0\\ function inc(): int \\ n += 1\\ return n\\ \\ show inc()\\ show inc()\\ show n\\',
+    r'function f(a: int, a: int): int \\ return a\\ \\ show f(1, 2)\\',
+    r'show 1 && 0\\ show 0 || "a"\\ define s = "a"\\ show s < 1 && s\\',
+    r'define t = 0\\ try \\ show t\\ return 3\\ catch (e) \\ show "caught"\\ \\',
+]
+
+
+class TestPyCompiler(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.mkdtemp()
+        patcher = unittest.mock.patch.dict(os.environ, {'OPALG_CACHE_DIR': self.cache})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.cache, True)
+
+    def test_matches_tree_walker(self):
+        for code in PROGRAMS:
+            with self.subTest(code=code):
+                self.assertEqual(run(PyInterpreter(), code), run(Interpreter(), code))
+
+    def test_deep_recursion_matches_tree_walker(self):
+        programs = [
+            r'function ev(n: int): bool \\ if (n == 0) \\ return true\\ \\ return od(n - 1)\\ \\ '
+            r'function od(n: int): bool \\ if (n == 0) \\ return false\\ \\ return ev(n - 1)\\ \\ show ev(5001)\\',
+            r'function sum(n: int, acc: int): int \\ if (n == 0) \\ return acc\\ \\ return sum(n - 1, acc + n)\\ \\ '
+            r'show sum(20000, 0)\\',
+            r'function down(n: int): int \\ if (n == 0) \\ return 0\\ \\ return 1 + down(n - 1)\\ \\ show down(2000)\\ '
+            r'try \\ show down(1000000)\\ catch (e) \\ show e\\ \\ show down(1000000)\\',
+            r'function f(n: int): int \\ if (n == 0) \\ return x\\ \\ define x = n\\ '
+            r'function f(m: int): int \\ return 100 + m\\ \\ return f(n - 1)\\ \\ define x = 9\\ show f(0)\\ show f(2)\\',
+            r'function t(a: int, a: int): int \\ if (a == 0) \\ return 5\\ \\ return t(1, a - 1)\\ \\ show t(1, 3)\\ '
+            r'function w(n: int): int \\ while (n > 0) \\ return w(n - 1)\\ \\ return 7\\ \\ show w(3)\\',
+        ]
+        for code in programs:
+            with self.subTest(code=code):
+                self.assertEqual(run(PyInterpreter(), code), run(Interpreter(), code))
+
+    def test_globals_and_functions_outlive_a_program(self):
+        programs = [r'define a = 1\\ function k(): int \\ return a\\ \\', r'a = 5\\ show k()\\',
+                    r'function k(b: int): int \\ return b\\ \\ show k(4)\\ show k()\\']
+        self.assertEqual(run(PyInterpreter(), *programs), run(Interpreter(), *programs))
+
+    def test_registered_engine(self):
+        self.assertIs(get_engine('python'), PyInterpreter)
+
+    def test_compiled_code_is_cached(self):
+        code = PROGRAMS[3]
+        self.assertEqual(run(PyInterpreter(), code), "144\n")
+        self.assertTrue(os.path.exists(entry_path(parse(code))))
+        with unittest.mock.patch.object(PyCompiler, 'lower_program', side_effect=AssertionError('lowered')):
+            self.assertEqual(run(PyInterpreter(), code), "144\n")
+
+    def test_broken_entries_are_compiled_again(self):
+        code = PROGRAMS[1]
+        run(PyInterpreter(), code)
+        path = entry_path(parse(code))
+        with open(path, 'wb') as f:
+            f.write(b'\x00garbage')
+        self.assertEqual(run(PyInterpreter(), code), "45\n")
+        self.assertGreater(os.path.getsize(path), len(b'\x00garbage'))
+
+    def test_cache_can_be_turned_off(self):
+        code = PROGRAMS[0]
+        with unittest.mock.patch.dict(os.environ, {CACHE_SIZE_ENV: '0'}):
+            run(PyInterpreter(), code)
+        self.assertFalse(os.path.exists(entry_path(parse(code))))
+        run(PyInterpreter(use_cache=False), code)
+        self.assertFalse(os.path.exists(entry_path(parse(code))))
+
+
+if __name__ == '__main__':
+    unittest.main()
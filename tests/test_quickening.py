@@ -0,0 +1,117 @@
+# tests/test_quickening.py
+
+import contextlib
+import io
+import unittest
+
+from opalg.parser.parser import parser
+from opalg.compiler.ast_nodes import BinaryOperationNode
+from opalg.compiler.semantic_analyzer import SemanticAnalyzer
+from opalg.compiler.serializer import dumps, loads
+from opalg.interpreter import quickening
+from opalg.interpreter.interpreter import Interpreter
+from opalg.interpreter.quickening import (
+    QUICKEN_AFTER, QuickeningStats, IntAddNode, IntLessNode, FloatMulNode, StrConcatNode
+)
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(program, interpreter=None):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            (interpreter or Interpreter()).interpret(program)
+        except Exception as e:
+            print(f"error: {e}")
+    return out.getvalue()
+
+
+def loop(body, times, setup=''):
+    return parse(setup + r'define i = 0\\ while (i < %d) \\ %s i += 1\\ \\' % (times, body))
+
+
+def loop_body(program):
+    return program.statements[-1].body.statements
+
+
+def counting_interpreter():
+    interpreter = Interpreter()
+    interpreter.quickening_stats = QuickeningStats()
+    return interpreter
+
+
+def counters(interpreter, node_class):
+    name, quickened, hits, misses = interpreter.quickening_stats.rows()[quickening.INDEX[node_class]]
+    return quickened, hits, misses
+
+
+class TestQuickening(unittest.TestCase):
+    def test_nodes_are_specialized_after_a_few_evaluations(self):
+        program = loop(r'show i + 1\\', QUICKEN_AFTER - 1)
+        run(program)
+        self.assertIs(type(loop_body(program)[0].value), BinaryOperationNode)
+        program = loop(r'define s = "a" + "b"\\ define f = 1.5 * 2.0\\ show i + 1\\', QUICKEN_AFTER + 3)
+        interpreter = counting_interpreter()
+        self.assertEqual(run(program, interpreter), ''.join(f'{i + 1}\n' for i in range(QUICKEN_AFTER + 3)))
+        body = loop_body(program)
+        self.assertEqual([type(body[0].value), type(body[1].value), type(body[2].value)],
+                         [StrConcatNode, FloatMulNode, IntAddNode])
+        self.assertIs(type(program.statements[-1].condition), IntLessNode)
+        self.assertEqual(counters(interpreter, IntAddNode), (1, 3, 0))
+
+    def test_guard_failures_deoptimize_for_good(self):
+        program = loop(r'x = x + 1\\ if (i == 5) \\ x = 0.5\\ \\', 8, r'define x = 0\\')
+        interpreter = counting_interpreter()
+        run(program, interpreter)
+        self.assertEqual(run(parse(r'show x\\'), interpreter), "2.5\n")
+        addition = loop_body(program)[0].expression.right
+        self.assertIs(type(addition), BinaryOperationNode)
+        self.assertEqual(addition.observed, QUICKEN_AFTER)
+        self.assertEqual(counters(interpreter, IntAddNode)[2], 1)
+
+    def test_mixed_and_unsupported_operands_stay_generic(self):
+        program = loop(r'define a = 1 + 0.5\\ define b = true + 1\\ define c = "a" < "b"\\', 6)
+        run(program)
+        self.assertEqual([type(stmt.value) for stmt in loop_body(program)[:3]], [BinaryOperationNode] * 3)
+
+    def test_analyzed_operand_types_specialize_at_once(self):
+        program = parse(r'define x: int = 2\\ define y: int = x * 3\\ show y\\')
+        SemanticAnalyzer().analyze(program)
+        self.assertEqual(run(program), "6\n")
+        self.assertEqual(type(program.statements[1].value).__name__, 'IntMulNode')
+
+    def test_quickened_programs_serialize_as_generic_ones(self):
+        program = loop(r'show i * 2\\', 6)
+        fresh = dumps(program)
+        run(program)
+        self.assertIsNot(type(loop_body(program)[0].value), BinaryOperationNode)
+        self.assertEqual(dumps(program), fresh)
+        self.assertEqual(run(loads(fresh)), run(program))
+
+    def test_counters_belong_to_one_interpreter(self):
+        program = loop(r'show i + 1\\', 10)
+        plain = Interpreter()
+        run(program, plain)
+        self.assertIsNone(plain.quickening_stats)
+        interpreter = counting_interpreter()
+        run(program, interpreter)
+        run(loop(r'show i + 1\\', 10), Interpreter())
+        self.assertEqual(counters(interpreter, IntAddNode), (0, 10, 0))
+        self.assertEqual(counters(interpreter, IntLessNode), (0, 11, 0))
+
+    def test_report_shows_hit_rates(self):
+        interpreter = counting_interpreter()
+        run(loop(r'show "x" + "y"\\', 10), interpreter)
+        out = io.StringIO()
+        interpreter.quickening_stats.report(out)
+        lines = out.getvalue().splitlines()
+        self.assertIn('hit rate', lines[0])
+        self.assertTrue(any(line.startswith('StrConcatNode') and line.endswith('100.0%') for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
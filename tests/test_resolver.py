@@ -0,0 +1,122 @@
+# tests/test_resolver.py
+
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from parser.parser import parser
+from compiler.resolver import Resolver
+from interpreter import interpreter as interpreter_module
+from interpreter.interpreter import Interpreter
+from interpreter.closure_compiler import ClosureInterpreter
+from interpreter.vm import VMInterpreter
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(interpreter_class, code):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            interpreter_class().interpret(parse(code))
+        except Exception as e:
+            print(f"error: {e}")
+    return out.getvalue()
+
+
+# Scoping corner cases and the output the dynamic (name-based) lookup gave for them.
+SCOPING = [
+    (r'define x = 1\\ if (true) \\ show x\\ define x = 2\\ show x\\ \\ show x\\', "1\n2\n1\n"),
+    (r'define i = 0\\ while (i < 3) \\ if (i > 0) \\ show y\\ \\ define y = i\\ i += 1\\ \\',
+     "error: Variable 'y' not defined\n"),
+    (r'define c = "g"\\ if (true) \\ for (c in "") \\ \\ show c\\ \\', "g\n"),
+    (r'if (true) \\ for (c in "") \\ \\ show c\\ \\', "error: Variable 'c' not defined\n"),
+    (r'function f(): int \\ return g\\ \\ define g = 5\\ show f()\\', "5\n"),
+    (r'function f(): int \\ return g\\ \\ show f()\\ define g = 5\\', "error: Variable 'g' not defined\n"),
+    (r'define x = 1\\ function f(): int \\ x = x + 10\\ return x\\ \\ show f()\\ show x\\', "11\n11\n"),
+    (r'x = 3\\', "error: Variable 'x' not defined\n"),
+    (r'define e = 9\\ try \\ throw 1\\ catch (e) \\ e = 5\\ show e\\ \\ show e\\', "5\n9\n"),
+    (r'define n = 0\\ for (c in "abc") \\ define t = c + c\\ n += 1\\ show t\\ \\ show n\\ show c\\',
+     "aa\nbb\ncc\n3\nc\n"),
+]
+
+
+def shows(program):
+    """The value of every show statement (nested blocks included), in source order."""
+    found = []
+
+    def walk(statements):
+        for stmt in statements:
+            if type(stmt).__name__ == 'ShowStatementNode':
+                found.append(stmt.value)
+            for block in ('then_block', 'else_block', 'body'):
+                child = getattr(stmt, block, None)
+                if child is not None:
+                    walk(child.statements)
+    walk(program.statements)
+    return found
+
+
+class TestResolver(unittest.TestCase):
+    def test_slots_follow_declaration_order(self):
+        program = parse(r'define x = 1\\ if (true) \\ show x\\ define x = 2\\ show x\\ \\')
+        Resolver().resolve(program)
+        before, after = shows(program)
+        self.assertEqual(before.address, ((1, 0),))
+        self.assertEqual(after.address, ((0, 0),))
+        self.assertEqual(program.scope.names, ['x'])
+
+    def test_maybe_bound_names_keep_a_fallback(self):
+        program = parse(r'define c = "g"\\ if (true) \\ for (c in "") \\ \\ show c\\ \\')
+        Resolver().resolve(program)
+        self.assertEqual(shows(program)[0].address, ((0, 0), (1, 0)))
+
+    def test_function_bodies_see_later_globals(self):
+        program = parse(r'function f(a: int): int \\ return a + g\\ \\ define g = 5\\')
+        Resolver().resolve(program)
+        function = program.statements[0]
+        self.assertEqual(function.param_slots, (0,))
+        self.assertEqual(function.body.statements[0].expression.right.address, ((1, 0),))
+
+    def test_engines_keep_dynamic_scoping_results(self):
+        for engine in (Interpreter, ClosureInterpreter, VMInterpreter):
+            for code, expected in SCOPING:
+                with self.subTest(engine=engine.__name__, code=code):
+                    self.assertEqual(run(engine, code), expected)
+
+    def test_loop_body_frame_is_reused(self):
+        created = []
+
+        class CountingEnvironment(interpreter_module.Environment):
+            __slots__ = ()
+
+            def __init__(self, parent=None, scope=None):
+                created.append(scope)
+                super().__init__(parent, scope)
+
+        code = r'define i = 0\\ while (i < 50) \\ define j = i\\ i = j + 1\\ \\ show i\\'
+        with mock.patch.object(interpreter_module, 'Environment', CountingEnvironment):
+            self.assertEqual(run(Interpreter, code), "50\n")
+        # The global frame plus a single body frame for all 50 iterations.
+        self.assertEqual(len(created), 2)
+
+    def test_returned_calls_in_function_bodies_are_tail_calls(self):
+        program = parse(r'function f(n: int): int \\ if (n > 0) \\ return f(n - 1)\\ \\ '
+                        r'while (n < 0) \\ return g(n)\\ \\ try \\ return f(0)\\ catch (e) \\ return f(1)\\ \\ '
+                        r'return f(n) + 1\\ \\ return f(3)\\')
+        Resolver().resolve(program)
+        then_return = program.statements[0].body.statements[0].then_block.statements[0]
+        loop_return = program.statements[0].body.statements[1].body.statements[0]
+        try_node = program.statements[0].body.statements[2]
+        tails = [then_return.tail, loop_return.tail, try_node.try_block.statements[0].tail,
+                 try_node.catch_block.statements[0].tail, program.statements[0].body.statements[3].tail,
+                 program.statements[1].tail]
+        self.assertEqual(tails, [True, True, False, False, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
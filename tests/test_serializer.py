@@ -0,0 +1,63 @@
+# tests/test_serializer.py
+
+import contextlib
+import io
+import unittest
+
+from opalg.parser.parser import parser
+from opalg.compiler.serializer import dumps, loads, MAGIC
+from opalg.compiler.ast_nodes import JTMLElementNode, ProgramNode, ShowStatementNode, StringLiteralNode
+
+
+PROGRAMS = [
+    r'define x: int = 1\\ if (true) \\ show x\\ define x = -2.5\\ show x\\ \\ show "héllo"\\',
+    r'define n = 0\\ for (c in "abc") \\ define t = c + c\\ n += 1\\ show t\\ \\ show n\\ show c\\',
+    r'define e = 9\\ try \\ throw 1\\ catch (e) \\ e = 5\\ show e\\ finally \\ show 1\\ \\ show e\\',
+    r'function f(a: int, b: list<int>): string \\ return a\\ \\ show f(1, "a", true) * (2 + 3)\\',
+]
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def describe(value):
+    """A comparable rendering of a node tree, positions and type objects included."""
+    if isinstance(value, list):
+        return [describe(item) for item in value]
+    if hasattr(value, 'lexpos'):
+        fields = {
+            name: describe(getattr(value, name, None))
+            for klass in type(value).__mro__ for name in getattr(klass, '__slots__', ())
+        }
+        return (type(value).__name__, fields)
+    return (type(value).__name__, value)
+
+
+class TestSerializer(unittest.TestCase):
+    def test_round_trip(self):
+        for code in PROGRAMS:
+            with self.subTest(code=code):
+                program = parse(code)
+                self.assertEqual(describe(loads(dumps(program))), describe(program))
+
+    def test_literals_keep_their_type(self):
+        program = loads(dumps(parse(r'show 1\\ show 1.0\\ show true\\ show "1"\\')))
+        self.assertEqual([type(stmt.value.value) for stmt in program.statements], [int, float, bool, str])
+
+    def test_unhashable_values(self):
+        element = JTMLElementNode('div', {'class': 'a', 'id': 'b'}, [ShowStatementNode(StringLiteralNode('x'))])
+        loaded = loads(dumps(ProgramNode([element])))
+        self.assertEqual(loaded.to_dict(), ProgramNode([element]).to_dict())
+
+    def test_rejects_foreign_and_truncated_data(self):
+        data = dumps(parse(r'show 1 + 2\\'))
+        for bad in (b'', b'not an ast', data[:-1], data + b'\0', MAGIC + b'\xff'):
+            with self.subTest(bad=bad):
+                with self.assertRaises(ValueError):
+                    loads(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
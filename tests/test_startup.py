@@ -0,0 +1,59 @@
+# tests/test_startup.py
+
+import io
+import sys
+import unittest
+
+from startup import LazyModule, ImportProfiler, lazy_import
+
+
+class TestLazyModule(unittest.TestCase):
+    def test_import_is_deferred_until_attribute_access(self):
+        sys.modules.pop('colorsys', None)
+        module = lazy_import('colorsys')
+        self.assertIsInstance(module, LazyModule)
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(module.loaded)
+        self.assertIn('colorsys', sys.modules)
+
+    def test_already_imported_module_is_returned_directly(self):
+        self.assertIs(lazy_import('sys'), sys)
+
+    def test_missing_module_fails_on_use_only(self):
+        module = lazy_import('opalg_missing_extension')
+        with self.assertRaises(ModuleNotFoundError):
+            module.anything
+
+    def test_interpreter_does_not_load_jtml_engine(self):
+        from interpreter.interpreter import Interpreter
+        self.assertIsNotNone(Interpreter)
+        self.assertNotIn('jtml_engine', sys.modules)
+
+
+class TestImportProfiler(unittest.TestCase):
+    def test_records_nested_imports(self):
+        for name in ('json', 'json.decoder', 'json.scanner', 'json.encoder'):
+            sys.modules.pop(name, None)
+        profiler = ImportProfiler()
+        profiler.install()
+        try:
+            import json
+        finally:
+            profiler.uninstall()
+        names = [record.name for record in profiler.records]
+        self.assertEqual(names[0], 'json')
+        self.assertIn('json.decoder', names)
+        top = profiler.records[0]
+        self.assertEqual(top.depth, 0)
+        self.assertGreaterEqual(top.cumulative, top.self_time)
+        self.assertNotEqual(type(json.__loader__).__name__, '_TimedLoader')
+
+        out = io.StringIO()
+        profiler.report(out)
+        self.assertIn('json.decoder', out.getvalue())
+        self.assertIn('total', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# tests/test_stream_lexer.py
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from lexer.lexer import lexer
+from lexer.stream import StreamLexer, tokenize
+from parser.parser import parser
+from compiler.serializer import dumps
+
+PROGRAM = r'''define total: int = 0\\
+// running sum
+while (total <= 100 && !done || x != 12.75) \\
+    total += 3\\
+    show "total is \"" \\
+\\
+define message = "ok"\\
+'''
+
+
+def token_tuples(tokens):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in tokens]
+
+
+class TestStreamLexer(unittest.TestCase):
+    def whole(self, code):
+        whole_lexer = lexer.clone()
+        whole_lexer.input(code)
+        return token_tuples(iter(whole_lexer.token, None))
+
+    def streamed(self, code, chunk_size):
+        return token_tuples(tokenize(io.StringIO(code), chunk_size))
+
+    def test_tokens_match_the_in_memory_lexer_at_any_chunk_size(self):
+        expected = self.whole(PROGRAM)
+        for chunk_size in (1, 2, 3, 5, 16, len(PROGRAM) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.streamed(PROGRAM, chunk_size), expected)
+
+    def test_tokens_straddling_a_chunk_boundary(self):
+        # Every split point of each snippet falls inside or right after a token.
+        for code in ('while', '12.5', '<=', '"a b"', r'\\', '||', '// note\nx', '12.x'):
+            for chunk_size in range(1, len(code) + 1):
+                with self.subTest(code=code, chunk_size=chunk_size):
+                    self.assertEqual(self.streamed(code, chunk_size), self.whole(code))
+
+    def test_illegal_characters_are_reported_once(self):
+        code = 'x @ y\n"open\nz'
+        with contextlib.redirect_stdout(io.StringIO()) as expected:
+            self.whole(code)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            tokens = self.streamed(code, 2)
+        self.assertEqual(output.getvalue(), expected.getvalue())
+        self.assertEqual([tok[1] for tok in tokens], ['x', 'y', 'open', 'z'])
+
+    def test_parse_from_a_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.op', delete=False, encoding='utf-8') as f:
+            f.write(PROGRAM)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = parser.parse(PROGRAM)
+                with StreamLexer(f.name, chunk_size=7) as stream:
+                    program = parser.parse(lexer=stream)
+            self.assertEqual(dumps(program), dumps(expected))
+        finally:
+            os.remove(f.name)
+
+    def test_syntax_error_points_into_the_current_line(self):
+        code = 'define a = 1\\\\\ndefine b = = 2\\\\'
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SyntaxError) as error:
+                parser.parse(lexer=StreamLexer(io.StringIO(code), chunk_size=4))
+        self.assertIn('column 12', str(error.exception))
+        self.assertIn('define b = = 2', str(error.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
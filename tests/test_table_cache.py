@@ -0,0 +1,94 @@
+# tests/test_table_cache.py
+
+import os
+import shutil
+import tempfile
+import types
+import unittest
+
+from parser.table_cache import load_parser, table_path, CACHE_DIR_ENV, TABLE_PREFIX
+
+
+def make_grammar(rule_doc):
+    """Build a throwaway module holding a tiny PLY grammar."""
+    module = types.ModuleType('tiny_grammar')
+    module.__file__ = __file__
+    module.tokens = ['NUMBER', 'PLUS']
+
+    def p_sum(p):
+        p[0] = p[1] + p[3] if len(p) == 4 else p[1]
+    p_sum.__doc__ = rule_doc
+
+    def p_error(p):
+        raise SyntaxError(p)
+
+    module.p_sum = p_sum
+    module.p_error = p_error
+    return module
+
+
+class TokenStream:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def input(self, data):
+        pass
+
+    def token(self):
+        if not self.values:
+            return None
+        value = self.values.pop(0)
+        tok = types.SimpleNamespace(type='PLUS' if value == '+' else 'NUMBER', value=value, lineno=1, lexpos=0)
+        return tok
+
+
+class TestParseTableCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.mkdtemp()
+        self.old_env = os.environ.get(CACHE_DIR_ENV)
+        os.environ[CACHE_DIR_ENV] = self.cache
+
+    def tearDown(self):
+        if self.old_env is None:
+            os.environ.pop(CACHE_DIR_ENV, None)
+        else:
+            os.environ[CACHE_DIR_ENV] = self.old_env
+        shutil.rmtree(self.cache, ignore_errors=True)
+
+    def parse(self, parser, values):
+        return parser.parse(lexer=TokenStream(values))
+
+    def test_tables_are_written_and_reused(self):
+        module = make_grammar('''sum : sum PLUS NUMBER
+                                     | NUMBER''')
+        parser = load_parser(module)
+        self.assertTrue(os.path.exists(table_path(module)))
+        self.assertEqual(self.parse(parser, [1, '+', 2]), 3)
+
+        mtime = os.path.getmtime(table_path(module))
+        cached = load_parser(module)
+        self.assertEqual(os.path.getmtime(table_path(module)), mtime)
+        self.assertEqual(self.parse(cached, [1, '+', 2, '+', 3]), 6)
+
+    def test_grammar_change_invalidates_tables(self):
+        old = make_grammar('''sum : sum PLUS NUMBER
+                                  | NUMBER''')
+        new = make_grammar('''sum : NUMBER PLUS sum
+                                  | NUMBER''')
+        self.assertNotEqual(table_path(old), table_path(new))
+        load_parser(old)
+        load_parser(new)
+        tables = [name for name in os.listdir(self.cache) if name.startswith(TABLE_PREFIX)]
+        self.assertEqual(tables, [os.path.basename(table_path(new))])
+
+    def test_corrupt_table_file_is_rebuilt(self):
+        module = make_grammar('''sum : sum PLUS NUMBER
+                                     | NUMBER''')
+        with open(table_path(module), 'wb') as f:
+            f.write(b'\x80')
+        parser = load_parser(module)
+        self.assertEqual(self.parse(parser, [4]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
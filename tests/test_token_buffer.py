@@ -0,0 +1,65 @@
+# tests/test_token_buffer.py
+
+import contextlib
+import io
+import unittest
+
+from lexer.lexer import lexer
+from lexer.token_buffer import StringTable, TokenBuffer
+from parser.parser import parser
+
+CODE = r'define flag: bool = true\\ define n = 1 + 2.5\\ show "n is"\\ show n\\'
+
+
+def tuples(tokens):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in tokens]
+
+
+class TestTokenBuffer(unittest.TestCase):
+    def lex(self, code):
+        own_lexer = lexer.clone()
+        own_lexer.input(code)
+        return list(iter(own_lexer.token, None))
+
+    def test_holds_the_lexer_tokens(self):
+        buffer = TokenBuffer.tokenize(CODE)
+        self.assertEqual(tuples(buffer), tuples(self.lex(CODE)))
+        self.assertEqual(len(buffer), len(self.lex(CODE)))
+        self.assertEqual(buffer.type_of(3), 'TYPE')
+        self.assertIs(buffer.value_of(5), True)
+        self.assertEqual(buffer.kinds.typecode, 'B')
+        self.assertEqual(buffer.lexpos.typecode, 'I')
+
+    def test_extend_from_any_lexer(self):
+        buffer = TokenBuffer()
+        buffer.extend(self.lex(CODE))
+        self.assertEqual(tuples(buffer), tuples(TokenBuffer.tokenize(CODE)))
+
+    def test_strings_are_shared_between_buffers(self):
+        strings = StringTable()
+        first = TokenBuffer.tokenize(r'define total = 1\\', strings)
+        size = len(strings)
+        second = TokenBuffer.tokenize(r'define total = 2\\', strings)
+        self.assertEqual(len(strings), size)
+        self.assertEqual(first.values[1], second.values[1])
+        self.assertEqual(second.value_of(3), 2)
+
+    def test_parse_from_a_buffer(self):
+        buffer = TokenBuffer.tokenize(CODE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = parser.parse(CODE)
+            for _ in range(2):
+                program = parser.parse(lexer=buffer.reader())
+                self.assertEqual(program.statements[1].to_dict(), expected.statements[1].to_dict())
+                self.assertEqual(len(program.statements), len(expected.statements))
+
+    def test_syntax_errors_quote_the_source(self):
+        code = 'define a = 1\\\\\ndefine b = = 2\\\\'
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(SyntaxError) as error:
+                parser.parse(lexer=TokenBuffer.tokenize(code).reader())
+        self.assertIn('line 2, column 12', str(error.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# tests/test_visitor.py
+
+import unittest
+
+from compiler.ast_nodes import NumberLiteralNode, StringLiteralNode, IdentifierNode
+from compiler.visitor import Visitor
+
+
+class Describer(Visitor):
+    dispatch = {'_describe_table': ('describe_', 'generic_describe')}
+
+    def describe(self, node):
+        return self._describe_table[type(node)](self, node)
+
+    def generic_describe(self, node):
+        return 'unknown'
+
+    def describe_NumberLiteralNode(self, node):
+        return f'number {node.value}'
+
+    def describe_ExpressionNode(self, node):
+        return 'expression'
+
+
+class LoudDescriber(Describer):
+    def describe_NumberLiteralNode(self, node):
+        return f'NUMBER {node.value}'
+
+
+class TestVisitor(unittest.TestCase):
+    def test_dispatches_on_node_class(self):
+        self.assertEqual(Describer().describe(NumberLiteralNode(1)), 'number 1')
+
+    def test_falls_back_to_base_class_handler_then_generic(self):
+        self.assertEqual(Describer().describe(StringLiteralNode('a')), 'expression')
+        self.assertEqual(Describer().describe(object()), 'unknown')
+
+    def test_subclasses_get_their_own_table(self):
+        self.assertEqual(LoudDescriber().describe(NumberLiteralNode(2)), 'NUMBER 2')
+        self.assertEqual(Describer().describe(NumberLiteralNode(2)), 'number 2')
+        self.assertIsNot(LoudDescriber._describe_table, Describer._describe_table)
+
+    def test_handlers_are_looked_up_once_per_node_class(self):
+        class Counting(Describer):
+            pass
+        Counting().describe(IdentifierNode('x'))
+        Counting().describe(IdentifierNode('y'))
+        self.assertEqual(dict(Counting._describe_table), {IdentifierNode: Describer.describe_ExpressionNode})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_vm.py
+
+import contextlib
+import io
+import unittest
+
+from parser.parser import parser
+from compiler.bytecode import BytecodeCompiler, disassemble, SETUP_TRY, JUMP_IF_FALSE
+from compiler.resolver import Resolver
+from interpreter.interpreter import Interpreter
+from interpreter.vm import VMInterpreter
+
+
+def parse(code):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parser.parse(code)
+
+
+def run(interpreter_class, code):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            interpreter_class().interpret(parse(code))
+        except Exception as e:
+            print(f"error: {e}")
+    return out.getvalue()
+
+
+PROGRAMS = [
+    r'define x = 10\\ show x * 2 + 1\\ show x / 4\\ show -x\\',
+    r'define i = 0\\ define total = 0\\ while (i < 10) \\ total += i\\ i = i + 1\\ \\ show total\\',
+    r'define x = 3\\ if (x >= 3 && x != 4) \\ show "yes"\\ else \\ show "no"\\ \\ show !(x == 3)\\',
+    r'function fib(n: int): int \\ if (n < 2) \\ return n\\ \\ return fib(n - 1) + fib(n - 2)\\ \\ show fib(12)\\',
+    r'for (c in "abc") \\ show c\\ \\ show c\\',
+    r'try \\ throw "boom"\\ catch (e) \\ show e\\ finally \\ show "done"\\ \\',
+    r'try \\ show 1 / 0\\ catch (e) \\ show e\\ \\ show "after"\\',
+    r'try \\ throw "inner"\\ finally \\ show "cleanup"\\ \\',
+    r'try \\ try \\ throw 1\\ catch (e) \\ throw e + 1\\ finally \\ show "f1"\\ \\ catch (e) \\ show e\\ \\',
+    r'function f(n: int): int \\ try \\ return n\\ finally \\ show "finally"\\ \\ return 0\\ \\ show f(5)\\',
+    r'function g(n: int): int \\ for (c in "xyz") \\ if (c == "y") \\ return n\\ \\ \\ return 0\\ \\ show g(7)\\',
+    r'function h(n: int): int \\ throw "from h"\\ return n\\ \\ try \\ show h(1)\\ catch (e) \\ show e\\ \\',
+    r'show missing\\',
+    r'define y = 1\\ if (true) \\ define z = 2\\ y = z\\ \\ show y\\ show z\\',
+    r'function f(a: int): int \\ return a\\ \\ show f(1, 2)\\',
+    r'show nope(1)\\',
+    r'return 3\\',
+]
+
+
+class TestBytecodeVM(unittest.TestCase):
+    def test_matches_tree_walker(self):
+        for code in PROGRAMS:
+            with self.subTest(code=code):
+                self.assertEqual(run(VMInterpreter, code), run(Interpreter, code))
+
+    def test_control_flow_is_lowered_to_jumps(self):
+        program = parse(r'define i = 0\\ while (i < 3) \\ i += 1\\ \\ try \\ show i\\ catch (e) \\ show e\\ \\')
+        Resolver().resolve(program)
+        code = BytecodeCompiler.compile_program(program)
+        ops = code.code[0::2]
+        self.assertIn(JUMP_IF_FALSE, ops)
+        self.assertIn(SETUP_TRY, ops)
+        self.assertIn('JUMP_IF_FALSE', disassemble(code))
+
+    def test_deep_recursion_does_not_use_the_python_stack(self):
+        code = (
+            r'function down(n: int): int \\ if (n == 0) \\ return 0\\ \\ return down(n - 1) + 1\\ \\'
+            r'show down(20000)\\'
+        )
+        self.assertEqual(run(VMInterpreter, code), "20000\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+# tests/test_watch.py
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import cli
+from interpreter.interpreter import Interpreter
+from parser.parser import parser
+from watch import Watcher
+
+SOURCES = {
+    'main.op': 'import "lib/base.op"\\\\\ndefine answer: int = base + 2\\\\\nshow answer\\\\',
+    os.path.join('lib', 'base.op'): 'define base: int = 40\\\\',
+    'other.op': 'define other: int = 1\\\\\nshow other\\\\',
+}
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.mtime = 1_000_000_000 * 10**9
+        for name, source in SOURCES.items():
+            self.write(name, source)
+        self.out = io.StringIO()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def write(self, name, source):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        # A distinct mtime per write, however fast the test runs.
+        self.mtime += 10**9
+        os.utime(path, ns=(self.mtime, self.mtime))
+
+    def clear(self):
+        self.out.seek(0)
+        self.out.truncate()
+
+    def watcher(self, **options):
+        return Watcher([self.root], use_cache=False, out=self.out, **options)
+
+    def rebuild(self, watcher):
+        with contextlib.redirect_stdout(self.out):
+            return watcher.rebuild(watcher.poll())
+
+    def test_first_build_compiles_everything(self):
+        watcher = self.watcher()
+        self.assertEqual(self.rebuild(watcher), 0)
+        self.assertIn('total: 3 files, 0 failed, 0 up to date', self.out.getvalue())
+
+    def test_poll_reports_changed_files(self):
+        watcher = self.watcher()
+        self.rebuild(watcher)
+        self.assertEqual(watcher.poll(), [])
+        self.write('other.op', 'define other: int = 2\\\\')
+        os.remove(self.path('main.op'))
+        self.assertEqual(watcher.poll(), [self.path('main.op'), self.path('other.op')])
+
+    def test_only_affected_modules_are_rebuilt(self):
+        watcher = self.watcher(explain=True)
+        self.rebuild(watcher)
+        main_program = watcher.programs[self.path('main.op')][1]
+        self.write(os.path.join('lib', 'base.op'), 'define base: int = 41\\\\')
+        self.clear()
+        self.assertEqual(self.rebuild(watcher), 0)
+        output = self.out.getvalue()
+        self.assertIn('(source changed)', output)
+        self.assertIn('main.op  (imports ', output)
+        self.assertIn('other.op  (up to date)', output)
+        self.assertIn('rebuilt 2 of 3 modules: turnaround', output)
+        # main.op did not change, so it was compiled again without being parsed again.
+        self.assertIs(watcher.programs[self.path('main.op')][1], main_program)
+
+    def test_run_rebuilt_programs(self):
+        watcher = self.watcher(run=True)
+        self.rebuild(watcher)
+        self.assertIn('42', self.out.getvalue())
+        self.write(os.path.join('lib', 'base.op'), 'define base: int = 41\\\\')
+        self.clear()
+        self.rebuild(watcher)
+        self.assertIn('43', self.out.getvalue())
+        self.assertNotIn('other.op', self.out.getvalue())
+
+    def test_watch_loop(self):
+        watcher = self.watcher()
+        with contextlib.redirect_stdout(self.out):
+            watcher.watch(interval=0.01, rounds=1)
+        self.assertIn('total: 3 files', self.out.getvalue())
+
+    def test_cli_subcommand(self):
+        with unittest.mock.patch('opalg.watch.Watcher.watch', side_effect=KeyboardInterrupt) as watch:
+            cli.main(['watch', self.root, '--interval', '0.5'])
+        watch.assert_called_once_with(0.5)
+
+
+class TestImportAtRuntime(unittest.TestCase):
+    def test_imported_module_must_be_loaded_first(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            program = parser.parse('import "base.op"\\\\ show 1\\\\')
+            with self.assertRaises(Exception) as error:
+                Interpreter().interpret(program)
+        self.assertIn("Module 'base.op' is not loaded", str(error.exception))
+
+    def test_names_of_loaded_modules_are_visible(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            interpreter = Interpreter()
+            interpreter.interpret(parser.parse('define base: int = 40\\\\'))
+            interpreter.modules.add('base.op')
+            interpreter.interpret(parser.parse('import "base.op"\\\\ show base + 2\\\\'))
+        self.assertTrue(out.getvalue().rstrip().endswith('42'))
+
+
+if __name__ == '__main__':
+    unittest.main()